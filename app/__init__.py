@@ -2,6 +2,7 @@ import os
 import logging
 from logging.handlers import RotatingFileHandler
 from flask import Flask, render_template
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_login import LoginManager
@@ -18,24 +19,51 @@ login_manager = LoginManager()
 csrf = CSRFProtect()
 limiter = Limiter(key_func=get_remote_address)
 
-def create_app(config_name=None):
+def create_app(config_name=None, config_overrides=None):
     """Application factory pattern with security configuration."""
     app = Flask(__name__)
     
     # Load configuration
     config_name = config_name or os.environ.get('FLASK_CONFIG', 'development')
     app.config.from_object(config[config_name])
+    if config_overrides:
+        app.config.update(config_overrides)
     
     # Ensure secret key is set
     if not app.config.get('SECRET_KEY'):
         raise ValueError("SECRET_KEY must be set in environment variables or config")
     
+    # Cache compiled template bytecode on disk so new workers skip lexing/compiling
+    if app.config.get('JINJA_BYTECODE_CACHE', True):
+        cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR') or os.path.join(app.instance_path, 'jinja_cache')
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    
+    # Connection pool suited to the database (see POOL_PROFILES)
+    app.config['POOL_PROFILE'], app.config['SQLALCHEMY_ENGINE_OPTIONS'] = pool_settings(app.config)
+    
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
+    
+    # Registered before CSRF protection, whose hook is the first to parse the form
+    @app.before_request
+    def raise_upload_limit():
+        from flask import request
+        from flask_login import current_user
+        
+        view = app.view_functions.get(request.endpoint)
+        # Signed-in users only: anonymous bodies are still parsed, and rejected, at MAX_CONTENT_LENGTH
+        if getattr(view, 'allow_large_upload', False) and current_user.is_authenticated:
+            request.max_content_length = app.config.get('UPLOAD_MAX_SIZE')
+    
     csrf.init_app(app)
     limiter.init_app(app)
     
+    # Per-connection SQLite settings (see SQLITE_PRAGMAS)
+    from app.serving import init_sqlite_pragmas
+    init_sqlite_pragmas(app)
+    
     # Configure Flask-Login
     login_manager.init_app(app)
     login_manager.login_view = 'auth.login'
@@ -61,12 +89,57 @@ def create_app(config_name=None):
         from app.models import User
         return User.query.get(int(user_id))
     
+    @login_manager.unauthorized_handler
+    def unauthorized_user():
+        from flask import flash, jsonify, redirect, request
+        from flask_login import login_url
+        
+        # JSON clients cannot follow a redirect to the HTML login page
+        if request.path.startswith('/api/'):
+            return jsonify({'error': 'Authentication required'}), 401
+        flash(login_manager.login_message, login_manager.login_message_category)
+        return redirect(login_url(login_manager.login_view, next_url=request.url))
+    
     # Register blueprints
     from app.routes import main
     from app.auth import auth
+    from app.appeals import appeals
+    from app.api import api
+    from app.uploads import uploads
     
     app.register_blueprint(main)
     app.register_blueprint(auth, url_prefix='/auth')
+    app.register_blueprint(appeals)
+    app.register_blueprint(api, url_prefix='/api/v1')
+    app.register_blueprint(uploads, url_prefix='/api/uploads')
+    
+    # Command line tools
+    from app.cli import register_commands
+    register_commands(app)
+    
+    # Request, SQL and pool metrics (registered before compression so timings include it)
+    from app.metrics import init_metrics
+    init_metrics(app)
+    
+    # Slow statements with their query plans
+    from app.slowlog import init_slowlog
+    init_slowlog(app)
+    
+    # Columnar snapshot behind /api/analytics
+    from app.analytics import init_analytics
+    init_analytics(app)
+    
+    # Historical denial rates for scoring new claims
+    from app.risk import init_risk
+    init_risk(app)
+    
+    # Rendered fragment cache
+    from app.cache import init_cache
+    init_cache(app)
+    
+    # Compress HTML, CSV and JSON responses
+    from app.compression import init_compression
+    init_compression(app)
     
     # Configure logging
     if not app.debug and not app.testing:
@@ -88,6 +161,11 @@ def create_app(config_name=None):
         app.logger.setLevel(getattr(logging, app.config.get('LOG_LEVEL', 'INFO')))
         app.logger.info('Denial Management System startup')
     
+    # Optionally load every template now instead of on first request
+    if app.config.get('TEMPLATE_WARMUP'):
+        count = warm_templates(app)
+        app.logger.info(f'Warmed {count} templates')
+    
     # Create upload directory
     upload_path = app.config.get('UPLOAD_PATH', 'uploads')
     if not os.path.exists(upload_path):
@@ -164,4 +242,44 @@ def create_app(config_name=None):
                 log_security_event('POTENTIAL_XSS_ATTEMPT', f'Suspicious pattern detected: {pattern}')
                 break
     
-    return app 
\ No newline at end of file
+    return app 
+
+def pool_profile_name(database_uri):
+    """Return the pool profile implied by a database URL."""
+    if database_uri.startswith('sqlite'):
+        path = database_uri.split('://', 1)[-1].lstrip('/')
+        in_memory = not path or path.startswith(':memory:') or 'mode=memory' in path
+        return 'sqlite-memory' if in_memory else 'sqlite-file'
+    return 'server-db'
+
+def pool_settings(app_config):
+    """Return (profile name, engine options): the profile's pool settings under SQLALCHEMY_ENGINE_OPTIONS."""
+    import sqlalchemy.pool
+    
+    name = app_config.get('POOL_PROFILE') or pool_profile_name(app_config['SQLALCHEMY_DATABASE_URI'])
+    profiles = app_config.get('POOL_PROFILES', {})
+    if name not in profiles:
+        raise ValueError(f"Unknown POOL_PROFILE {name!r}; expected one of {', '.join(profiles)}")
+    options = dict(profiles[name])
+    options.update(app_config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    if isinstance(options.get('poolclass'), str):
+        options['poolclass'] = getattr(sqlalchemy.pool, options['poolclass'])
+    return name, options
+
+def warm_templates(app):
+    """Load (and compile, or read from the bytecode cache) every template.
+    
+    Returns the number of templates loaded.
+    """
+    from app.appeals import letter_template
+    from app.routes import DENIAL_CODES
+    
+    count = 0
+    for name in app.jinja_env.list_templates():
+        if name.startswith('appeals/letters/'):
+            continue  # Rendered by the appeals module's own environment
+        app.jinja_env.get_template(name)
+        count += 1
+    for code in DENIAL_CODES:
+        letter_template(code)
+    return count
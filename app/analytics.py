@@ -0,0 +1,420 @@
+"""
+In-process columnar analytics for denial reporting.
+
+ClaimSnapshot keeps one row per claim as parallel NumPy arrays: owner,
+provider and denial code (dictionary-encoded as integer codes), service day
+and month, amount in cents and a denied flag. Group-bys are bincounts over
+those arrays, so a report over a million claims takes milliseconds.
+
+The snapshot is built once, then refreshed incrementally: claims and denials
+with ``updated_at`` at or after the last watermark (minus a small overlap for
+transactions that committed late) are re-read and merged by claim id, along
+with any claim id above the highest one seen (bulk loads may carry old
+timestamps). Deleted claims are only dropped by the periodic full rebuild.
+Archived claims (see app/archive.py) stay in the snapshot: the rebuild reads
+the archive tables too.
+
+Each worker holds its own snapshot; NumPy is imported on first use so app
+startup stays light.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import Blueprint, request, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import String, cast, func, select
+from app import db, limiter
+from app.api import json_response
+from app.models import Claim, Denial, ClaimArchive, DenialArchive
+from app.routes import DENIAL_CODES
+from app.security import require_role
+
+analytics = Blueprint('analytics', __name__)
+
+FETCH_BATCH_SIZE = 50000
+NO_OWNER = -1
+NO_DENIAL = -1
+DIMENSIONS = ('provider', 'month', 'denial_code')
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+class Dictionary:
+    """Append-only mapping between strings and dense integer codes."""
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self):
+        return len(self.values)
+
+def _epoch_day(value):
+    import numpy as np
+    return int(np.datetime64(value, 'D').astype(np.int64))
+
+def _month_label(index):
+    import numpy as np
+    return str(np.datetime64(index, 'M'))
+
+class ClaimSnapshot:
+    """Thread-safe columnar copy of claim and denial facts for one process."""
+
+    # Days and months count from 1970-01-01, as NumPy datetime64 does
+    COLUMNS = ('claim_id', 'owner', 'provider', 'day', 'month', 'amount_cents', 'denied', 'denial_code')
+
+    def __init__(self, refresh_interval=10, rebuild_interval=3600, watermark_overlap=5):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.watermark_overlap = timedelta(seconds=watermark_overlap)
+        self.providers = Dictionary()
+        self.denial_codes = Dictionary()
+        self.columns = None
+        self.claims_watermark = None
+        self.denials_watermark = None
+        self.max_claim_id = 0
+        self.refreshed_at = None
+        self.built_at = None
+        self.last_refresh_ms = None
+        self._last_refresh = 0.0
+        self._last_build = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        """Return the column arrays, building or refreshing them first when due."""
+        now = time.monotonic()
+        if self.columns is not None and now - self._last_refresh < self.refresh_interval:
+            return self.columns
+        # One thread refreshes; the others keep serving the previous arrays
+        if not self._lock.acquire(blocking=self.columns is None):
+            return self.columns
+        try:
+            if self.columns is None or now - self._last_build >= self.rebuild_interval:
+                self.build()
+            elif now - self._last_refresh >= self.refresh_interval:
+                self.refresh()
+        finally:
+            self._lock.release()
+        return self.columns
+
+    def build(self):
+        """Read every claim and its latest denial into fresh arrays."""
+        import numpy as np  # Heavy; only analytics needs it
+
+        started = time.perf_counter()
+        connection = db.session.connection()
+        # Taken before reading, so anything written meanwhile is re-read by the next refresh
+        claims_watermark, denials_watermark = self._watermarks(connection)
+        self.max_claim_id = 0
+
+        chunks = []
+        # Working tables first: a claim archived mid-build is then read twice, never missed
+        for model in (Claim, ClaimArchive):
+            last_id = 0
+            while True:
+                rows = connection.execute(
+                    self._claims_query(model).where(model.id > last_id).order_by(model.id).limit(FETCH_BATCH_SIZE)
+                ).all()
+                if not rows:
+                    break
+                chunks.append(self._claim_arrays(rows))
+                last_id = rows[-1][-1]
+        if chunks:
+            columns = {name: np.concatenate([chunk[name] for chunk in chunks]) for name in self.COLUMNS}
+            _, first = np.unique(columns['claim_id'], return_index=True)  # Sorted by id, duplicates dropped
+            columns = {name: array[first] for name, array in columns.items()}
+        else:
+            columns = self._claim_arrays([])
+        for model in (Denial, DenialArchive):
+            self._apply_denials(columns, connection.execute(self._denials_query(model).order_by(model.id)).all())
+
+        self.claims_watermark, self.denials_watermark = claims_watermark, denials_watermark
+        self._publish(columns, started)
+        self._last_build = self._last_refresh
+        self.built_at = self.refreshed_at
+
+    def refresh(self):
+        """Merge claims and denials changed since the watermarks into new arrays."""
+        import numpy as np
+
+        started = time.perf_counter()
+        connection = db.session.connection()
+        claims_watermark, denials_watermark = self._watermarks(connection)
+        claim_rows = self._changed_rows(connection, self._claims_query(), Claim.id, Claim.updated_at,
+                                        self.claims_watermark)
+        denial_rows = self._changed_rows(connection, self._denials_query(), Denial.claim_id, Denial.updated_at,
+                                         self.denials_watermark)
+
+        columns = self.columns
+        if claim_rows:
+            changed = self._claim_arrays(claim_rows)
+            ids = columns['claim_id']
+            positions = np.searchsorted(ids, changed['claim_id'])
+            exists = positions < len(ids)
+            exists[exists] = ids[positions[exists]] == changed['claim_id'][exists]
+            columns = {name: array.copy() for name, array in columns.items()}  # Readers keep the old arrays
+            for name in self.COLUMNS:
+                if name != 'denial_code':  # Denial codes come from the denial rows
+                    columns[name][positions[exists]] = changed[name][exists]
+            added = ~exists
+            if added.any():
+                columns = {name: np.concatenate([columns[name], changed[name][added]]) for name in self.COLUMNS}
+                order = np.argsort(columns['claim_id'], kind='stable')
+                columns = {name: array[order] for name, array in columns.items()}
+        if denial_rows:
+            if columns is self.columns:
+                columns = {name: array.copy() for name, array in columns.items()}
+            self._apply_denials(columns, denial_rows)
+
+        self.claims_watermark = claims_watermark or self.claims_watermark
+        self.denials_watermark = denials_watermark or self.denials_watermark
+        self._publish(columns, started)
+
+    def _changed_rows(self, connection, query, id_column, updated_column, watermark):
+        """Rows updated since ``watermark`` plus rows for claims newer than the snapshot, in id order."""
+        # Two indexed queries rather than one OR, which some planners answer with a scan
+        rows = {}
+        if watermark is not None:
+            for row in connection.execute(query.where(updated_column >= watermark - self.watermark_overlap)):
+                rows[row[-1]] = row
+        for row in connection.execute(query.where(id_column > self.max_claim_id)):
+            rows[row[-1]] = row
+        return [rows[key] for key in sorted(rows)]
+
+    def _publish(self, columns, started):
+        self.columns = columns
+        self._last_refresh = time.monotonic()
+        self.refreshed_at = datetime.utcnow()
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+
+    @staticmethod
+    def _watermarks(connection):
+        return (connection.execute(select(func.max(Claim.updated_at))).scalar(),
+                connection.execute(select(func.max(Denial.updated_at))).scalar())
+
+    @staticmethod
+    def _claims_query(model=Claim):
+        # Dates as ISO text parse in one vectorized step; the trailing id keys _changed_rows
+        return select(func.coalesce(model.created_by, NO_OWNER), model.provider_id, cast(model.service_date, String),
+                      model.total_amount, model.status, model.id)
+
+    @staticmethod
+    def _denials_query(model=Denial):
+        return select(model.claim_id, model.denial_code, model.id)
+
+    def _claim_arrays(self, rows):
+        import numpy as np
+
+        owners, providers, service_dates, amounts, statuses, claim_ids = zip(*rows) if rows else ((),) * 6
+        unique_providers, provider_index = np.unique(np.array(providers, dtype=str), return_inverse=True)
+        provider_codes = np.array([self.providers.encode(str(value)) for value in unique_providers], dtype=np.int32)
+        days = np.array(service_dates, dtype='datetime64[D]')
+        columns = {
+            'claim_id': np.array(claim_ids, dtype=np.int64),
+            'owner': np.array(owners, dtype=np.int32),
+            'provider': provider_codes[provider_index].astype(np.int32),
+            'day': days.astype(np.int32),
+            'month': days.astype('datetime64[M]').astype(np.int32),
+            'amount_cents': np.rint(np.array(amounts, dtype=np.float64) * 100).astype(np.int64),
+            'denied': np.array(statuses, dtype=object) == 'denied',
+            'denial_code': np.full(len(rows), NO_DENIAL, np.int16),
+        }
+        if rows:
+            self.max_claim_id = max(self.max_claim_id, int(columns['claim_id'].max()))
+        return columns
+
+    def _apply_denials(self, columns, rows):
+        """Set each claim's denial code from its latest denial (rows in denial id order)."""
+        import numpy as np
+
+        if not rows:
+            return
+        claim_ids, codes, _ = zip(*rows)
+        claim_ids = np.array(claim_ids, dtype=np.int64)
+        codes = np.array([self.denial_codes.encode(code) for code in codes], dtype=np.int16)
+        ids = columns['claim_id']
+        positions = np.searchsorted(ids, claim_ids)
+        known = positions < len(ids)
+        known[known] = ids[positions[known]] == claim_ids[known]
+        # Fancy assignment keeps the last value for repeated positions, i.e. the latest denial
+        columns['denial_code'][positions[known]] = codes[known]
+
+    def stats(self):
+        columns = self.columns
+        return {
+            'rows': 0 if columns is None else len(columns['claim_id']),
+            'bytes': 0 if columns is None else sum(array.nbytes for array in columns.values()),
+            'providers': len(self.providers),
+            'denial_codes': len(self.denial_codes),
+            'built_at': self.built_at,
+            'refreshed_at': self.refreshed_at,
+            'last_refresh_ms': None if self.last_refresh_ms is None else round(self.last_refresh_ms, 2),
+        }
+
+def group_denials(snapshot, columns, dimension, owner_id=None, date_from=None, date_to=None):
+    """Group the claims in scope by ``dimension`` with vectorized bincounts.
+
+    Returns (groups, total_claims, total_denied). For ``denial_code`` the
+    rate is each code's denials over every claim in scope.
+    """
+    import numpy as np
+
+    mask = None
+    conditions = []
+    if owner_id is not None:
+        conditions.append(columns['owner'] == owner_id)
+    if date_from is not None:
+        conditions.append(columns['day'] >= _epoch_day(date_from))
+    if date_to is not None:
+        conditions.append(columns['day'] <= _epoch_day(date_to))
+    for condition in conditions:
+        mask = condition if mask is None else mask & condition
+    denied = columns['denied'] if mask is None else mask & columns['denied']
+    total_denied = int(np.count_nonzero(denied))
+    if dimension == 'denial_code':
+        denied = denied & (columns['denial_code'] != NO_DENIAL)
+
+    # Row indexes plus take() are several times faster than boolean masks on large arrays
+    keys = columns[dimension]
+    selected_keys = keys if mask is None else keys.take(np.flatnonzero(mask))
+    total_claims = len(selected_keys)
+    denied_rows = np.flatnonzero(denied)
+    denied_keys = keys.take(denied_rows)
+
+    offset = 0
+    if dimension == 'denial_code':
+        labels = snapshot.denial_codes.values
+    elif dimension == 'provider':
+        labels = snapshot.providers.values
+    else:
+        labels = None
+        # Months count from 1970; bincount from the earliest month in scope
+        offset = int(selected_keys.min()) if total_claims else 0
+        selected_keys = selected_keys - offset
+        denied_keys = denied_keys - offset
+    size = len(labels) if labels is not None else int(selected_keys.max()) + 1 if total_claims else 0
+
+    denied_counts = np.bincount(denied_keys, minlength=size)
+    denied_cents = np.bincount(denied_keys, weights=columns['amount_cents'].take(denied_rows), minlength=size)
+    if dimension == 'denial_code':
+        claim_counts = np.full(size, total_claims)
+        present = denied_counts
+    else:
+        claim_counts = np.bincount(selected_keys, minlength=size)
+        present = claim_counts
+
+    groups = []
+    for index in np.flatnonzero(present):
+        claims, denials = int(claim_counts[index]), int(denied_counts[index])
+        group = {
+            dimension: _month_label(int(index) + offset) if labels is None else labels[index],
+            'claims': claims,
+            'denied': denials,
+            'denial_rate': round(denials / claims, 4) if claims else 0.0,
+            'share_of_denials': round(denials / total_denied, 4) if total_denied else 0.0,
+            'denied_amount': round(float(denied_cents[index]) / 100, 2),
+        }
+        if dimension == 'denial_code':
+            group['reason'] = DENIAL_CODES.get(group['denial_code'], 'Unknown denial code')
+        groups.append(group)
+    return groups, total_claims, total_denied
+
+def claim_snapshot():
+    """Return the current application's ClaimSnapshot."""
+    return current_app.extensions['analytics']
+
+def _scope_owner():
+    # Admins report over every claim; everyone else over their own
+    return None if current_user.role == 'admin' else current_user.id
+
+def _date_range():
+    """Return (date_from, date_to, error_message) from the query string."""
+    try:
+        date_from = request.args.get('service_date_from')
+        date_to = request.args.get('service_date_to')
+        return (
+            datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None,
+            datetime.strptime(date_to, '%Y-%m-%d').date() if date_to else None,
+            None,
+        )
+    except ValueError:
+        return None, None, 'Invalid date format. Use YYYY-MM-DD.'
+
+def _limit(default):
+    try:
+        return min(max(int(request.args.get('limit', default)), 1), MAX_LIMIT), None
+    except ValueError:
+        return None, 'limit must be a whole number'
+
+def _report(dimension, sort_key, reverse, limit):
+    date_from, date_to, error = _date_range()
+    if error:
+        return json_response({'error': error}, 400)
+    snapshot = claim_snapshot()
+    try:
+        columns = snapshot.current()
+        groups, total_claims, total_denied = group_denials(snapshot, columns, dimension, _scope_owner(),
+                                                           date_from, date_to)
+    except Exception as e:
+        current_app.logger.error(f'Analytics error: {e}')
+        return json_response({'error': 'Internal server error'}, 500)
+    groups.sort(key=sort_key, reverse=reverse)
+    if limit is not None:
+        groups = groups[:limit]
+    return json_response({
+        'data': groups,
+        'claims': total_claims,
+        'denied': total_denied,
+        'as_of': snapshot.refreshed_at,
+    })
+
+@analytics.route('/denial-rate')
+@login_required
+@require_role('manager')
+@limiter.limit("300 per hour")  # Dashboards issue several reports per view
+def denial_rate():
+    """Denial rate and denied dollars grouped ?by=provider (default), month or denial_code."""
+    dimension = request.args.get('by', 'provider')
+    if dimension not in DIMENSIONS:
+        return json_response({'error': f"by must be one of: {', '.join(DIMENSIONS)}"}, 400)
+    if dimension == 'month':
+        return _report('month', lambda group: group['month'], False, None)
+    limit, error = _limit(DEFAULT_LIMIT)
+    if error:
+        return json_response({'error': error}, 400)
+    return _report(dimension, lambda group: (group['denied'], group['denied_amount']), True, limit)
+
+@analytics.route('/top-denial-reasons')
+@login_required
+@require_role('manager')
+@limiter.limit("300 per hour")
+def top_denial_reasons():
+    """Denial codes ranked by denied dollars, with their reasons."""
+    limit, error = _limit(10)
+    if error:
+        return json_response({'error': error}, 400)
+    return _report('denial_code', lambda group: (group['denied_amount'], group['denied']), True, limit)
+
+@analytics.route('/status')
+@login_required
+@require_role('admin')
+def snapshot_status():
+    """Admin-only size and freshness of this worker's snapshot."""
+    return json_response(claim_snapshot().stats())
+
+def init_analytics(app):
+    """Attach the claim snapshot and the /api/analytics endpoints to the app."""
+    if not app.config.get('ANALYTICS_ENABLED', True):
+        return
+    app.extensions['analytics'] = ClaimSnapshot(
+        app.config.get('ANALYTICS_REFRESH_SECONDS', 10),
+        app.config.get('ANALYTICS_REBUILD_SECONDS', 3600),
+        app.config.get('ANALYTICS_WATERMARK_OVERLAP_SECONDS', 5),
+    )
+    app.register_blueprint(analytics, url_prefix='/api/analytics')
@@ -0,0 +1,201 @@
+"""
+Versioned, read-only JSON API for claims.
+
+Archived claims (see app/archive.py) are served alongside working ones.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from flask import Blueprint, Response, request, current_app
+from flask_login import login_required, current_user
+from sqlalchemy import select, union_all
+from app import db, limiter
+from app.models import Claim, Denial, Issue, ClaimArchive, DenialArchive, IssueArchive
+from app.security import sanitize_user_input, validate_provider_id, log_security_event
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson installed
+    orjson = None
+
+api = Blueprint('api', __name__)
+
+# Columns a client may request with ?fields=
+CLAIM_FIELDS = (
+    'id', 'claim_number', 'patient_id', 'provider_id', 'service_date',
+    'total_amount', 'status', 'created_at', 'updated_at', 'created_by',
+)
+ISSUE_FIELDS = ('id', 'claim_id', 'issue_type', 'description', 'severity', 'status', 'created_at')
+DENIAL_FIELDS = (
+    'id', 'claim_id', 'denial_code', 'denial_reason', 'denial_date',
+    'appeal_deadline', 'appeal_status', 'created_at',
+)
+EMBEDDABLE = {
+    'issues': ((Issue, IssueArchive), ISSUE_FIELDS),
+    'denials': ((Denial, DenialArchive), DENIAL_FIELDS),
+}
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+def json_response(payload, status=200):
+    """Serialize with orjson when available, falling back to the stdlib encoder."""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, default=_default, separators=(',', ':'))
+    return Response(body, status=status, mimetype='application/json')
+
+def _error(message, status=400):
+    return json_response({'error': message}, status)
+
+def encode_cursor(last_id):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return the claim id encoded in a cursor, or None if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        return None
+
+def _parse_fields(args):
+    """Return (fields, embeds, error_message) from ?fields= and ?embed=."""
+    fields = list(CLAIM_FIELDS)
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in CLAIM_FIELDS]
+        if unknown:
+            return None, None, f"Unknown fields: {', '.join(unknown)}"
+        if 'id' not in fields:
+            fields.insert(0, 'id')  # Needed for cursors and embeds
+
+    embeds = []
+    if args.get('embed'):
+        embeds = [embed.strip() for embed in args['embed'].split(',') if embed.strip()]
+        unknown = [embed for embed in embeds if embed not in EMBEDDABLE]
+        if unknown:
+            return None, None, f"Unknown embeds: {', '.join(unknown)}"
+    return fields, embeds, None
+
+def _select_claims(fields, model=Claim):
+    """SELECT only the requested claim columns, scoped to what the user may see."""
+    columns = [model.__table__.c[field] for field in fields]
+    query = select(*columns)
+
+    # Users can only see their own claims unless they are admin
+    if current_user.role != 'admin':
+        query = query.where(model.created_by == current_user.id)
+    return query
+
+def _embed_children(items, embeds):
+    """Attach related rows with one IN query per relation for the whole page."""
+    if not items or not embeds:
+        return
+    by_id = {item['id']: item for item in items}
+    for embed in embeds:
+        models, fields = EMBEDDABLE[embed]
+        for item in items:
+            item[embed] = []
+        for model in models:  # A claim's children are all in the working tables or all archived
+            columns = [model.__table__.c[field] for field in fields]
+            rows = db.session.execute(
+                select(*columns).where(model.claim_id.in_(list(by_id))).order_by(model.id)
+            ).mappings()
+            for row in rows:
+                by_id[row['claim_id']][embed].append(dict(row))
+
+@api.route('/claims')
+@login_required
+@limiter.limit("100 per hour")
+def list_claims():
+    """List claims newest first with cursor pagination, filters and sparse fieldsets."""
+    args = sanitize_user_input(request.args.to_dict())
+    fields, embeds, error = _parse_fields(args)
+    if error:
+        return _error(error)
+
+    try:
+        limit = min(max(int(args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return _error('limit must be a whole number')
+
+    last_id = None
+    if args.get('cursor'):
+        last_id = decode_cursor(args['cursor'])
+        if last_id is None:
+            return _error('Invalid cursor')
+    if args.get('provider_id'):
+        valid, msg = validate_provider_id(args['provider_id'])
+        if not valid:
+            return _error(msg)
+    try:
+        date_from = date_to = None
+        if args.get('service_date_from'):
+            date_from = datetime.strptime(args['service_date_from'], '%Y-%m-%d').date()
+        if args.get('service_date_to'):
+            date_to = datetime.strptime(args['service_date_to'], '%Y-%m-%d').date()
+    except ValueError:
+        return _error('Invalid date format. Use YYYY-MM-DD.')
+
+    # The same filters over working and archived claims; each arm walks its primary key newest first
+    arms = []
+    for model in (Claim, ClaimArchive):
+        query = _select_claims(fields, model).order_by(model.id.desc())
+        if last_id is not None:
+            query = query.where(model.id < last_id)
+        if args.get('status'):
+            query = query.where(model.status == args['status'])
+        if args.get('provider_id'):
+            query = query.where(model.provider_id == args['provider_id'])
+        if date_from:
+            query = query.where(model.service_date >= date_from)
+        if date_to:
+            query = query.where(model.service_date <= date_to)
+        arms.append(select(query.limit(limit + 1).subquery()))
+    merged = union_all(*arms).subquery()
+    query = select(*merged.c).order_by(merged.c.id.desc()).limit(limit + 1)
+
+    try:
+        rows = db.session.execute(query).mappings().all()
+        items = [dict(row) for row in rows[:limit]]
+        _embed_children(items, embeds)
+    except Exception as e:
+        current_app.logger.error(f'API claims list error: {e}')
+        return _error('Internal server error', 500)
+
+    next_cursor = encode_cursor(items[-1]['id']) if len(rows) > limit else None
+    return json_response({'data': items, 'next_cursor': next_cursor})
+
+@api.route('/claims/<int:claim_id>')
+@login_required
+@limiter.limit("100 per hour")
+def get_claim(claim_id):
+    """Return one claim, with the same fields/embed options as the list."""
+    fields, embeds, error = _parse_fields(sanitize_user_input(request.args.to_dict()))
+    if error:
+        return _error(error)
+
+    model = Claim
+    owner = db.session.execute(select(Claim.created_by).where(Claim.id == claim_id)).first()
+    if owner is None:
+        model = ClaimArchive
+        owner = db.session.execute(select(ClaimArchive.created_by).where(ClaimArchive.id == claim_id)).first()
+    if owner is None:
+        return _error('Claim not found', 404)
+
+    # Authorization check - users can only view their own claims unless admin
+    if current_user.role != 'admin' and owner.created_by != current_user.id:
+        log_security_event('UNAUTHORIZED_CLAIM_ACCESS', f'Attempted API access to claim {claim_id}', current_user.id)
+        return _error('Access denied', 403)
+
+    row = db.session.execute(_select_claims(fields, model).where(model.id == claim_id)).mappings().first()
+    item = dict(row)
+    _embed_children([item], embeds)
+    return json_response({'data': item})
@@ -0,0 +1,444 @@
+"""
+Appeal deadline worklist, the incremental tallies behind its bucket counts,
+and appeal letter generation.
+"""
+import io
+import os
+import zipfile
+from collections import Counter
+from datetime import datetime, timedelta
+from functools import lru_cache
+from flask import (
+    Blueprint, render_template, request, jsonify, flash, redirect, url_for, current_app,
+    Response, stream_with_context
+)
+from flask_login import login_required, current_user
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, TemplateNotFound
+from sqlalchemy import event, inspect, select, func, update
+from sqlalchemy.orm import Session
+from app import db, limiter
+from app.models import Claim, Denial, AppealDeadlineTally
+from app.routes import DENIAL_CODES
+from app.security import sanitize_user_input, validate_provider_id, log_security_event
+
+appeals = Blueprint('appeals', __name__)
+
+# Deadline horizons (in days) reported by the worklist
+DEADLINE_BUCKETS = (7, 14, 30)
+# Deadlines lapsed longer ago than this no longer count as overdue
+OVERDUE_WINDOW_DAYS = 30
+APPEAL_STATUSES = ('pending', 'submitted', 'approved', 'denied')
+WORKLIST_PAGE_SIZE = 50
+LETTER_CHUNK_SIZE = 100
+
+# Plain-text appeal letter templates, one per denial code with group/default fallbacks
+LETTER_TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates', 'appeals', 'letters')
+_letter_env = Environment(
+    loader=FileSystemLoader(LETTER_TEMPLATE_DIR),
+    autoescape=False,  # Letters are plain text, never rendered as HTML
+    undefined=StrictUndefined,
+    keep_trailing_newline=True,
+    auto_reload=False,
+)
+
+def _owner_filter(query):
+    """Restrict a query joined to Claim to the current user's claims unless admin."""
+    if current_user.role != 'admin':
+        query = query.where(Claim.created_by == current_user.id)
+    return query
+
+def appeal_bucket_counts(owner_id=None, today=None):
+    """Return pending appeal counts due within each deadline bucket.
+
+    Reads the precomputed tallies, so the cost is bounded by the number of
+    distinct deadlines in the window rather than the number of denials.
+    ``overdue`` counts deadlines missed in the last OVERDUE_WINDOW_DAYS.
+    ``owner_id`` of None means all owners.
+    """
+    today = today or datetime.now().date()
+    horizon = today + timedelta(days=max(DEADLINE_BUCKETS))
+    lapsed = today - timedelta(days=OVERDUE_WINDOW_DAYS)
+    table = AppealDeadlineTally.__table__
+
+    query = (
+        select(table.c.appeal_deadline, func.sum(table.c.pending_count))
+        .where(table.c.appeal_deadline >= lapsed, table.c.appeal_deadline <= horizon)
+        .group_by(table.c.appeal_deadline)
+    )
+    if owner_id is not None:
+        query = query.where(table.c.owner_id == owner_id)
+
+    counts = {f'next_{days}_days': 0 for days in DEADLINE_BUCKETS}
+    counts['overdue'] = 0
+    for deadline, pending in db.session.execute(query):
+        if not pending:
+            continue
+        if deadline < today:
+            counts['overdue'] += pending
+            continue
+        for days in DEADLINE_BUCKETS:
+            if deadline <= today + timedelta(days=days):
+                counts[f'next_{days}_days'] += pending
+    return counts
+
+def _worklist_query(args):
+    """Build the worklist SELECT from request arguments.
+
+    Returns (query, filters, error_message).
+    """
+    filters = sanitize_user_input({
+        'provider_id': args.get('provider_id', '').strip(),
+        'denial_code': args.get('denial_code', '').strip(),
+        'days': args.get('days', '').strip(),
+    })
+
+    # The (appeal_status, appeal_deadline) index serves both the filter and the ordering
+    query = (
+        select(Denial, Claim)
+        .join(Claim, Denial.claim_id == Claim.id)
+        .where(Denial.appeal_status == 'pending', Denial.appeal_deadline.isnot(None))
+        .order_by(Denial.appeal_deadline.asc(), Claim.total_amount.desc(), Denial.id.asc())
+    )
+    query = _owner_filter(query)
+
+    today = datetime.now().date()
+    if filters['days']:
+        try:
+            days = int(filters['days'])
+        except ValueError:
+            return None, filters, 'days must be a whole number'
+        query = query.where(Denial.appeal_deadline >= today,
+                            Denial.appeal_deadline <= today + timedelta(days=days))
+    else:
+        query = query.where(Denial.appeal_deadline >= today)
+
+    if filters['provider_id']:
+        valid, msg = validate_provider_id(filters['provider_id'])
+        if not valid:
+            return None, filters, msg
+        query = query.where(Claim.provider_id == filters['provider_id'])
+
+    if filters['denial_code']:
+        if filters['denial_code'] not in DENIAL_CODES:
+            return None, filters, 'Invalid denial code.'
+        query = query.where(Denial.denial_code == filters['denial_code'])
+
+    return query, filters, None
+
+def _page_number(args):
+    try:
+        return max(int(args.get('page', 1)), 1)
+    except (TypeError, ValueError):
+        return 1
+
+def _worklist_page(query, page):
+    rows = db.session.execute(
+        query.limit(WORKLIST_PAGE_SIZE + 1).offset((page - 1) * WORKLIST_PAGE_SIZE)
+    ).all()
+    return rows[:WORKLIST_PAGE_SIZE], len(rows) > WORKLIST_PAGE_SIZE
+
+def _bucket_owner():
+    return None if current_user.role == 'admin' else current_user.id
+
+@appeals.route('/appeals/worklist')
+@login_required
+@limiter.limit("100 per hour")
+def worklist():
+    page = _page_number(request.args)
+    query, filters, error = _worklist_query(request.args)
+    if error:
+        flash(error, 'error')
+        query, filters, _ = _worklist_query({})
+
+    try:
+        rows, has_next = _worklist_page(query, page)
+        buckets = appeal_bucket_counts(_bucket_owner())
+    except Exception as e:
+        current_app.logger.error(f'Appeal worklist error: {e}')
+        flash('Error loading appeal worklist.', 'error')
+        rows, has_next, buckets = [], False, {}
+
+    return render_template('appeals/worklist.html', rows=rows, buckets=buckets, filters=filters,
+                           page=page, has_next=has_next, today=datetime.now().date(),
+                           denial_codes=DENIAL_CODES, overdue_window=OVERDUE_WINDOW_DAYS)
+
+@appeals.route('/api/appeals/worklist')
+@login_required
+@limiter.limit("100 per hour")
+def worklist_api():
+    """API endpoint returning one page of the appeal worklist plus bucket counts."""
+    page = _page_number(request.args)
+    query, filters, error = _worklist_query(request.args)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        rows, has_next = _worklist_page(query, page)
+        buckets = appeal_bucket_counts(_bucket_owner())
+    except Exception as e:
+        current_app.logger.error(f'Appeal worklist API error: {e}')
+        return jsonify({'error': 'Internal server error'}), 500
+
+    today = datetime.now().date()
+    return jsonify({
+        'page': page,
+        'has_next': has_next,
+        'buckets': buckets,
+        'items': [
+            {
+                'denial_id': denial.id,
+                'claim_id': claim.id,
+                'claim_number': claim.claim_number,
+                'provider_id': claim.provider_id,
+                'total_amount': claim.total_amount,
+                'denial_code': denial.denial_code,
+                'denial_date': denial.denial_date.isoformat(),
+                'appeal_deadline': denial.appeal_deadline.isoformat(),
+                'days_remaining': (denial.appeal_deadline - today).days,
+            }
+            for denial, claim in rows
+        ],
+    })
+
+@appeals.route('/denials/<int:denial_id>/appeal-status', methods=['POST'])
+@login_required
+@limiter.limit("100 per hour")
+def update_appeal_status(denial_id):
+    denial = Denial.query.get_or_404(denial_id)
+    claim = denial.claim
+
+    # Authorization check - users can only update their own claims unless admin
+    if current_user.role != 'admin' and claim.created_by != current_user.id:
+        log_security_event('UNAUTHORIZED_CLAIM_ACCESS', f'Attempted appeal update on denial {denial_id}', current_user.id)
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.claims_list'))
+
+    appeal_status = sanitize_user_input(request.form.get('appeal_status', '').strip())
+    if appeal_status not in APPEAL_STATUSES:
+        flash('Invalid appeal status.', 'error')
+    else:
+        try:
+            denial.appeal_status = appeal_status
+            db.session.commit()
+            log_security_event('APPEAL_STATUS_CHANGED', f'Denial {denial_id} appeal status set to {appeal_status}', current_user.id)
+            flash('Appeal status updated.', 'success')
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f'Error updating appeal status: {e}')
+            flash('Error updating appeal status. Please try again.', 'error')
+
+    # Back to the worklist page the form was on; never to a URL taken from the request
+    if request.form.get('return_to') == 'worklist':
+        _, filters, _ = _worklist_query(request.form)
+        filters = {key: value for key, value in filters.items() if value}
+        return redirect(url_for('appeals.worklist', page=_page_number(request.form), **filters))
+    return redirect(url_for('main.view_claim', claim_id=claim.id))
+
+@lru_cache(maxsize=None)
+def letter_template(denial_code):
+    """Return the compiled letter template for a denial code.
+
+    Tries ``<code>.txt``, then the group template (e.g. ``PR.txt``), then
+    ``default.txt``. Compiled templates are cached for the process lifetime.
+    """
+    candidates = [f'{denial_code}.txt', f'{denial_code.split("-")[0]}.txt', 'default.txt']
+    for name in candidates:
+        try:
+            return _letter_env.get_template(name)
+        except TemplateNotFound:
+            continue
+    raise TemplateNotFound('default.txt')
+
+def appeal_letter_context(denial, claim, author=''):
+    """Build the plain-data context a letter template is rendered with."""
+    return {
+        'denial_id': denial.id,
+        'denial_code': denial.denial_code,
+        'denial_reason': denial.denial_reason,
+        'denial_date': denial.denial_date.isoformat(),
+        'appeal_deadline': denial.appeal_deadline.isoformat() if denial.appeal_deadline else None,
+        'claim_number': claim.claim_number,
+        'patient_id': claim.patient_id,
+        'provider_id': claim.provider_id,
+        'service_date': claim.service_date.isoformat(),
+        'total_amount': claim.total_amount,
+        'letter_date': datetime.now().date().strftime('%B %d, %Y'),
+        'author': author,
+    }
+
+def render_appeal_letter(context):
+    """Render one appeal letter from a context built by appeal_letter_context."""
+    return letter_template(context['denial_code']).render(context)
+
+class _ZipStream(io.RawIOBase):
+    """Write-only, unseekable sink that lets zipfile emit an archive incrementally."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _letter_rows(denial_ids):
+    """Yield (Denial, Claim) rows for the given ids visible to the current user."""
+    for start in range(0, len(denial_ids), LETTER_CHUNK_SIZE):
+        chunk = denial_ids[start:start + LETTER_CHUNK_SIZE]
+        query = (
+            select(Denial, Claim)
+            .join(Claim, Denial.claim_id == Claim.id)
+            .where(Denial.id.in_(chunk))
+            .order_by(Denial.id)
+        )
+        yield from db.session.execute(_owner_filter(query)).all()
+
+def _stream_letters_zip(denial_ids, persist, author):
+    """Render letters and yield a ZIP archive chunk by chunk.
+
+    Rendering is pure-Python Jinja work, so it runs in this thread: a pool
+    would only add scheduling overhead under the GIL.
+    """
+    sink = _ZipStream()
+    rendered = 0
+    with zipfile.ZipFile(sink, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        rows = list(_letter_rows(denial_ids))
+        for start in range(0, len(rows), LETTER_CHUNK_SIZE):
+            batch = rows[start:start + LETTER_CHUNK_SIZE]
+            contexts = [appeal_letter_context(denial, claim, author) for denial, claim in batch]
+            letters = [render_appeal_letter(context) for context in contexts]
+
+            for context, letter in zip(contexts, letters):
+                archive.writestr(f"appeal_{context['claim_number']}_{context['denial_id']}.txt", letter)
+                yield sink.drain()
+
+            if persist:
+                now = datetime.utcnow()
+                db.session.execute(update(Denial), [
+                    {'id': context['denial_id'], 'appeal_message': letter, 'updated_at': now}
+                    for context, letter in zip(contexts, letters)
+                ])
+            rendered += len(letters)
+
+    if persist:
+        db.session.commit()
+    log_security_event('APPEAL_LETTERS_GENERATED', f'Generated {rendered} appeal letters (persist={persist})', current_user.id)
+    yield sink.drain()
+
+@appeals.route('/appeals/letters', methods=['POST'])
+@login_required
+@limiter.limit("20 per hour")
+def appeal_letters():
+    """Render appeal letters for selected denials and stream them back as a ZIP."""
+    payload = request.get_json(silent=True)
+    if isinstance(payload, dict):
+        raw_ids = payload.get('denial_ids') or []
+        persist = bool(payload.get('persist'))
+    else:
+        raw_ids = request.form.getlist('denial_ids')
+        persist = request.form.get('persist') in ('1', 'true', 'on')
+
+    try:
+        denial_ids = list(dict.fromkeys(int(denial_id) for denial_id in raw_ids))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'denial_ids must contain integers'}), 400
+    if not denial_ids:
+        return jsonify({'error': 'Select at least one denial'}), 400
+
+    max_letters = current_app.config.get('APPEAL_LETTER_BATCH_MAX', 1000)
+    if len(denial_ids) > max_letters:
+        return jsonify({'error': f'Too many denials; at most {max_letters} letters per batch'}), 400
+
+    stream = _stream_letters_zip(denial_ids, persist, current_user.get_full_name())
+    response = Response(stream_with_context(stream), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename=appeal_letters_{datetime.now():%Y%m%d_%H%M%S}.zip'
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+@appeals.route('/denials/<int:denial_id>/appeal-letter')
+@login_required
+@limiter.limit("100 per hour")
+def appeal_letter(denial_id):
+    """Return the rendered appeal letter for one denial as plain text."""
+    rows = list(_letter_rows([denial_id]))
+    if not rows:
+        log_security_event('UNAUTHORIZED_CLAIM_ACCESS', f'Attempted letter access for denial {denial_id}', current_user.id)
+        return jsonify({'error': 'Not found'}), 404
+
+    denial, claim = rows[0]
+    letter = render_appeal_letter(appeal_letter_context(denial, claim, current_user.get_full_name()))
+    response = Response(letter, mimetype='text/plain')
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+def _pending_key(status, deadline):
+    """Tally key contribution for a denial state: the deadline if it counts, else None."""
+    if (status or 'pending') == 'pending' and deadline is not None:
+        return deadline
+    return None
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_appeal_tallies(session, flush_context):
+    """Keep AppealDeadlineTally in step with ORM writes to Denial.
+
+    Bulk Core statements bypass this hook and call AppealDeadlineTally.adjust
+    themselves.
+    """
+    changes = []  # (claim_id, deadline, delta)
+
+    for obj in session.new:
+        if isinstance(obj, Denial):
+            deadline = _pending_key(obj.appeal_status, obj.appeal_deadline)
+            if deadline is not None:
+                changes.append((obj.claim_id, deadline, 1))
+
+    for obj in session.deleted:
+        if isinstance(obj, Denial):
+            state = inspect(obj)
+            status = state.attrs.appeal_status.history
+            deadline = state.attrs.appeal_deadline.history
+            old_status = (status.deleted or status.unchanged or [obj.appeal_status])[0]
+            old_deadline = (deadline.deleted or deadline.unchanged or [obj.appeal_deadline])[0]
+            old_key = _pending_key(old_status, old_deadline)
+            if old_key is not None:
+                changes.append((obj.claim_id, old_key, -1))
+
+    for obj in session.dirty:
+        if not isinstance(obj, Denial) or obj in session.deleted:
+            continue
+        state = inspect(obj)
+        status = state.attrs.appeal_status.history
+        deadline = state.attrs.appeal_deadline.history
+        if not status.has_changes() and not deadline.has_changes():
+            continue
+        old_status = (status.deleted or status.unchanged or [None])[0]
+        old_deadline = (deadline.deleted or deadline.unchanged or [None])[0]
+        old_key = _pending_key(old_status, old_deadline)
+        new_key = _pending_key(obj.appeal_status, obj.appeal_deadline)
+        if old_key == new_key:
+            continue
+        if old_key is not None:
+            changes.append((obj.claim_id, old_key, -1))
+        if new_key is not None:
+            changes.append((obj.claim_id, new_key, 1))
+
+    if not changes:
+        return
+
+    connection = session.connection()
+    claim_ids = {claim_id for claim_id, _, _ in changes}
+    owners = dict(connection.execute(
+        select(Claim.id, Claim.created_by).where(Claim.id.in_(claim_ids))
+    ).all())
+
+    deltas = Counter()
+    for claim_id, deadline, delta in changes:
+        deltas[(owners.get(claim_id), deadline)] += delta
+    AppealDeadlineTally.adjust(connection, deltas)
@@ -0,0 +1,158 @@
+"""
+Hot/cold archival of finalized claims.
+
+archive_claims() moves claims that are settled, together with their denials
+and issues, from the working tables (``claim``, ``denial``, ``issue``) into
+``claim_archive``, ``denial_archive`` and ``issue_archive``. A claim is
+settled when it has not changed for ARCHIVE_AFTER_DAYS and is either
+approved or denied with every appeal closed: decided, or never filed and
+past its deadline by more than the same age. Rows keep their ids, and the
+working tables are AUTOINCREMENT on SQLite so an archived id is never handed
+out again. Each batch
+is copied with INSERT ... SELECT and deleted in the same transaction, so a
+claim is always in exactly one place.
+
+The claim page, the JSON API and CSV exports fall back to the archive tables,
+so archived claims stay reachable by id, number and filters. Risk tables and
+the analytics snapshot read both. Run ``flask archive run`` periodically;
+``flask archive stats`` shows row counts, sizes and B-tree depths.
+On SQLite the files only shrink after compact() (``--vacuum``).
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, exists, func, insert, literal, or_, select, text
+from app import db
+from app.models import (
+    Claim, Denial, Issue, ClaimArchive, DenialArchive, IssueArchive, AppealDeadlineTally, DataVersion
+)
+from app.routes import _chunked
+
+# (working model, archive model, claim id column), parents first
+ARCHIVES = (
+    (Claim, ClaimArchive, Claim.id),
+    (Denial, DenialArchive, Denial.claim_id),
+    (Issue, IssueArchive, Issue.claim_id),
+)
+
+def archivable(cutoff):
+    """Condition on Claim: settled and untouched since ``cutoff`` (a datetime)."""
+    open_appeal = exists().where(Denial.claim_id == Claim.id, or_(
+        Denial.updated_at >= cutoff,
+        Denial.appeal_status == 'submitted',
+        and_(Denial.appeal_status == 'pending',
+             or_(Denial.appeal_deadline.is_(None), Denial.appeal_deadline >= cutoff.date())),
+    ))
+    return and_(
+        Claim.updated_at < cutoff,
+        or_(Claim.status == 'approved', and_(Claim.status == 'denied', ~open_appeal)),
+    )
+
+def _move(connection, claim_ids, now):
+    """Copy the claims and their children to the archive, then delete them; return rows moved per table."""
+    moved = {}
+    for model, archive, claim_id in ARCHIVES:  # Parents first, so archive foreign keys hold
+        columns = [column.name for column in model.__table__.columns]
+        source = select(*model.__table__.columns).where(claim_id.in_(claim_ids))
+        if archive is ClaimArchive:
+            columns.append('archived_at')
+            source = source.add_columns(literal(now))
+        connection.execute(insert(archive).from_select(columns, source))
+    for model, _, claim_id in reversed(ARCHIVES):  # Children first, so working foreign keys hold
+        moved[model.__tablename__] = connection.execute(
+            delete(model).where(claim_id.in_(claim_ids)).execution_options(synchronize_session=False)
+        ).rowcount
+    return moved
+
+def archive_claims(older_than_days=365, batch_size=5000, limit=None, progress=None):
+    """Move settled claims older than ``older_than_days`` to the archive tables.
+
+    Commits once per ``batch_size`` claims and stops after ``limit`` claims
+    if given. Returns a Counter of rows moved per table.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+    totals = Counter()
+    last_id = 0
+    while limit is None or totals['claims'] < limit:
+        connection = db.session.connection()
+        size = batch_size if limit is None else min(batch_size, limit - totals['claims'])
+        rows = connection.execute(
+            select(Claim.id, Claim.created_by)
+            .where(Claim.id > last_id, archivable(cutoff))
+            .order_by(Claim.id).limit(size)
+            .with_for_update()
+        ).all()
+        if not rows:
+            break
+        claim_ids = [row.id for row in rows]
+        last_id = claim_ids[-1]
+
+        # Lapsed pending appeals leave the worklist tallies along with their claims
+        lapsed = Counter()
+        for chunk in _chunked(claim_ids):
+            lapsed.update({(owner_id, deadline): -count for owner_id, deadline, count in connection.execute(
+                select(Claim.created_by, Denial.appeal_deadline, func.count())
+                .join(Claim, Denial.claim_id == Claim.id)
+                .where(Denial.claim_id.in_(chunk), Denial.appeal_status == 'pending')
+                .group_by(Claim.created_by, Denial.appeal_deadline)
+            )})
+            moved = _move(connection, chunk, now)
+            totals.update(claims=moved['claim'], denials=moved['denial'], issues=moved['issue'])
+        AppealDeadlineTally.adjust(connection, lapsed)
+        DataVersion.bump_claims(connection, {row.created_by for row in rows})
+        db.session.commit()
+        if progress:
+            progress(totals)
+    return totals
+
+def compact():
+    """Return freed pages to the file with VACUUM (SQLite only); return whether it ran.
+
+    SQLite leaves pages emptied by the deletes on its freelist and keeps
+    half-empty pages as they are; only VACUUM rewrites the tables densely.
+    It locks the database while it runs, so schedule it off-hours.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.exec_driver_sql('VACUUM')
+    return True
+
+def table_stats(tables=('claim', 'denial', 'issue', 'claim_archive', 'denial_archive', 'issue_archive')):
+    """Return {table: {'rows', 'bytes', 'depth', 'indexes': {name: {'bytes', 'depth'}}}}.
+
+    Sizes and depths come from SQLite's dbstat table or PostgreSQL's
+    relation sizes; either is None where the database cannot report it.
+    """
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    stats = {}
+    for table in tables:
+        rows = connection.execute(text(f'SELECT COUNT(*) FROM {table}')).scalar()
+        stats[table] = {'rows': rows, 'bytes': None, 'depth': None, 'indexes': {}}
+
+    if dialect == 'sqlite':
+        try:
+            btrees = connection.execute(text(
+                "SELECT m.tbl_name, m.type, s.name, SUM(s.pgsize), "
+                "MAX(LENGTH(s.path) - LENGTH(REPLACE(s.path, '/', ''))) "
+                "FROM dbstat s JOIN sqlite_schema m ON m.name = s.name GROUP BY s.name"
+            )).all()
+        except Exception:  # dbstat is a compile-time option
+            btrees = []
+        for table, kind, name, size, depth in btrees:
+            if table not in stats:
+                continue
+            if kind == 'table':
+                stats[table].update(bytes=size, depth=depth)
+            else:
+                stats[table]['indexes'][name] = {'bytes': size, 'depth': depth}
+    elif dialect == 'postgresql':
+        for table in tables:
+            stats[table]['bytes'] = connection.execute(text('SELECT pg_relation_size(:t)'), {'t': table}).scalar()
+            for name, size in connection.execute(text(
+                'SELECT indexname, pg_relation_size(indexname::regclass) FROM pg_indexes WHERE tablename = :t'
+            ), {'t': table}):
+                stats[table]['indexes'][name] = {'bytes': size, 'depth': None}
+    return stats
@@ -0,0 +1,196 @@
+"""
+Cache for rendered page fragments.
+
+Keys embed the caller's data version (see DataVersion), so writes that bump
+the version invalidate affected fragments without explicit deletes; stale
+entries simply age out of the LRU or expire in Redis.
+"""
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from markupsafe import Markup
+
+class LRUCache:
+    """Thread-safe in-process LRU bounded by the total size of cached values."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value)
+        if size > self.max_bytes:
+            return  # Never let one oversized fragment flush the whole cache
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= len(previous)
+            self._items[key] = value
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.current_bytes -= len(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {'entries': len(self), 'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes, 'evictions': self.evictions}
+
+class InMemoryRedis:
+    """Minimal stand-in for a redis client (get/set with expiry/flushdb) for local use."""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._items[key]
+                return None
+            return value
+
+    def set(self, key, value, ex=None):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        expires_at = time.monotonic() + ex if ex else None
+        with self._lock:
+            self._items[key] = (value, expires_at)
+        return True
+
+    def flushdb(self):
+        with self._lock:
+            self._items.clear()
+        return True
+
+class RedisCache:
+    """Shared cache on a redis (or InMemoryRedis) client with a key prefix and TTL."""
+
+    def __init__(self, client, ttl=300, prefix='dms:fragment:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value.encode('utf-8'), ex=self.ttl)
+
+    def clear(self):
+        self.client.flushdb()
+
+    def stats(self):
+        return {'ttl': self.ttl}
+
+class FragmentCache:
+    """Front for a cache backend that records hit/miss counts per fragment name."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def _count(self, name, outcome):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hits': 0, 'misses': 0, 'errors': 0})
+            counts[outcome] += 1
+
+    def get_or_render(self, name, key_parts, render):
+        """Return the cached fragment for (name, *key_parts), rendering it on a miss."""
+        key = ':'.join([name, *(str(part) for part in key_parts)])
+        try:
+            cached = self.backend.get(key)
+        except Exception as e:  # A cache outage must never break the page
+            current_app.logger.warning(f'Fragment cache get failed: {e}')
+            self._count(name, 'errors')
+            cached = None
+        if cached is not None:
+            self._count(name, 'hits')
+            return Markup(cached)
+
+        self._count(name, 'misses')
+        html = render()
+        try:
+            self.backend.set(key, str(html))
+        except Exception as e:
+            current_app.logger.warning(f'Fragment cache set failed: {e}')
+        return Markup(html)
+
+    def stats(self):
+        with self._lock:
+            fragments = {name: dict(counts) for name, counts in self._counts.items()}
+        hits = sum(counts['hits'] for counts in fragments.values())
+        lookups = hits + sum(counts['misses'] for counts in fragments.values())
+        for counts in fragments.values():
+            total = counts['hits'] + counts['misses']
+            counts['hit_ratio'] = round(counts['hits'] / total, 4) if total else 0.0
+        return {
+            'backend': type(self.backend).__name__,
+            'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+            'fragments': fragments,
+            'store': self.backend.stats(),
+        }
+
+class _NullBackend:
+    """Backend used when caching is disabled: every lookup misses."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+    def stats(self):
+        return {}
+
+def _build_backend(config):
+    backend = config.get('CACHE_BACKEND', 'lru')
+    if backend == 'lru':
+        return LRUCache(config.get('CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    if backend == 'redis':
+        url = config.get('CACHE_REDIS_URL') or 'memory://'
+        if url == 'memory://':
+            client = InMemoryRedis()
+        else:
+            import redis
+            client = redis.Redis.from_url(url)
+        return RedisCache(client, ttl=config.get('CACHE_TTL', 300))
+    if backend == 'none':
+        return _NullBackend()
+    raise ValueError(f'Unknown CACHE_BACKEND: {backend}')
+
+def init_cache(app):
+    """Create the fragment cache configured by CACHE_BACKEND and attach it to the app."""
+    app.extensions['fragment_cache'] = FragmentCache(_build_backend(app.config))
+
+def fragment_cache():
+    """Return the current application's FragmentCache."""
+    return current_app.extensions['fragment_cache']
@@ -0,0 +1,246 @@
+"""
+Flask CLI commands (``flask <group> <command>``).
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+templates_cli = AppGroup('templates', help='Template maintenance commands.')
+
+@templates_cli.command('compile')
+def compile_templates():
+    """Precompile all templates into the Jinja bytecode cache."""
+    from app import warm_templates
+
+    if current_app.jinja_env.bytecode_cache is None:
+        raise click.ClickException('JINJA_BYTECODE_CACHE is disabled; nothing to precompile into.')
+
+    started = time.perf_counter()
+    count = warm_templates(current_app)
+    elapsed = (time.perf_counter() - started) * 1000
+    click.echo(f'Compiled {count} templates in {elapsed:.1f} ms')
+
+perf_cli = AppGroup('perf', help='Performance diagnostics.')
+
+# Modules that must only be imported by the code paths that use them
+HEAVY_MODULES = ('pandas', 'numpy')
+
+_STARTUP_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+create_app({config_name!r})
+print(json.dumps({{
+    'startup_ms': (time.perf_counter() - started) * 1000,
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    'module_count': len(sys.modules),
+    'heavy_loaded': [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def startup_profile(config_name=None, project_root=None):
+    """Create the app in a fresh interpreter with ``-X importtime`` and measure it.
+    
+    Returns the probe's measurements plus ``imports``: a list of
+    (cumulative_us, self_us, module) tuples, slowest first.
+    """
+    probe = _STARTUP_PROBE.format(config_name=config_name, heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', probe],
+        cwd=project_root, capture_output=True, text=True, check=True,
+    )
+    profile = json.loads(result.stdout.strip().splitlines()[-1])
+
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        imports.append((int(cumulative_us), int(self_us), module.strip()))
+    profile['imports'] = sorted(imports, reverse=True)
+    return profile
+
+@perf_cli.command('import-report')
+@click.option('--top', default=20, show_default=True, help='Number of slowest imports to list.')
+@click.option('--config', 'config_name', default=None, help='Config name (defaults to FLASK_CONFIG).')
+def import_report(top, config_name):
+    """Report app startup time, peak RSS and the slowest imports."""
+    profile = startup_profile(config_name, os.path.dirname(current_app.root_path))
+
+    click.echo(f"Startup:  {profile['startup_ms']:.0f} ms")
+    click.echo(f"Peak RSS: {profile['max_rss_kb'] / 1024:.1f} MB")
+    click.echo(f"Modules:  {profile['module_count']}")
+    if profile['heavy_loaded']:
+        click.echo(f"Heavy modules loaded at startup: {', '.join(profile['heavy_loaded'])}")
+    click.echo(f"\n{'cumulative ms':>14}{'self ms':>10}  module")
+    for cumulative_us, self_us, module in profile['imports'][:top]:
+        click.echo(f'{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {module}')
+
+@click.command('seed')
+@click.option('--claims', default=100_000, show_default=True, help='Claims to insert (0 to only write CSVs).')
+@click.option('--users', default=50, show_default=True, help='Users owning the claims (every tenth is a manager).')
+@click.option('--seed', 'seed', default=0, show_default=True, help='Random seed; same seed, same data.')
+@click.option('--prefix', default='SYN', show_default=True, help='Claim number prefix.')
+@click.option('--password', default='Seed#Passw0rd1', show_default=True, help='Password for created users.')
+@click.option('--batch-size', default=10000, show_default=True, help='Rows per multi-row insert.')
+@click.option('--commit-every', default=100_000, show_default=True, help='Claims per transaction.')
+@click.option('--csv-dir', type=click.Path(file_okay=False), help='Also write upload CSV files here.')
+@click.option('--csv-files', default=5, show_default=True, help='Number of CSV files.')
+@click.option('--csv-rows', default=1000, show_default=True, help='Rows per CSV file.')
+@click.option('--csv-duplicate-rate', default=0.02, show_default=True,
+              help='Share of CSV rows reusing seeded claim numbers.')
+def seed_command(claims, users, seed, prefix, password, batch_size, commit_every, csv_dir, csv_files, csv_rows,
+                 csv_duplicate_rate):
+    """Generate realistic users, claims, issues and denials."""
+    from app.seed import seed_users, seed_database, write_upload_csvs
+
+    started = time.perf_counter()
+    if claims:
+        owner_ids = seed_users(users, password)
+        try:
+            totals = seed_database(
+                claims, owner_ids, seed=seed, prefix=prefix, batch_size=batch_size, commit_every=commit_every,
+                progress=lambda totals: click.echo(f"  {totals['claims']:,} claims "
+                                                   f"({time.perf_counter() - started:.1f} s)"),
+            )
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"Inserted {totals['claims']:,} claims, {totals['issues']:,} issues and "
+                   f"{totals['denials']:,} denials for {len(owner_ids)} users in {time.perf_counter() - started:.1f} s")
+
+    if csv_dir:
+        paths = write_upload_csvs(csv_dir, csv_files, csv_rows, seed=seed, duplicate_rate=csv_duplicate_rate,
+                                  seeded_claims=claims, seeded_prefix=prefix)
+        click.echo(f'Wrote {len(paths)} CSV files to {csv_dir}')
+
+risk_cli = AppGroup('risk', help='Denial risk scoring.')
+
+@risk_cli.command('rebuild')
+def rebuild_risk():
+    """Recompute historical denial rates used to score new claims."""
+    from app.risk import rebuild_risk_tables
+
+    started = time.perf_counter()
+    rows = rebuild_risk_tables()
+    click.echo(f'Rebuilt {rows} denial rate rows in {time.perf_counter() - started:.1f} s')
+
+issues_cli = AppGroup('issues', help='Claim issue maintenance.')
+
+@issues_cli.command('reevaluate')
+@click.option('--as-of', type=click.DateTime(formats=['%Y-%m-%d']), help='Evaluate as of this date (default today).')
+@click.option('--full', is_flag=True, help='Ignore watermarks and evaluate every claim.')
+def reevaluate(as_of, full):
+    """Apply time-based issue rules to claims that crossed a threshold since the last run."""
+    from app.reevaluation import reevaluate_issues
+
+    started = time.perf_counter()
+    results = reevaluate_issues(as_of.date() if as_of else None, full=full)
+    for rule, result in results.items():
+        if result['skipped']:
+            click.echo(f'{rule}: already evaluated through {result["since"]}')
+            continue
+        scope = f'since {result["since"]}' if result['since'] else 'all claims'
+        click.echo(f'{rule} ({scope}): {result["created"]} created, {result["resolved"]} resolved')
+    click.echo(f'Done in {time.perf_counter() - started:.1f} s')
+
+archive_cli = AppGroup('archive', help='Hot/cold archival of finalized claims.')
+
+WORKING_TABLES = ('claim', 'denial', 'issue')
+
+def _size(value):
+    return '-' if value is None else f'{value / 1024 / 1024:.1f} MB'
+
+def _echo_table_stats(before, after=None):
+    """Print rows, size and B-tree depth per table and index; with ``after``, as before -> after."""
+    def pair(key, stats_before, stats_after, format_value=str):
+        text = format_value(stats_before.get(key))
+        return text if stats_after is None else f'{text} -> {format_value(stats_after.get(key))}'
+
+    click.echo(f"{'table / index':<36}{'rows':>26}{'size':>26}{'depth':>10}")
+    for table, stats in before.items():
+        stats_after = after[table] if after else None
+        click.echo(f"{table:<36}{pair('rows', stats, stats_after, '{:,}'.format):>26}"
+                   f"{pair('bytes', stats, stats_after, _size):>26}{pair('depth', stats, stats_after):>10}")
+        for index, index_stats in stats['indexes'].items():
+            index_after = stats_after['indexes'].get(index, {}) if stats_after else None
+            click.echo(f"  {index:<34}{'':>26}{pair('bytes', index_stats, index_after, _size):>26}"
+                       f"{pair('depth', index_stats, index_after):>10}")
+
+@archive_cli.command('run')
+@click.option('--older-than-days', type=int, help='Archive claims unchanged for this long (default ARCHIVE_AFTER_DAYS).')
+@click.option('--batch-size', type=int, help='Claims per transaction (default ARCHIVE_BATCH_SIZE).')
+@click.option('--limit', type=int, help='Stop after archiving this many claims.')
+@click.option('--vacuum', is_flag=True, help='Compact the SQLite database afterwards (locks it while running).')
+def run_archive(older_than_days, batch_size, limit, vacuum):
+    """Move settled claims and their denials and issues to the archive tables."""
+    from app.archive import archive_claims, compact, table_stats
+
+    before = table_stats(WORKING_TABLES)
+    started = time.perf_counter()
+    totals = archive_claims(
+        older_than_days or current_app.config.get('ARCHIVE_AFTER_DAYS', 365),
+        batch_size or current_app.config.get('ARCHIVE_BATCH_SIZE', 5000),
+        limit,
+        progress=lambda totals: click.echo(f"  {totals['claims']:,} claims ({time.perf_counter() - started:.1f} s)"),
+    )
+    click.echo(f"Archived {totals['claims']:,} claims, {totals['denials']:,} denials and {totals['issues']:,} "
+               f"issues in {time.perf_counter() - started:.1f} s")
+    if vacuum:
+        started = time.perf_counter()
+        if compact():
+            click.echo(f'Compacted the database in {time.perf_counter() - started:.1f} s')
+        else:
+            click.echo('--vacuum only applies to SQLite; skipped')
+    click.echo()
+    _echo_table_stats(before, table_stats(WORKING_TABLES))
+
+@archive_cli.command('stats')
+def archive_stats():
+    """Show rows, size and B-tree depth of the working and archive tables."""
+    from app.archive import table_stats
+
+    _echo_table_stats(table_stats())
+
+remittance_cli = AppGroup('remittance', help='Payer remittance (X12 835) files.')
+
+@remittance_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', type=int, help='Denied claims per batch (default REMITTANCE_BATCH_SIZE).')
+@click.option('--unmatched', 'unmatched_path', type=click.Path(dir_okay=False, writable=True),
+              help='Write every unmatched denied claim to this CSV file.')
+def import_remittance(path, batch_size, unmatched_path):
+    """Create denials from an 835 file of any size."""
+    import csv
+    from app.remittance import ingest_835
+
+    with open(path, 'rb') as stream, open(unmatched_path or os.devnull, 'w', newline='') as report:
+        writer = csv.writer(report)
+        writer.writerow(['claim_number', 'denial_code', 'reason'])
+        try:
+            summary = ingest_835(stream, batch_size, writer if unmatched_path else None)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"Read {summary['claims']:,} claims, {summary['denials']:,} denied by the payer: "
+               f"{summary['denied']:,} denials created, {summary['not_pending']:,} not pending, "
+               f"{summary['unmatched']:,} unmatched ({summary['seconds']:.1f} s)")
+    for code, count in summary['codes'].items():
+        click.echo(f'  {code:<10}{count:>10,}')
+    if summary['unmatched'] and not unmatched_path:
+        shown = summary['unmatched_claims'][:20]
+        click.echo(f"Unmatched: {', '.join(row['claim_number'] for row in shown)}"
+                   f"{' ...' if summary['unmatched'] > len(shown) else ''} (list all with --unmatched)")
+
+def register_commands(app):
+    """Attach all command groups to the application's CLI."""
+    app.cli.add_command(templates_cli)
+    app.cli.add_command(perf_cli)
+    app.cli.add_command(seed_command)
+    app.cli.add_command(risk_cli)
+    app.cli.add_command(issues_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(remittance_cli)
@@ -0,0 +1,143 @@
+"""
+Response compression negotiated on Accept-Encoding.
+
+gzip is always available; zstd and brotli are used when the optional
+``zstandard`` / ``brotli`` packages are installed. Responses that rendered a
+CSRF token are never compressed, whatever their blueprint.
+"""
+import zlib
+from flask import request, current_app, g
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+class _GzipCompressor:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)  # 31 = gzip container
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+class _ZstdCompressor:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+class _BrotliCompressor:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+def available_encodings():
+    """Return {content-coding: compressor class} for the codecs importable here."""
+    encodings = {'gzip': _GzipCompressor}
+    if zstandard is not None:
+        encodings['zstd'] = _ZstdCompressor
+    if brotli is not None:
+        encodings['br'] = _BrotliCompressor
+    return encodings
+
+def _compression_enabled(config):
+    blueprint = request.blueprint
+    per_blueprint = config.get('COMPRESSION_BLUEPRINTS', {})
+    if blueprint in per_blueprint:
+        return per_blueprint[blueprint]
+    return config.get('COMPRESSION_ENABLED', True)
+
+def _choose_encoding(config):
+    """Pick the best encoding both sides support, in the server's preference order."""
+    encodings = available_encodings()
+    offered = [name for name in config.get('COMPRESSION_ALGORITHMS', ['gzip']) if name in encodings]
+    if not offered:
+        return None
+    return request.accept_encodings.best_match(offered)
+
+def _should_skip(response, config):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return True
+    if response.direct_passthrough:  # send_file and friends
+        return True
+    if 'Content-Encoding' in response.headers:
+        return True
+    if 'no-transform' in response.headers.get('Cache-Control', ''):
+        return True
+    if config.get('WTF_CSRF_FIELD_NAME', 'csrf_token') in g:
+        return True  # The page rendered csrf_token(); compressing it next to reflected input allows BREACH
+    if response.mimetype not in config.get('COMPRESSION_MIMETYPES', []):
+        return True  # Also skips ZIPs, images and other already-compressed content
+    if not response.is_streamed and response.calculate_content_length() < config.get('COMPRESSION_MIN_SIZE', 500):
+        return True
+    return False
+
+def _compress_stream(chunks, compressor, original):
+    """Compress an iterable of byte chunks, flushing after each so data keeps flowing."""
+    try:
+        for chunk in chunks:
+            if not chunk:
+                continue
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+    finally:
+        if hasattr(original, 'close'):
+            original.close()
+
+def compress_response(response):
+    """after_request hook that compresses eligible responses."""
+    config = current_app.config
+    if not _compression_enabled(config) or _should_skip(response, config):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = _choose_encoding(config)
+    if encoding is None:
+        return response
+
+    compressor = available_encodings()[encoding](config.get('COMPRESSION_LEVEL', 6))
+    if response.is_streamed:
+        original = response.response
+        response.response = _compress_stream(response.iter_encoded(), compressor, original)
+        response.headers.pop('Content-Length', None)
+    else:
+        response.set_data(compressor.compress(response.get_data()) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    # The representation changed, so a strong validator no longer applies byte-for-byte
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def init_compression(app):
+    """Register the compression hook on the application."""
+    app.after_request(compress_response)
@@ -0,0 +1,374 @@
+"""
+Runtime metrics in Prometheus text format.
+
+Each process records into its own in-memory registry. When
+METRICS_MULTIPROC_DIR is set (one shared directory per deployment, emptied
+on start), every worker periodically writes a JSON snapshot there and
+``/metrics`` merges all snapshots, so a scrape of any gunicorn worker sees
+totals for the whole server. When a worker exits, mark_process_dead() folds
+its counters and histograms into one archive snapshot and removes its file,
+so restarts under max_requests do not leave a file per dead worker.
+"""
+import atexit
+import glob
+import hmac
+import json
+import os
+import threading
+import time
+from flask import Blueprint, Response, current_app, g, has_request_context, request, abort
+from flask_login import current_user
+from sqlalchemy import event
+from app import db, limiter
+
+metrics = Blueprint('metrics', __name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+RATE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+# name: (type, help, buckets)
+METRICS = {
+    'dms_http_requests_total': ('counter', 'HTTP requests by endpoint, method and status.', None),
+    'dms_http_request_duration_seconds': ('histogram', 'Request latency by endpoint.', LATENCY_BUCKETS),
+    'dms_request_sql_statements': ('histogram', 'SQL statements executed per request.', COUNT_BUCKETS),
+    'dms_request_sql_duration_seconds': ('histogram', 'Time spent in SQL per request.', LATENCY_BUCKETS),
+    'dms_sql_statements_total': ('counter', 'SQL statements executed.', None),
+    'dms_rate_limit_rejections_total': ('counter', 'Requests rejected by the rate limiter.', None),
+    'dms_upload_rows_total': ('counter', 'CSV upload rows by outcome.', None),
+    'dms_upload_rows_per_second': ('histogram', 'Rows processed per second by each CSV upload.', RATE_BUCKETS),
+    'dms_db_pool_checkout_wait_seconds': ('histogram', 'Time spent waiting for a pooled DB connection, '
+                                          'including any pre-ping.', WAIT_BUCKETS),
+    'dms_db_pool_checked_out': ('gauge', 'Connections currently checked out, per process.', None),
+    'dms_db_pool_checked_out_max': ('gauge', 'Most connections checked out at once, per process.', None),
+    'dms_db_pool_overflow': ('gauge', 'Connections open beyond the pool size, per process.', None),
+    'dms_db_pool_overflow_max': ('gauge', 'Most connections open beyond the pool size at once, per process.', None),
+    'dms_db_pool_size': ('gauge', 'Configured pool size, per process.', None),
+    'dms_db_pool_connections_total': ('counter', 'DB connections opened by the pool, by profile.', None),
+}
+
+ARCHIVE_FILE = 'metrics_archive.json'  # Totals of exited workers
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms for one process."""
+
+    def __init__(self, multiproc_dir=None, flush_interval=5.0):
+        self.multiproc_dir = multiproc_dir
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def _check_fork(self):
+        # A forked worker must not re-report what its parent recorded before the fork
+        if os.getpid() != self._pid:
+            self._reset()
+
+    def inc(self, name, labels=None, amount=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_fork()
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_gauge(self, name, value, labels=None):
+        with self._lock:
+            self._check_fork()
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, labels=None):
+        buckets = METRICS[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._check_fork()
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    state[0][index] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def snapshot(self):
+        """Return this process's samples in a JSON-serializable form."""
+        with self._lock:
+            self._check_fork()
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                'gauges': [[name, list(labels) + [('pid', str(self._pid))], value]
+                           for (name, labels), value in self._gauges.items()],
+                'histograms': [[name, list(labels), list(state[0]), state[1], state[2]]
+                               for (name, labels), state in self._histograms.items()],
+            }
+
+    def flush(self, force=False):
+        """Write this process's snapshot to the multiprocess directory, at most every flush_interval."""
+        if not self.multiproc_dir:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_flush < self.flush_interval:
+            return
+        self._last_flush = now
+        os.makedirs(self.multiproc_dir, exist_ok=True)
+        _write_snapshot(_snapshot_path(self.multiproc_dir, os.getpid()), self.snapshot())
+
+    def collect(self):
+        """Merge snapshots from every process (or just this one) into totals."""
+        if not self.multiproc_dir:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush(force=True)
+            archive = _read_snapshot(os.path.join(self.multiproc_dir, ARCHIVE_FILE))
+            # A folded worker's file may outlive the archive write for a moment; count it once
+            folded = {_snapshot_path(self.multiproc_dir, pid) for pid in archive.get('folded', ())}
+            snapshots = [archive] if archive else []
+            for path in glob.glob(os.path.join(self.multiproc_dir, 'metrics_*.json')):
+                if path not in folded and os.path.basename(path) != ARCHIVE_FILE:
+                    snapshot = _read_snapshot(path)
+                    if snapshot:
+                        snapshots.append(snapshot)
+        return merge_snapshots(snapshots)
+
+    def render(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        return render_prometheus(self.collect())
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+def _snapshot_path(multiproc_dir, pid):
+    return os.path.join(multiproc_dir, f'metrics_{pid}.json')
+
+def _read_snapshot(path):
+    """Return the snapshot at ``path``, or {} if it is missing or unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}  # Worker exiting or file replaced mid-read
+
+def _write_snapshot(path, snapshot):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(temp_path, path)  # Readers never see a half-written file
+
+def mark_process_dead(multiproc_dir, pid):
+    """Fold an exited worker's snapshot into the archive and remove its file; return whether it had one.
+
+    Counters and histograms keep counting in the archive, so totals never go
+    backwards. Gauges described the dead process only and are dropped. Run
+    from the gunicorn master, which reaps one worker at a time.
+    """
+    path = _snapshot_path(multiproc_dir, pid)
+    dead = _read_snapshot(path)
+    if not dead:
+        return False
+    archive_path = os.path.join(multiproc_dir, ARCHIVE_FILE)
+    archive = _read_snapshot(archive_path)
+    merged = merge_snapshots([archive, dead] if archive else [dead])
+    _write_snapshot(archive_path, {
+        'counters': [[name, list(labels), value] for (name, labels), value in merged['counters'].items()],
+        'gauges': [],
+        'histograms': [[name, list(labels), buckets, total, count]
+                       for (name, labels), (buckets, total, count) in merged['histograms'].items()],
+        'folded': [pid],  # collect() skips its file until it is removed below
+    })
+    os.remove(path)
+    return True
+
+def merge_snapshots(snapshots):
+    """Sum counters and histograms across processes; gauges stay per pid."""
+    counters, gauges, histograms = {}, {}, {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, value in snapshot['gauges']:
+            gauges[(name, tuple(map(tuple, labels)))] = value
+        for name, labels, buckets, total, count in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+            merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+            merged[1] += total
+            merged[2] += count
+    return {'counters': counters, 'gauges': gauges, 'histograms': histograms}
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render_prometheus(merged):
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            for (metric, labels), (counts, total, count) in sorted(merged['histograms'].items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", _number(float(bound))),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {count}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(float(total))}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+        else:
+            samples = merged['counters'] if kind == 'counter' else merged['gauges']
+            for (metric, labels), value in sorted(samples.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+def metrics_registry():
+    """Return the current application's MetricsRegistry."""
+    return current_app.extensions['metrics']
+
+def observe_upload(created, skipped, seconds):
+    """Record one CSV upload's row counts and throughput."""
+    registry = current_app.extensions.get('metrics')
+    if registry is None:
+        return
+    registry.inc('dms_upload_rows_total', {'outcome': 'created'}, created)
+    registry.inc('dms_upload_rows_total', {'outcome': 'skipped'}, skipped)
+    if seconds > 0:
+        registry.observe('dms_upload_rows_per_second', (created + skipped) / seconds)
+
+def _instrument_engine(engine, registry, profile):
+    """Count SQL statements/time per request, time pool checkouts and track pool occupancy."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['metrics_started'].pop()
+        registry.inc('dms_sql_statements_total')
+        if has_request_context() and 'metrics_sql_count' in g:
+            g.metrics_sql_count += 1
+            g.metrics_sql_seconds += elapsed
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        if context.connection is not None and context.connection.info.get('metrics_started'):
+            context.connection.info['metrics_started'].pop()
+
+    # Pool events: new DBAPI connections, and occupancy as connections go out and come back
+    labels = {'profile': profile}
+    peaks = {'pid': os.getpid(), 'checked_out': -1, 'overflow': -1}  # Highest values seen in this process
+
+    @event.listens_for(engine, 'connect')
+    def _connect(dbapi_connection, connection_record):
+        registry.inc('dms_db_pool_connections_total', labels)
+
+    @event.listens_for(engine, 'checkout')
+    def _checkout(dbapi_connection, connection_record, connection_proxy):
+        current = _record_pool_gauges(engine, registry, profile)
+        if peaks['pid'] != os.getpid():
+            peaks.update(pid=os.getpid(), checked_out=-1, overflow=-1)
+        for key in ('checked_out', 'overflow'):
+            if current.get(key) is not None and current[key] > peaks[key]:
+                peaks[key] = current[key]
+                registry.set_gauge(f'dms_db_pool_{key}_max', current[key], labels)
+
+    @event.listens_for(engine, 'checkin')
+    def _checkin(dbapi_connection, connection_record):
+        _record_pool_gauges(engine, registry, profile)
+
+    # Connection() checks out through engine.raw_connection(); time how long that blocks
+    raw_connection = engine.raw_connection
+
+    def timed_raw_connection(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return raw_connection(*args, **kwargs)
+        finally:
+            registry.observe('dms_db_pool_checkout_wait_seconds', time.perf_counter() - started, labels)
+
+    engine.raw_connection = timed_raw_connection
+
+def _record_pool_gauges(engine, registry, profile):
+    """Set the pool gauges from ``engine``'s pool; return the values set, by name."""
+    pool = engine.pool
+    labels = {'profile': profile}
+    current = {}
+    if hasattr(pool, 'checkedout'):  # StaticPool and NullPool keep no counts
+        current['checked_out'] = pool.checkedout()
+    if hasattr(pool, 'overflow'):
+        current['overflow'] = max(pool.overflow(), 0)  # Negative while the pool is not yet full
+    if hasattr(pool, 'size'):
+        current['size'] = pool.size()
+    for key, value in current.items():
+        registry.set_gauge(f'dms_db_pool_{key}', value, labels)
+    return current
+
+def _authorized():
+    token = current_app.config.get('METRICS_TOKEN')
+    header = request.headers.get('Authorization', '')
+    if token and header.startswith('Bearer ') and hmac.compare_digest(header[len('Bearer '):], token):
+        return True
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+@metrics.route('/metrics')
+@limiter.exempt  # Scraped every few seconds
+def metrics_endpoint():
+    """Admin-only (or METRICS_TOKEN bearer) Prometheus scrape endpoint."""
+    if not _authorized():
+        abort(403)
+    registry = metrics_registry()
+    _record_pool_gauges(db.engine, registry, current_app.config.get('POOL_PROFILE'))
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+def init_metrics(app):
+    """Attach the metrics registry, request hooks and SQL listeners to the app."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    registry = MetricsRegistry(app.config.get('METRICS_MULTIPROC_DIR'), app.config.get('METRICS_FLUSH_INTERVAL', 5.0))
+    app.extensions['metrics'] = registry
+    app.register_blueprint(metrics)
+
+    with app.app_context():
+        _instrument_engine(db.engine, registry, app.config.get('POOL_PROFILE'))
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+
+    @app.after_request
+    def _record_request_metrics(response):
+        endpoint = request.endpoint or 'unmatched'  # Never label by raw path
+        if response.status_code == 429:
+            # Global limits reject before our before_request hook has run
+            registry.inc('dms_rate_limit_rejections_total', {'endpoint': endpoint})
+        if 'metrics_started' not in g or endpoint == 'static':
+            return response
+        registry.inc('dms_http_requests_total',
+                     {'endpoint': endpoint, 'method': request.method, 'status': str(response.status_code)})
+        registry.observe('dms_http_request_duration_seconds', time.perf_counter() - g.metrics_started,
+                         {'endpoint': endpoint})
+        registry.observe('dms_request_sql_statements', g.metrics_sql_count, {'endpoint': endpoint})
+        registry.observe('dms_request_sql_duration_seconds', g.metrics_sql_seconds, {'endpoint': endpoint})
+        registry.flush()
+        return response
+
+    atexit.register(registry.flush, force=True)
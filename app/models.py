@@ -1,4 +1,6 @@
+import hashlib
 from datetime import datetime
+from sqlalchemy import event
 from app import db
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -35,41 +37,77 @@ class Claim(db.Model):
     claim_number = db.Column(db.String(50), unique=True, nullable=False)
     patient_id = db.Column(db.String(50), nullable=False)
     provider_id = db.Column(db.String(50), nullable=False)
-    service_date = db.Column(db.Date, nullable=False)
+    service_date = db.Column(db.Date, nullable=False, index=True)  # Range scans for time-based rules
     total_amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='pending')  # pending, denied, approved
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Add user tracking
     created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
     
+    # Same patient/provider/date/amount under any claim number (see claim_fingerprint)
+    fingerprint = db.Column(db.String(32), index=True)
+    
+    # Estimated probability of denial when the claim was entered (see app/risk.py)
+    risk_score = db.Column(db.Float)
+    
     # Relationships
     denials = db.relationship('Denial', backref='claim', lazy=True)
     issues = db.relationship('Issue', backref='claim', lazy=True)
     creator = db.relationship('User', backref='created_claims')
     
+    # Archived rows keep their ids, so SQLite must never hand one out again (max(id) + 1 would)
+    __table_args__ = {'sqlite_autoincrement': True}
+    
     def __repr__(self):
         return f'<Claim {self.claim_number}>'
 
+def claim_fingerprint(patient_id, provider_id, service_date, total_amount):
+    """Hash of the normalized fields that identify a resubmission of the same service."""
+    if isinstance(service_date, str):
+        service_date = datetime.strptime(service_date[:10], '%Y-%m-%d').date()
+    key = '|'.join([
+        str(patient_id).strip().upper(),
+        str(provider_id).strip().upper(),
+        service_date.isoformat(),
+        str(int(round(float(total_amount) * 100))),  # Cents, so 100 and 100.00 match
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+@event.listens_for(Claim, 'before_insert')
+@event.listens_for(Claim, 'before_update')
+def _set_claim_fingerprint(mapper, connection, target):
+    if None not in (target.patient_id, target.provider_id, target.service_date, target.total_amount):
+        target.fingerprint = claim_fingerprint(target.patient_id, target.provider_id, target.service_date,
+                                               target.total_amount)
+
 class Denial(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    claim_id = db.Column(db.Integer, db.ForeignKey('claim.id'), nullable=False)
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim.id'), nullable=False, index=True)
     denial_code = db.Column(db.String(20), nullable=False)
     denial_reason = db.Column(db.Text, nullable=False)
     denial_date = db.Column(db.Date, nullable=False)
-    appeal_deadline = db.Column(db.Date)
-    appeal_status = db.Column(db.String(20), default='pending')  # pending, submitted, approved, denied
+    # active_history: the appeal tallies need the old values even when only one of them is changed
+    appeal_deadline = db.column_property(db.Column(db.Date), active_history=True)
+    appeal_status = db.column_property(db.Column(db.String(20), default='pending'),  # pending, submitted, approved, denied
+                                       active_history=True)
     appeal_message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    
+    # Backs the appeal worklist: range scans of pending appeals by deadline
+    __table_args__ = (
+        db.Index('ix_denial_appeal_status_deadline', 'appeal_status', 'appeal_deadline'),
+        {'sqlite_autoincrement': True},  # Ids of archived denials are never reused
+    )
     
     def __repr__(self):
         return f'<Denial {self.denial_code} for Claim {self.claim_id}>'
 
 class Issue(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    claim_id = db.Column(db.Integer, db.ForeignKey('claim.id'), nullable=False)
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim.id'), nullable=False, index=True)
     issue_type = db.Column(db.String(50), nullable=False)  # missing_code, invalid_code, documentation, etc.
     description = db.Column(db.Text, nullable=False)
     severity = db.Column(db.String(20), default='medium')  # low, medium, high
@@ -78,5 +116,239 @@ class Issue(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Lets re-evaluation find the open issues of one type without a scan
+    __table_args__ = (
+        db.Index('ix_issue_type_status', 'issue_type', 'status'),
+        {'sqlite_autoincrement': True},  # Ids of archived issues are never reused
+    )
+    
+    def __repr__(self):
+        return f'<Issue {self.issue_type} for Claim {self.claim_id}>' 
+
+class ClaimArchive(db.Model):
+    """A finalized claim moved out of the working tables (see app/archive.py).
+    
+    Columns mirror Claim, ids included, so links and exports keep working.
+    """
+    __tablename__ = 'claim_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    claim_number = db.Column(db.String(50), unique=True, nullable=False)
+    patient_id = db.Column(db.String(50), nullable=False)
+    provider_id = db.Column(db.String(50), nullable=False)
+    service_date = db.Column(db.Date, nullable=False)
+    total_amount = db.Column(db.Float, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
+    fingerprint = db.Column(db.String(32))
+    risk_score = db.Column(db.Float)
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    denials = db.relationship('DenialArchive', backref='claim', lazy=True, order_by='DenialArchive.id')
+    issues = db.relationship('IssueArchive', backref='claim', lazy=True, order_by='IssueArchive.id')
+    creator = db.relationship('User')
+    
+    def __repr__(self):
+        return f'<ClaimArchive {self.claim_number}>'
+
+class DenialArchive(db.Model):
+    __tablename__ = 'denial_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim_archive.id'), nullable=False, index=True)
+    denial_code = db.Column(db.String(20), nullable=False)
+    denial_reason = db.Column(db.Text, nullable=False)
+    denial_date = db.Column(db.Date, nullable=False)
+    appeal_deadline = db.Column(db.Date)
+    appeal_status = db.Column(db.String(20))
+    appeal_message = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<DenialArchive {self.denial_code} for Claim {self.claim_id}>'
+
+class IssueArchive(db.Model):
+    __tablename__ = 'issue_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    claim_id = db.Column(db.Integer, db.ForeignKey('claim_archive.id'), nullable=False, index=True)
+    issue_type = db.Column(db.String(50), nullable=False)
+    description = db.Column(db.Text, nullable=False)
+    severity = db.Column(db.String(20))
+    status = db.Column(db.String(20))
+    resolution_notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<IssueArchive {self.issue_type} for Claim {self.claim_id}>'
+
+class UploadRecord(db.Model):
+    """A completed claims upload, identified by the SHA-256 of the file's bytes.
+    
+    Re-sending a file the same user already uploaded returns this result
+    instead of parsing the file again.
+    """
+    __tablename__ = 'upload_record'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    claims_created = db.Column(db.Integer, nullable=False, default=0)
+    claims_skipped = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_upload_record_user_hash', 'user_id', 'content_hash'),
+    )
+    
+    @classmethod
+    def prior(cls, user_id, content_hash):
+        """Return the user's latest upload of the same content, or None."""
+        return (cls.query.filter_by(user_id=user_id, content_hash=content_hash)
+                .order_by(cls.id.desc()).first())
+    
+    def __repr__(self):
+        return f'<UploadRecord {self.filename} {self.content_hash[:12]}>'
+
+def _upsert_increment(connection, table, key_columns, counter_column, rows, replace_columns=()):
+    """Insert rows, or add their counter value to the existing row with the same key.
+    
+    Columns named in ``replace_columns`` are overwritten on conflict.
+    """
+    if not rows:
+        return
+    
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        set_ = {counter_column: table.c[counter_column] + stmt.excluded[counter_column]}
+        set_.update({column: stmt.excluded[column] for column in replace_columns})
+        stmt = stmt.on_conflict_do_update(index_elements=key_columns, set_=set_)
+        connection.execute(stmt, rows)
+        return
+    
+    # Generic fallback: update, then insert the keys that did not exist yet
+    for row in rows:
+        values = {counter_column: table.c[counter_column] + row[counter_column]}
+        values.update({column: row[column] for column in replace_columns})
+        result = connection.execute(
+            table.update()
+            .where(*[table.c[key] == row[key] for key in key_columns])
+            .values(values)
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert(), row)
+
+class AppealDeadlineTally(db.Model):
+    """Precomputed count of pending appeals per claim owner and deadline.
+    
+    Kept up to date incrementally whenever denials are created or their
+    appeal status/deadline changes, so deadline bucket counts only need to
+    sum a handful of rows instead of scanning the denial table.
+    """
+    __tablename__ = 'appeal_deadline_tally'
+    
+    owner_id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # Claim.created_by, 0 if unowned
+    appeal_deadline = db.Column(db.Date, primary_key=True)
+    pending_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    @classmethod
+    def adjust(cls, connection, deltas):
+        """Apply {(owner_id, appeal_deadline): delta} changes with upserts."""
+        rows = [
+            {'owner_id': owner_id or 0, 'appeal_deadline': deadline, 'pending_count': delta}
+            for (owner_id, deadline), delta in deltas.items()
+            if deadline is not None and delta
+        ]
+        _upsert_increment(connection, cls.__table__, ['owner_id', 'appeal_deadline'], 'pending_count', rows)
+    
+    def __repr__(self):
+        return f'<AppealDeadlineTally {self.owner_id} {self.appeal_deadline}: {self.pending_count}>'
+
+
+class DenialRiskRate(db.Model):
+    """Historical denial frequency for one value of a risk factor.
+    
+    Factors are ``provider`` (provider_id), ``amount_band`` and ``age_band``
+    (band index, see app/risk.py), plus a single ``all`` row with the overall
+    counts. Rebuilt wholesale by ``flask risk rebuild``.
+    """
+    __tablename__ = 'denial_risk_rate'
+    
+    factor = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(50), primary_key=True)
+    claims = db.Column(db.Integer, nullable=False, default=0)
+    denials = db.Column(db.Integer, nullable=False, default=0)
+    built_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<DenialRiskRate {self.factor}={self.value}: {self.denials}/{self.claims}>'
+
+
+class RuleWatermark(db.Model):
+    """How far each time-based issue rule has been evaluated, and under which rule version.
+    
+    ``flask issues reevaluate`` only looks at claims whose dates crossed a
+    rule's threshold after ``evaluated_through``; a version change makes that
+    one rule re-evaluate every claim.
+    """
+    __tablename__ = 'rule_watermark'
+    
+    rule = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False)
+    evaluated_through = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<RuleWatermark {self.rule} v{self.version} through {self.evaluated_through}>'
+
+
+class DataVersion(db.Model):
+    """Monotonic version counter per data scope, bumped on every claim write.
+    
+    Scopes are ``claims:all`` and ``claims:user:<id>``; pages derived from a
+    user's claims (list, dashboard) use the version for validators and caching.
+    """
+    __tablename__ = 'data_version'
+    
+    ALL_CLAIMS = 'claims:all'
+    
+    scope = db.Column(db.String(64), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    @staticmethod
+    def claims_scope(user_id):
+        """Scope for the claims a user can see; None means all claims."""
+        return DataVersion.ALL_CLAIMS if user_id is None else f'claims:user:{user_id}'
+    
+    @classmethod
+    def bump_claims(cls, connection, owner_ids):
+        """Bump the all-claims scope plus the scope of every owner in ``owner_ids``."""
+        now = datetime.utcnow()
+        scopes = {cls.ALL_CLAIMS}
+        scopes.update(cls.claims_scope(owner_id) for owner_id in owner_ids if owner_id is not None)
+        rows = [{'scope': scope, 'version': 1, 'updated_at': now} for scope in sorted(scopes)]
+        _upsert_increment(connection, cls.__table__, ['scope'], 'version', rows, replace_columns=['updated_at'])
+    
+    @classmethod
+    def current(cls, connection, scope):
+        """Return (version, updated_at) for a scope; (0, None) if never bumped."""
+        table = cls.__table__
+        row = connection.execute(
+            table.select().with_only_columns(table.c.version, table.c.updated_at).where(table.c.scope == scope)
+        ).first()
+        return (row.version, row.updated_at) if row else (0, None)
+    
     def __repr__(self):
-        return f'<Issue {self.issue_type} for Claim {self.claim_id}>' 
\ No newline at end of file
+        return f'<DataVersion {self.scope}: {self.version}>'
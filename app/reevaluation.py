@@ -0,0 +1,142 @@
+"""
+Scheduled re-evaluation of time-dependent claim issues.
+
+analyze_claim() runs once, when a claim is entered, but some rules depend on
+today's date: a claim becomes an ``old_claim`` a year after service, a
+``future_date`` issue stops applying once the date arrives, and a pending
+appeal needs attention as its deadline approaches. reevaluate_issues()
+(``flask issues reevaluate``, run daily) applies those rules only to the
+claims whose dates crossed a threshold since each rule's watermark, using
+range scans on the date indexes and one INSERT ... SELECT or UPDATE per rule.
+
+Each rule carries a version. Bump it whenever the rule's logic or threshold
+changes; the next run re-evaluates that rule alone over every claim.
+"""
+from datetime import date, datetime, timedelta
+from sqlalchemy import and_, exists, insert, literal, select, update
+from app import db
+from app.models import Claim, Denial, Issue, DataVersion, RuleWatermark
+
+OLD_CLAIM_DAYS = 365
+APPEAL_WARNING_DAYS = 14
+
+def _open_issue(issue_type, claim_id):
+    return exists().where(Issue.claim_id == claim_id, Issue.issue_type == issue_type, Issue.status != 'resolved')
+
+def _any_issue(issue_type, claim_id):
+    return exists().where(Issue.claim_id == claim_id, Issue.issue_type == issue_type)
+
+def _insert_issues(connection, source, issue_type, description, severity, now):
+    """INSERT ... SELECT one open issue per claim id selected by ``source``; return the row count."""
+    source = source.add_columns(literal(issue_type), literal(description), literal(severity), literal('open'),
+                                literal(now), literal(now))
+    result = connection.execute(insert(Issue).from_select(
+        ['claim_id', 'issue_type', 'description', 'severity', 'status', 'created_at', 'updated_at'], source
+    ))
+    return result.rowcount
+
+def _resolve_issues(connection, issue_type, condition, note, now):
+    result = connection.execute(
+        update(Issue)
+        .where(Issue.issue_type == issue_type, Issue.status != 'resolved', condition)
+        .values(status='resolved', resolution_notes=note, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+def evaluate_old_claims(connection, since, as_of, now):
+    """Flag claims whose service date became more than OLD_CLAIM_DAYS old after ``since``."""
+    crossed = Claim.service_date < as_of - timedelta(days=OLD_CLAIM_DAYS)
+    if since is not None:
+        crossed = and_(crossed, Claim.service_date >= since - timedelta(days=OLD_CLAIM_DAYS))
+    created = _insert_issues(
+        connection, select(Claim.id).where(crossed, ~_any_issue('old_claim', Claim.id)),
+        'old_claim', 'Service date is over 1 year old', 'medium', now,
+    )
+    resolved = 0
+    if since is None:
+        # Full run after a rule change: drop flags the current threshold no longer supports
+        resolved = _resolve_issues(
+            connection, 'old_claim',
+            Issue.claim_id.in_(select(Claim.id).where(Claim.service_date >= as_of - timedelta(days=OLD_CLAIM_DAYS))),
+            f'Service date is within {OLD_CLAIM_DAYS} days', now,
+        )
+    return created, resolved
+
+def evaluate_future_dates(connection, since, as_of, now):
+    """Resolve future_date issues for claims whose service date has arrived since ``since``."""
+    arrived = Claim.service_date <= as_of
+    if since is not None:
+        arrived = and_(arrived, Claim.service_date > since)
+    resolved = _resolve_issues(
+        connection, 'future_date', Issue.claim_id.in_(select(Claim.id).where(arrived)),
+        'Service date is no longer in the future', now,
+    )
+    return 0, resolved
+
+def evaluate_appeal_deadlines(connection, since, as_of, now):
+    """Flag pending appeals due within APPEAL_WARNING_DAYS; resolve flags that no longer apply.
+
+    Unlike the claim date rules, ``since`` does not narrow the scan: a denial
+    created or reopened after the last run may already be due inside the
+    window. The window itself is a range scan on the status/deadline index,
+    and the open-issue check keeps reruns from flagging a claim twice.
+    """
+    horizon = as_of + timedelta(days=APPEAL_WARNING_DAYS)
+    approaching = and_(Denial.appeal_status == 'pending', Denial.appeal_deadline >= as_of,
+                       Denial.appeal_deadline <= horizon)
+    created = _insert_issues(
+        connection,
+        select(Denial.claim_id).where(approaching, ~_open_issue('appeal_deadline', Denial.claim_id)).distinct(),
+        'appeal_deadline', f'Appeal deadline is within {APPEAL_WARNING_DAYS} days', 'high', now,
+    )
+
+    # Appeals filed or deadlines missed: the flag has nothing left to warn about. NOT IN evaluates the
+    # pending set once; a correlated EXISTS would rescan it per issue through the status/deadline index.
+    still_pending = select(Denial.claim_id).where(Denial.appeal_status == 'pending', Denial.appeal_deadline >= as_of)
+    resolved = _resolve_issues(connection, 'appeal_deadline', Issue.claim_id.not_in(still_pending),
+                               'No pending appeal with an upcoming deadline', now)
+    return created, resolved
+
+# rule: (version, evaluate). Bump the version when a rule's logic or threshold changes.
+RULES = {
+    'old_claim': (1, evaluate_old_claims),
+    'future_date': (1, evaluate_future_dates),
+    'appeal_deadline': (2, evaluate_appeal_deadlines),
+}
+
+def reevaluate_issues(as_of=None, full=False):
+    """Apply every time-based rule to the claims that crossed its threshold; commit once.
+
+    Returns {rule: {'since', 'created', 'resolved', 'skipped'}}. ``since`` is
+    None for a full evaluation; a rule that already ran through ``as_of`` is
+    skipped.
+    """
+    as_of = as_of or date.today()
+    now = datetime.utcnow()
+    connection = db.session.connection()
+    watermarks = {mark.rule: mark for mark in RuleWatermark.query}
+    results = {}
+
+    for rule, (version, evaluate) in RULES.items():
+        mark = watermarks.get(rule)
+        since = None if full or mark is None or mark.version != version else mark.evaluated_through
+        if since is not None and since >= as_of:
+            results[rule] = {'since': since, 'created': 0, 'resolved': 0, 'skipped': True}
+            continue
+        created, resolved = evaluate(connection, since, as_of, now)
+        results[rule] = {'since': since, 'created': created, 'resolved': resolved, 'skipped': False}
+        if mark is None:
+            db.session.add(RuleWatermark(rule=rule, version=version, evaluated_through=as_of))
+        else:
+            mark.version, mark.evaluated_through = version, as_of
+
+    if any(result['created'] or result['resolved'] for result in results.values()):
+        # Every issue written by this run carries ``now``; bump the versions of their claims' owners
+        owners = connection.execute(
+            select(Claim.created_by).join(Issue, Issue.claim_id == Claim.id)
+            .where(Issue.issue_type.in_(list(RULES)), Issue.updated_at == now).distinct()
+        ).scalars().all()
+        DataVersion.bump_claims(connection, owners)
+    db.session.commit()
+    return results
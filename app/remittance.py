@@ -0,0 +1,240 @@
+"""
+Ingest of X12 835 remittance advice (ERA) files.
+
+Payers report denials electronically: each CLP segment of an 835 names one
+of our claims (CLP01, the claim number we submitted) and its CAS segments
+carry the adjustment reason codes, which combine with the group code into
+the ``CO-16`` style codes of DENIAL_CODES. ingest_835() reads the file in
+REMITTANCE_READ_SIZE blocks and splits it into segments as it goes, so memory
+stays flat however large the file is.
+
+Denied claims are collected in batches of REMITTANCE_BATCH_SIZE. Each batch
+resolves claim numbers with one IN query per chunk and goes through
+bulk_deny_claims() once per (code, date), which inserts the denials and
+updates claim statuses with set-based statements. Each denial's appeal
+deadline is its date plus the payer's REMITTANCE_APPEAL_DAYS, so remitted
+denials reach the appeal worklist like ones entered by hand. Every call
+commits, so a large file never holds the write lock for long; a file that
+fails partway can be ingested again, since claims already denied are skipped.
+"""
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models import Claim
+from app.routes import DENIAL_CODES, _chunked, bulk_deny_claims
+
+ISA_LENGTH = 106
+
+# CLP02 claim status codes
+DENIED_STATUS = '4'
+REVERSAL_STATUS = '22'
+
+class RemittanceClaim:
+    """One CLP loop: the claim, what the payer paid and its CAS adjustments."""
+
+    __slots__ = ('claim_number', 'status', 'paid', 'payment_date', 'codes')
+
+    def __init__(self, claim_number, status, paid, payment_date):
+        self.claim_number = claim_number
+        self.status = status
+        self.paid = paid
+        self.payment_date = payment_date
+        self.codes = []  # Claim-level CAS codes first, then service-level ones, in file order
+
+    def denial_code(self):
+        """Return the denial code the payer gave this claim, or None if it was not denied.
+
+        A claim is denied when CLP02 says so, or when nothing was paid and an
+        adjustment carries one of DENIAL_CODES. Known codes win over others.
+        """
+        if self.status == REVERSAL_STATUS:
+            return None
+        known = next((code for code in self.codes if code in DENIAL_CODES), None)
+        if self.status == DENIED_STATUS:
+            return known or (self.codes[0] if self.codes else None)
+        if self.paid == 0 and known:
+            return known
+        return None
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y%m%d').date()
+    except (TypeError, ValueError):
+        return None
+
+def _parse_amount(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+def iter_segments(stream, read_size=1024 * 1024):
+    """Yield each segment of an X12 file as a list of elements.
+
+    Delimiters come from the fixed-width ISA header: the element separator
+    is its 4th character and the segment terminator its 106th. Line breaks
+    after terminators are ignored. Raises ValueError when the file does not
+    start with an ISA segment.
+    """
+    buffer = b''
+    while len(buffer.lstrip()) < ISA_LENGTH:
+        block = stream.read(read_size)
+        if not block:
+            break
+        buffer += block
+    start = len(buffer) - len(buffer.lstrip())
+    header = buffer[start:start + ISA_LENGTH]
+    if len(header) < ISA_LENGTH or header[:3] != b'ISA':
+        raise ValueError('Not an X12 file: it must start with an ISA segment')
+    # Latin-1 maps every byte to one character, so blocks decode independently
+    separator = chr(header[3])
+    terminator = chr(header[ISA_LENGTH - 1])
+
+    pending = buffer[start:].decode('latin-1')
+    while True:
+        segments = pending.split(terminator)
+        pending = segments.pop()  # Incomplete until the next block arrives
+        for segment in segments:
+            segment = segment.strip()
+            if segment:
+                yield segment.split(separator)
+        block = stream.read(read_size)
+        if not block:
+            break
+        pending += block.decode('latin-1')
+    pending = pending.strip()
+    if pending:
+        yield pending.split(separator)
+
+def iter_claims(segments):
+    """Yield a RemittanceClaim for every CLP loop in a stream of 835 segments.
+
+    ``payment_date`` is the production date (DTM*405) of the claim's
+    transaction, or the payment's effective date (BPR16) when there is none.
+    """
+    claim = None
+    payment_date = None
+    for elements in segments:
+        segment_id = elements[0]
+        if segment_id == 'CAS':
+            if claim is not None:
+                group = elements[1] if len(elements) > 1 else ''
+                # Up to six (reason, amount, quantity) triples follow the group code
+                claim.codes.extend(f'{group}-{elements[i]}' for i in range(2, len(elements), 3) if elements[i])
+        elif segment_id == 'CLP':
+            if claim is not None:
+                yield claim
+            elements += [''] * (5 - len(elements))
+            claim = RemittanceClaim(elements[1], elements[2], _parse_amount(elements[4]), payment_date)
+        elif segment_id in ('LX', 'PLB', 'SE'):  # End of a claim loop
+            if claim is not None:
+                yield claim
+                claim = None
+        elif segment_id == 'ST':
+            payment_date = None
+        elif segment_id == 'BPR':
+            payment_date = payment_date or (_parse_date(elements[16]) if len(elements) > 16 else None)
+        elif segment_id == 'DTM' and len(elements) > 2 and elements[1] == '405':
+            payment_date = _parse_date(elements[2]) or payment_date
+    if claim is not None:
+        yield claim
+
+class _Ingest:
+    """Running state of one ingest: the batch of denied claims and the totals so far."""
+
+    def __init__(self, unmatched_limit, report, appeal_days=None):
+        self.batch = []
+        self.counts = Counter()
+        self.codes = Counter()
+        self.unmatched = []
+        self.unmatched_limit = unmatched_limit
+        self.report = report
+        self.appeal_days = appeal_days
+
+    def add_unmatched(self, claim, code, reason):
+        self.counts['unmatched'] += 1
+        if len(self.unmatched) < self.unmatched_limit:
+            self.unmatched.append({'claim_number': claim.claim_number, 'denial_code': code, 'reason': reason})
+        if self.report is not None:
+            self.report.writerow([claim.claim_number, code, reason])
+
+    def flush(self):
+        """Deny the batch's claims, one bulk_deny_claims() call per (code, date)."""
+        batch, self.batch = self.batch, []
+        if not batch:
+            return
+        numbers = list({claim.claim_number for claim, _ in batch})
+        ids = {}
+        for chunk in _chunked(numbers):
+            for claim_number, claim_id in db.session.execute(
+                select(Claim.claim_number, Claim.id).where(Claim.claim_number.in_(chunk))
+            ):
+                ids[claim_number] = claim_id
+
+        groups = defaultdict(list)
+        for claim, code in batch:
+            claim_id = ids.get(claim.claim_number)
+            if claim_id is None:
+                self.add_unmatched(claim, code, 'not_found')
+            else:
+                groups[code, claim.payment_date].append(claim_id)
+
+        for (code, denial_date), claim_ids in groups.items():
+            deadline = denial_date + timedelta(days=self.appeal_days) if self.appeal_days else None
+            for result in bulk_deny_claims(claim_ids, code, denial_date, deadline):
+                if result['result'] == 'denied':
+                    self.counts['denied'] += 1
+                    self.codes[code] += 1
+                else:
+                    self.counts['not_pending'] += 1
+            # Repeats of a claim within one call are skipped by bulk_deny_claims; count them too
+            self.counts['not_pending'] += len(claim_ids) - len(set(claim_ids))
+
+def ingest_835(stream, batch_size=None, report=None):
+    """Create denials from an 835 file; return a summary dict.
+
+    ``stream`` is a binary file object. ``report``, if given, is a csv
+    writer that receives (claim_number, denial_code, reason) for every denied
+    claim that could not be matched; the summary lists only the first
+    REMITTANCE_UNMATCHED_LIMIT. The summary has ``claims`` (CLP loops read),
+    ``denials`` (of those, denied by the payer), ``denied`` (denials
+    created), ``not_pending`` (claims that were no longer pending, including
+    ones denied by an earlier ingest), ``unmatched``, ``unmatched_claims``,
+    ``codes`` (denials created by code) and ``seconds``. Raises ValueError
+    when the file is not X12.
+    """
+    started = time.perf_counter()
+    config = current_app.config
+    batch_size = batch_size or config.get('REMITTANCE_BATCH_SIZE', 5000)
+    ingest = _Ingest(config.get('REMITTANCE_UNMATCHED_LIMIT', 1000), report, config.get('REMITTANCE_APPEAL_DAYS'))
+
+    for claim in iter_claims(iter_segments(stream, config.get('REMITTANCE_READ_SIZE', 1024 * 1024))):
+        ingest.counts['claims'] += 1
+        code = claim.denial_code()
+        if code is None:
+            continue
+        ingest.counts['denials'] += 1
+        if claim.payment_date is None:
+            ingest.add_unmatched(claim, code, 'no_date')
+        elif len(code) > 20:  # Denial.denial_code is VARCHAR(20)
+            ingest.add_unmatched(claim, code, 'invalid_code')
+        else:
+            ingest.batch.append((claim, code))
+            if len(ingest.batch) >= batch_size:
+                ingest.flush()
+    ingest.flush()
+
+    counts = ingest.counts
+    return {
+        'claims': counts['claims'],
+        'denials': counts['denials'],
+        'denied': counts['denied'],
+        'not_pending': counts['not_pending'],
+        'unmatched': counts['unmatched'],
+        'unmatched_claims': ingest.unmatched,
+        'codes': dict(ingest.codes.most_common()),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
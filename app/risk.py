@@ -0,0 +1,173 @@
+"""
+Denial-risk scoring at claim entry.
+
+rebuild_risk_tables() aggregates claim history, archived claims included,
+into denial frequencies per provider, amount band and age band (days from
+service date to submission) and stores them in DenialRiskRate; run it periodically with
+``flask risk rebuild``. Each worker keeps those tables in memory as smoothed
+log-odds and reloads them every RISK_TABLE_TTL seconds.
+
+score_claims() combines the factors naive-Bayes style: every factor shifts
+the overall log-odds of denial by how much more (or less) often its value
+was denied. The lookups are vectorized, so scoring a whole upload costs a
+few array operations. Claims scoring at or above RISK_SCORE_THRESHOLD get a
+``denial_risk`` issue.
+"""
+import math
+import threading
+import time
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import Date, case, cast, delete, func, insert, select, union_all
+from app import db
+from app.models import Claim, ClaimArchive, DenialRiskRate, Issue
+
+AMOUNT_BANDS = (100, 500, 1000, 2500, 5000, 10000, 50000)  # Upper bounds in dollars; the last band is open
+AGE_BANDS = (30, 90, 180, 365)  # Upper bounds in days from service to submission
+MIN_RATE = 1e-4  # Keeps log-odds finite when a factor was never (or always) denied
+
+def _band(expression, bounds):
+    return case(*[(expression < bound, index) for index, bound in enumerate(bounds)], else_=len(bounds))
+
+def _age_days(dialect, claims):
+    """SQL for whole days between a claim's service date and its submission."""
+    if dialect == 'postgresql':
+        return cast(claims.c.created_at, Date) - claims.c.service_date
+    return func.julianday(func.date(claims.c.created_at)) - func.julianday(claims.c.service_date)
+
+def rebuild_risk_tables():
+    """Recompute every DenialRiskRate row from claim history; return the number of rows written."""
+    history = union_all(*[
+        select(model.provider_id, model.total_amount, model.status, model.created_at, model.service_date)
+        for model in (Claim, ClaimArchive)
+    ]).subquery()
+    denied = func.sum(case((history.c.status == 'denied', 1), else_=0))
+    keys = {
+        'provider': history.c.provider_id,
+        'amount_band': _band(history.c.total_amount, AMOUNT_BANDS),
+        'age_band': _band(_age_days(db.engine.dialect.name, history), AGE_BANDS),
+    }
+    built_at = datetime.utcnow()
+    claims, denials = db.session.execute(select(func.count(), denied).select_from(history)).one()
+    rows = [{'factor': 'all', 'value': '', 'claims': claims, 'denials': denials or 0, 'built_at': built_at}]
+    for factor, key in keys.items():
+        for value, claims, denials in db.session.execute(select(key, func.count(), denied).group_by(key)):
+            rows.append({'factor': factor, 'value': str(value), 'claims': claims, 'denials': denials or 0,
+                         'built_at': built_at})
+
+    # Swap the tables in one transaction so scorers never see a partial rebuild
+    db.session.execute(delete(DenialRiskRate))
+    db.session.execute(insert(DenialRiskRate), rows)
+    db.session.commit()
+    return len(rows)
+
+def _logit(rate):
+    rate = min(max(rate, MIN_RATE), 1 - MIN_RATE)
+    return math.log(rate / (1 - rate))
+
+class RiskTables:
+    """Denial log-odds per factor value, relative to the overall rate."""
+
+    def __init__(self, rows, prior_weight=50):
+        import numpy as np  # Heavy; only scoring needs it
+
+        overall = next(row for row in rows if row.factor == 'all')
+        base_rate = overall.denials / overall.claims
+        self.base_logit = _logit(base_rate)
+        self.built_at = overall.built_at
+
+        def shift(row):
+            # Small samples are pulled toward the overall rate
+            rate = (row.denials + prior_weight * base_rate) / (row.claims + prior_weight)
+            return _logit(rate) - self.base_logit
+
+        self.provider = {}
+        self.amount = np.zeros(len(AMOUNT_BANDS) + 1)
+        self.age = np.zeros(len(AGE_BANDS) + 1)
+        for row in rows:
+            if row.factor == 'provider':
+                self.provider[row.value] = shift(row)
+            elif row.factor == 'amount_band':
+                self.amount[int(row.value)] = shift(row)
+            elif row.factor == 'age_band':
+                self.age[int(row.value)] = shift(row)
+
+    def score(self, provider_ids, amounts, age_days):
+        """Return an array of denial probabilities for parallel sequences of claim fields."""
+        import numpy as np
+
+        provider = self.provider
+        logits = self.base_logit + np.fromiter((provider.get(value, 0.0) for value in provider_ids), float,
+                                               len(provider_ids))
+        # Band i holds values below bound i, matching the CASE used by the rebuild
+        logits += self.amount[np.searchsorted(AMOUNT_BANDS, np.asarray(amounts, dtype=float), side='right')]
+        logits += self.age[np.searchsorted(AGE_BANDS, np.asarray(age_days, dtype=float), side='right')]
+        return 1 / (1 + np.exp(-logits))
+
+class RiskScorer:
+    """Per-process cache of RiskTables, reloaded after ``ttl`` seconds."""
+
+    def __init__(self, ttl=300, prior_weight=50):
+        self.ttl = ttl
+        self.prior_weight = prior_weight
+        self._tables = None
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def tables(self):
+        """Return the current RiskTables, or None if the tables were never built."""
+        with self._lock:
+            if self._loaded is None or time.monotonic() - self._loaded >= self.ttl:
+                with db.session.no_autoflush:  # Callers score claims before flushing them
+                    rows = db.session.execute(select(DenialRiskRate)).scalars().all()
+                has_history = any(row.factor == 'all' and row.claims for row in rows)
+                self._tables = RiskTables(rows, self.prior_weight) if has_history else None
+                self._loaded = time.monotonic()
+            return self._tables
+
+    def clear(self):
+        with self._lock:
+            self._tables = self._loaded = None
+
+def score_claims(claims):
+    """Set ``risk_score`` on new claims and add a denial_risk issue to the risky ones.
+
+    Returns the number of claims flagged. Does nothing until the risk tables
+    have been built.
+    """
+    scorer = current_app.extensions.get('risk')
+    if scorer is None or not claims:
+        return 0
+    try:
+        tables = scorer.tables()
+        if tables is None:
+            return 0
+        today = date.today()
+        scores = tables.score(
+            [claim.provider_id for claim in claims],
+            [claim.total_amount for claim in claims],
+            [(today - claim.service_date).days for claim in claims],
+        )
+        threshold = current_app.config.get('RISK_SCORE_THRESHOLD', 0.3)
+        issues = []
+        for claim, score in zip(claims, scores.tolist()):
+            claim.risk_score = round(score, 4)
+            if score >= threshold:
+                issues.append(Issue(
+                    claim=claim,
+                    issue_type='denial_risk',
+                    description=f'Estimated denial risk {score:.0%} from past denials for this provider, '
+                                f'amount and claim age',
+                    severity='medium'
+                ))
+        db.session.add_all(issues)
+        return len(issues)
+    except Exception as e:
+        current_app.logger.error(f'Claim risk scoring error: {e}')
+        return 0
+
+def init_risk(app):
+    """Attach the per-process risk table cache to the app."""
+    if not app.config.get('RISK_SCORING_ENABLED', True):
+        return
+    app.extensions['risk'] = RiskScorer(app.config.get('RISK_TABLE_TTL', 300), app.config.get('RISK_PRIOR_WEIGHT', 50))
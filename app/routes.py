@@ -1,14 +1,30 @@
-from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, send_file, make_response, current_app
+from flask import (
+    Blueprint, render_template, request, jsonify, flash, redirect, url_for, send_file, make_response, current_app,
+    Response, stream_with_context, abort, session
+)
 from flask_login import login_required, current_user
 from app import db, limiter
-from app.models import Claim, Denial, Issue
+from app.models import (
+    Claim, Denial, Issue, ClaimArchive, DenialArchive, IssueArchive, AppealDeadlineTally, DataVersion, UploadRecord,
+    claim_fingerprint
+)
+from app.cache import fragment_cache
+from app.metrics import observe_upload
+from app.risk import score_claims
+from app.reevaluation import OLD_CLAIM_DAYS
 from app.security import (
     validate_claim_number, validate_patient_id, validate_provider_id, validate_amount,
     secure_file_upload, validate_csv_claims_data, sanitize_user_input, 
-    log_security_event, require_role
+    log_security_event, require_role, allow_large_upload
 )
+from collections import Counter
 from datetime import datetime
-import pandas as pd
+from sqlalchemy import select, insert, update, func, bindparam
+from sqlalchemy.orm import aliased, selectinload
+from werkzeug.http import is_resource_modified
+import csv
+import hashlib
+import time
 from werkzeug.utils import secure_filename
 import os
 import io
@@ -26,6 +42,18 @@ DENIAL_CODES = {
     'PR-3': 'Patient ineligible for benefits on date of service',
 }
 
+# Number of ids bound per IN (...) clause in set-based statements
+BULK_CHUNK_SIZE = 500
+
+# Rows fetched per round trip when streaming exports
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    'claim_number', 'patient_id', 'provider_id', 'service_date', 'total_amount', 'status',
+    'created_at', 'updated_at', 'issue_count', 'issue_types', 'denial_count', 'denial_codes',
+    'last_denial_date',
+]
+
 @main.route('/test')
 def test():
     """Simple test endpoint to debug issues."""
@@ -36,43 +64,69 @@ def test():
 @limiter.limit("100 per hour")
 def index():
     try:
-        # Get all claims for statistics (limit for performance)
-        all_claims = Claim.query.filter_by(created_by=current_user.id).all()
-        pending_claims = Claim.query.filter_by(status='pending', created_by=current_user.id).all()
-        denied_claims = Claim.query.filter_by(status='denied', created_by=current_user.id).all()
-        approved_claims = Claim.query.filter_by(status='approved', created_by=current_user.id).all()
+        # Fragments are keyed by the user's claims version, so writes invalidate them
+        cache = fragment_cache()
+        version, _ = DataVersion.current(db.session.connection(), DataVersion.claims_scope(current_user.id))
+        key = (current_user.id, version)
+        
+        stats_html = cache.get_or_render('dashboard_stats', key, lambda: render_template(
+            'fragments/dashboard_stats.html', counts=_claim_counts(current_user.id)))
         
         # Get recent claims (last 10) for current user
-        recent_claims = Claim.query.filter_by(created_by=current_user.id).order_by(Claim.created_at.desc()).limit(10).all()
+        recent_html = cache.get_or_render('recent_claims', key, lambda: render_template(
+            'fragments/recent_claims.html',
+            recent_claims=Claim.query.filter_by(created_by=current_user.id).order_by(Claim.created_at.desc()).limit(10).all()))
         
-        return render_template('index.html', 
-                             claims=all_claims,
-                             pending_claims=pending_claims,
-                             denied_claims=denied_claims,
-                             approved_claims=approved_claims,
-                             recent_claims=recent_claims)
+        return render_template('index.html', stats_html=stats_html, recent_html=recent_html)
     except Exception as e:
         current_app.logger.error(f'Dashboard error: {e}')
         flash('Error loading dashboard data.', 'error')
-        return render_template('index.html', claims=[], pending_claims=[], 
-                             denied_claims=[], approved_claims=[], recent_claims=[])
+        return render_template('index.html',
+                             stats_html=render_template('fragments/dashboard_stats.html', counts=_claim_counts(None)),
+                             recent_html=render_template('fragments/recent_claims.html', recent_claims=[]))
+
+def _claim_counts(user_id):
+    """Count a user's claims by status with one GROUP BY query."""
+    counts = {'total': 0, 'pending': 0, 'denied': 0, 'approved': 0}
+    if user_id is None:
+        return counts
+    rows = db.session.execute(
+        select(Claim.status, func.count(Claim.id)).where(Claim.created_by == user_id).group_by(Claim.status)
+    )
+    for status, count in rows:
+        counts[status] = count
+        counts['total'] += count
+    return counts
 
 @main.route('/claims')
 @login_required
 @limiter.limit("50 per hour")
 def claims_list():
     try:
-        # Users can only see their own claims unless they are admin
-        if current_user.role == 'admin':
-            claims = Claim.query.order_by(Claim.created_at.desc()).all()
-        else:
-            claims = Claim.query.filter_by(created_by=current_user.id).order_by(Claim.created_at.desc()).all()
+        # Revalidate against the per-user list version before querying claims
+        scope = DataVersion.claims_scope(None if current_user.role == 'admin' else current_user.id)
+        version, last_modified = DataVersion.current(db.session.connection(), scope)
+        etag = _page_etag('claims', scope, version, request.query_string.decode())
+        if _not_modified(etag, last_modified):
+            return _not_modified_response(etag, last_modified)
+        
+        def render_rows():
+            # Users can only see their own claims unless they are admin
+            query = Claim.query.options(selectinload(Claim.issues)).order_by(Claim.created_at.desc())
+            if current_user.role != 'admin':
+                query = query.filter_by(created_by=current_user.id)
+            return render_template('fragments/claims_rows.html', claims=query.all(), denial_codes=DENIAL_CODES)
+        
+        rows_html = fragment_cache().get_or_render('claims_rows', (scope, version), render_rows)
         
-        return render_template('claims/list.html', claims=claims, denial_codes=DENIAL_CODES)
+        cacheable = '_flashes' not in session
+        response = make_response(render_template('claims/list.html', rows_html=rows_html, denial_codes=DENIAL_CODES))
+        return _with_validators(response, etag if cacheable else None, last_modified)
     except Exception as e:
         current_app.logger.error(f'Claims list error: {e}')
         flash('Error loading claims.', 'error')
-        return render_template('claims/list.html', claims=[], denial_codes=DENIAL_CODES)
+        return render_template('claims/list.html', denial_codes=DENIAL_CODES,
+                             rows_html=render_template('fragments/claims_rows.html', claims=[], denial_codes=DENIAL_CODES))
 
 @main.route('/claims/new', methods=['GET', 'POST'])
 @login_required
@@ -96,7 +150,7 @@ def new_claim():
             valid, msg = validate_claim_number(data['claim_number'])
             if not valid:
                 errors.append(msg)
-            elif Claim.query.filter_by(claim_number=data['claim_number']).first():
+            elif claim_numbers_in_use([data['claim_number']]):
                 errors.append('Claim number already exists.')
             
             # Validate patient ID
@@ -138,10 +192,13 @@ def new_claim():
                 created_by=current_user.id
             )
             db.session.add(claim)
-            db.session.commit()
+            db.session.flush()
             
             # Analyze claim for potential issues
             analyze_claim(claim)
+            score_claims([claim])
+            DataVersion.bump_claims(db.session.connection(), [claim.created_by])
+            db.session.commit()
             
             log_security_event('CLAIM_CREATED', f'New claim created: {claim.claim_number}', current_user.id)
             flash('Claim created successfully!', 'success')
@@ -159,6 +216,8 @@ def new_claim():
 @limiter.limit("5 per hour")  # Strict limit for file uploads
 def upload_claims():
     if request.method == 'POST':
+        import pandas as pd  # Heavy; only upload needs it
+        
         try:
             if 'file' not in request.files:
                 flash('No file uploaded', 'error')
@@ -172,55 +231,34 @@ def upload_claims():
                 flash(error_msg, 'error')
                 return redirect(request.url)
             
+            # The same bytes uploaded before: report that result instead of re-reading every row
+            content = file.read()
+            content_hash = hashlib.sha256(content).hexdigest()
+            prior = UploadRecord.prior(current_user.id, content_hash)
+            if prior:
+                flash(f'This file was already uploaded on {prior.created_at:%Y-%m-%d %H:%M} '
+                      f'({prior.claims_created} claims created, {prior.claims_skipped} skipped). '
+                      f'Nothing was changed.', 'info')
+                return redirect(url_for('main.claims_list'))
+            error = import_size_error(len(content))
+            if error:
+                flash(error, 'error')
+                return redirect(request.url)
+            
             # Read and validate CSV
             try:
-                df = pd.read_csv(file, dtype=str)  # Read as strings for validation
-                
-                # Validate CSV structure and content
-                valid, error_msg = validate_csv_claims_data(df)
-                if not valid:
-                    flash(f'Invalid CSV data: {error_msg}', 'error')
-                    return redirect(request.url)
-                
-                # Process valid claims
-                claims_created = 0
-                claims_skipped = 0
-                
-                for _, row in df.iterrows():
-                    # Check for duplicate claim numbers
-                    if Claim.query.filter_by(claim_number=row['claim_number']).first():
-                        claims_skipped += 1
-                        continue
-                    
-                    try:
-                        claim = Claim(
-                            claim_number=row['claim_number'],
-                            patient_id=row['patient_id'],
-                            provider_id=row['provider_id'],
-                            service_date=pd.to_datetime(row['service_date']).date(),
-                            total_amount=float(row['total_amount']),
-                            status='pending',
-                            created_by=current_user.id
-                        )
-                        db.session.add(claim)
-                        analyze_claim(claim)
-                        claims_created += 1
-                        
-                    except Exception as e:
-                        current_app.logger.warning(f'Skipped invalid claim row: {e}')
-                        claims_skipped += 1
-                        continue
-                
-                db.session.commit()
-                
-                log_security_event('BULK_CLAIMS_UPLOAD', f'Uploaded {claims_created} claims, skipped {claims_skipped}', current_user.id)
-                flash(f'Upload completed! Created {claims_created} claims, skipped {claims_skipped} invalid/duplicate entries.', 'success')
+                record = import_claims_csv(io.BytesIO(content), filename, content_hash, len(content))
+                flash(f'Upload completed! Created {record.claims_created} claims, '
+                      f'skipped {record.claims_skipped} invalid/duplicate entries.', 'success')
                 return redirect(url_for('main.claims_list'))
                 
             except pd.errors.EmptyDataError:
                 flash('Uploaded file is empty.', 'error')
             except pd.errors.ParserError:
                 flash('Invalid CSV format.', 'error')
+            except ValueError as e:  # After the pandas errors, which subclass it
+                flash(f'Invalid CSV data: {e}', 'error')
+                return redirect(request.url)
             except Exception as e:
                 current_app.logger.error(f'CSV processing error: {e}')
                 flash('Error processing file. Please check the format.', 'error')
@@ -230,7 +268,134 @@ def upload_claims():
             current_app.logger.error(f'File upload error: {e}')
             flash('Upload failed. Please try again.', 'error')
     
-    return render_template('claims/upload.html')
+    return _upload_page()
+
+def _upload_page(**context):
+    return render_template('claims/upload.html', max_content_length=current_app.config.get('MAX_CONTENT_LENGTH'),
+                           chunk_size=current_app.config.get('UPLOAD_CHUNK_SIZE'), **context)
+
+@main.route('/claims/upload/check', methods=['POST'])
+@login_required
+@limiter.limit("30 per hour")
+def check_upload():
+    """Dry run: check every row of an upload CSV and report on it without creating claims."""
+    from app.upload_check import check_claims_csv
+    
+    if 'file' not in request.files:
+        flash('No file uploaded', 'error')
+        return redirect(url_for('main.upload_claims'))
+    valid, error_msg, filename = secure_file_upload(request.files['file'], current_app.config.get('UPLOAD_EXTENSIONS'))
+    if not valid:
+        flash(error_msg, 'error')
+        return redirect(url_for('main.upload_claims'))
+    
+    try:
+        content = request.files['file'].read()
+        check = check_claims_csv(io.BytesIO(content), current_user.id)
+        prior = UploadRecord.prior(current_user.id, hashlib.sha256(content).hexdigest())
+        check.update(filename=filename, uploaded_at=prior.created_at if prior else None)
+        return _upload_page(check=check)
+    except ValueError as e:
+        flash(f'Invalid CSV data: {e}', 'error')
+    except Exception as e:
+        current_app.logger.error(f'Upload check error: {e}')
+        flash('Error checking file. Please check the format.', 'error')
+    return redirect(url_for('main.upload_claims'))
+
+@main.route('/claims/upload/reports/<token>')
+@login_required
+def download_upload_report(token):
+    """Download the rejected-row report of one of the current user's dry-run checks."""
+    from app.upload_check import report_path
+    
+    path = report_path(current_user.id, token)
+    if path is None or not os.path.exists(path):
+        abort(404)
+    response = send_file(os.path.abspath(path), mimetype='text/csv', as_attachment=True,
+                         download_name='rejected_rows.csv')
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+def import_size_error(size_bytes):
+    """Return why a claims CSV of ``size_bytes`` cannot be imported in one request, or None.
+    
+    The import reads the whole file into memory and runs in the request, at
+    several hundred rows a second, so UPLOAD_IMPORT_MAX_SIZE keeps it inside
+    gunicorn's TIMEOUT. Larger files can still be checked.
+    """
+    limit = current_app.config.get('UPLOAD_IMPORT_MAX_SIZE', 2 * 1024 * 1024)
+    if size_bytes > limit:
+        return f'File is too large to import in one upload ({size_bytes} bytes, limit {limit}); split it.'
+    return None
+
+def import_claims_csv(source, filename, content_hash, size_bytes):
+    """Create the current user's claims from an upload CSV and record the upload; commit once.
+    
+    ``source`` is a path or binary file object. Returns the UploadRecord.
+    Raises ValueError when the file is over UPLOAD_IMPORT_MAX_SIZE or the
+    data fails validation; pandas parser errors propagate.
+    """
+    import pandas as pd  # Heavy; only upload needs it
+    
+    error = import_size_error(size_bytes)
+    if error:
+        raise ValueError(error)
+    started = time.perf_counter()
+    df = pd.read_csv(source, dtype=str)  # Read as strings for validation
+    
+    # Validate CSV structure and content
+    valid, error_msg = validate_csv_claims_data(df)
+    if not valid:
+        raise ValueError(error_msg)
+    
+    # Process valid claims
+    claims_created = 0
+    claims_skipped = 0
+    new_claims = []
+    
+    # Existing claim numbers in one IN query per chunk, not one query per row
+    seen_numbers = claim_numbers_in_use(list(set(df['claim_number'])))
+    
+    for _, row in df.iterrows():
+        # Check for duplicate claim numbers, in the database or earlier in this file
+        if row['claim_number'] in seen_numbers:
+            claims_skipped += 1
+            continue
+        
+        try:
+            claim = Claim(
+                claim_number=row['claim_number'],
+                patient_id=row['patient_id'],
+                provider_id=row['provider_id'],
+                service_date=pd.to_datetime(row['service_date']).date(),
+                total_amount=float(row['total_amount']),
+                status='pending',
+                created_by=current_user.id
+            )
+            db.session.add(claim)
+            analyze_claim(claim, check_duplicates=False)  # Checked below in one join
+            seen_numbers.add(claim.claim_number)
+            new_claims.append(claim)
+            claims_created += 1
+            
+        except Exception as e:
+            current_app.logger.warning(f'Skipped invalid claim row: {e}')
+            claims_skipped += 1
+            continue
+    
+    if claims_created:
+        score_claims(new_claims)  # One vectorized pass, before the INSERTs
+        db.session.flush()
+        flag_duplicate_claims([claim.id for claim in new_claims])
+        DataVersion.bump_claims(db.session.connection(), [current_user.id])
+    record = UploadRecord(user_id=current_user.id, filename=filename, content_hash=content_hash,
+                          size_bytes=size_bytes, claims_created=claims_created, claims_skipped=claims_skipped)
+    db.session.add(record)
+    db.session.commit()
+    
+    observe_upload(claims_created, claims_skipped, time.perf_counter() - started)
+    log_security_event('BULK_CLAIMS_UPLOAD', f'Uploaded {claims_created} claims, skipped {claims_skipped}', current_user.id)
+    return record
 
 @main.route('/claims/download-sample')
 @login_required
@@ -238,19 +403,14 @@ def upload_claims():
 def download_sample():
     try:
         # Create sample CSV data
-        sample_data = {
-            'claim_number': ['CLM001', 'CLM002', 'CLM003'],
-            'patient_id': ['PAT001', 'PAT002', 'PAT001'],
-            'provider_id': ['PROV001', 'PROV001', 'PROV002'],
-            'service_date': ['2024-03-15', '2024-03-16', '2024-03-17'],
-            'total_amount': [1500.00, 2750.50, 950.75]
-        }
-        
-        # Create DataFrame and convert to CSV
-        df = pd.DataFrame(sample_data)
         output = io.StringIO()
-        df.to_csv(output, index=False)
-        output.seek(0)
+        writer = csv.writer(output)
+        writer.writerow(['claim_number', 'patient_id', 'provider_id', 'service_date', 'total_amount'])
+        writer.writerows([
+            ['CLM001', 'PAT001', 'PROV001', '2024-03-15', '1500.0'],
+            ['CLM002', 'PAT002', 'PROV001', '2024-03-16', '2750.5'],
+            ['CLM003', 'PAT001', 'PROV002', '2024-03-17', '950.75'],
+        ])
         
         # Create response with security headers
         response = make_response(output.getvalue())
@@ -265,26 +425,190 @@ def download_sample():
         flash('Error generating sample file.', 'error')
         return redirect(url_for('main.claims_list'))
 
+@main.route('/claims/export')
+@login_required
+@limiter.limit("10 per hour")
+def export_claims():
+    """Stream the user's visible claims, archived ones first, as CSV with issue and denial summaries."""
+    # Optional filters mirror the claims list filters
+    status = request.args.get('status', '').strip()
+    try:
+        date_from = date_to = None
+        if request.args.get('date_from'):
+            date_from = datetime.strptime(request.args['date_from'], '%Y-%m-%d').date()
+        if request.args.get('date_to'):
+            date_to = datetime.strptime(request.args['date_to'], '%Y-%m-%d').date()
+    except ValueError:
+        flash('Invalid date format.', 'error')
+        return redirect(url_for('main.claims_list'))
+
+    queries = []
+    for models in ((ClaimArchive, IssueArchive, DenialArchive), (Claim, Issue, Denial)):
+        query = _export_query(*models)
+        claim = models[0]
+        if status:
+            query = query.where(claim.status == status)
+        if date_from:
+            query = query.where(claim.service_date >= date_from)
+        if date_to:
+            query = query.where(claim.service_date <= date_to)
+        queries.append(query)
+
+    log_security_event('CLAIMS_EXPORTED', f'Claims export started (status={status or "all"})', current_user.id)
+
+    response = Response(stream_with_context(_stream_csv(*queries)), mimetype='text/csv')
+    response.headers['Content-Disposition'] = f'attachment; filename=claims_{datetime.now():%Y%m%d_%H%M%S}.csv'
+    response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
+    return response
+
+def _string_agg(column):
+    """Aggregate strings with '; ' using the current dialect's function."""
+    if db.engine.dialect.name == 'postgresql':
+        return func.string_agg(column, '; ')
+    return func.group_concat(column, '; ')
+
+def _export_query(claim=Claim, issue=Issue, denial=Denial):
+    """Build the export SELECT: plain columns plus correlated issue/denial summaries.
+
+    Correlated subqueries are resolved per row through the claim_id indexes,
+    so rows can be streamed without first aggregating the child tables.
+    Pass the archive models to export archived claims.
+    """
+    issue_count = select(func.count(issue.id)).where(issue.claim_id == claim.id).scalar_subquery()
+    issue_types = select(_string_agg(issue.issue_type)).where(issue.claim_id == claim.id).scalar_subquery()
+    denial_count = select(func.count(denial.id)).where(denial.claim_id == claim.id).scalar_subquery()
+    denial_codes = select(_string_agg(denial.denial_code)).where(denial.claim_id == claim.id).scalar_subquery()
+    last_denial = select(func.max(denial.denial_date)).where(denial.claim_id == claim.id).scalar_subquery()
+
+    query = select(
+        claim.claim_number, claim.patient_id, claim.provider_id, claim.service_date,
+        claim.total_amount, claim.status, claim.created_at, claim.updated_at,
+        issue_count.label('issue_count'), issue_types.label('issue_types'),
+        denial_count.label('denial_count'), denial_codes.label('denial_codes'),
+        last_denial.label('last_denial_date'),
+    ).order_by(claim.id)
+
+    # Users can only export their own claims unless they are admin
+    if current_user.role != 'admin':
+        query = query.where(claim.created_by == current_user.id)
+    return query
+
+def _stream_csv(*queries):
+    """Yield CSV text in batches from a server-side cursor per query."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()  # Send the header right away
+
+    for query in queries:
+        result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for rows in result.partitions():
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(
+                (value.isoformat() if hasattr(value, 'isoformat') else value for value in row)
+                for row in rows
+            )
+            yield buffer.getvalue()
+
 @main.route('/claims/<int:claim_id>')
 @login_required
 @limiter.limit("100 per hour")
 def view_claim(claim_id):
     try:
-        claim = Claim.query.get_or_404(claim_id)
+        # One lightweight query for authorization and the page validators
+        state = db.session.execute(_claim_state_query(claim_id)).first()
+        if state is None:
+            return _view_archived_claim(claim_id)
         
         # Authorization check - users can only view their own claims unless admin
-        if current_user.role != 'admin' and claim.created_by != current_user.id:
+        if current_user.role != 'admin' and state.created_by != current_user.id:
             log_security_event('UNAUTHORIZED_CLAIM_ACCESS', f'Attempted access to claim {claim_id}', current_user.id)
             flash('Access denied.', 'error')
             return redirect(url_for('main.claims_list'))
         
-        return render_template('claims/view.html', claim=claim, denial_codes=DENIAL_CODES)
+        etag = _page_etag('claim', claim_id, state.updated_at, state.denials_updated_at, state.denial_count,
+                          state.issues_updated_at, state.issue_count)
+        last_modified = max(filter(None, [state.updated_at, state.denials_updated_at, state.issues_updated_at]), default=None)
+        if _not_modified(etag, last_modified):
+            return _not_modified_response(etag, last_modified)
+        
+        cacheable = '_flashes' not in session
+        claim = Claim.query.get_or_404(claim_id)
+        response = make_response(render_template('claims/view.html', claim=claim, denial_codes=DENIAL_CODES))
+        return _with_validators(response, etag if cacheable else None, last_modified)
         
     except Exception as e:
         current_app.logger.error(f'Claim view error: {e}')
         flash('Error loading claim.', 'error')
         return redirect(url_for('main.claims_list'))
 
+def _view_archived_claim(claim_id):
+    """Render a claim from the archive tables; archived claims no longer change."""
+    claim = db.session.get(ClaimArchive, claim_id)
+    if claim is None:
+        abort(404)
+    if current_user.role != 'admin' and claim.created_by != current_user.id:
+        log_security_event('UNAUTHORIZED_CLAIM_ACCESS', f'Attempted access to claim {claim_id}', current_user.id)
+        flash('Access denied.', 'error')
+        return redirect(url_for('main.claims_list'))
+    
+    etag = _page_etag('archived-claim', claim_id, claim.archived_at)
+    if _not_modified(etag, claim.archived_at):
+        return _not_modified_response(etag, claim.archived_at)
+    response = make_response(render_template('claims/view.html', claim=claim, archived=True,
+                                             denial_codes=DENIAL_CODES))
+    return _with_validators(response, etag if '_flashes' not in session else None, claim.archived_at)
+
+def _claim_state_query(claim_id):
+    """SELECT a claim's owner plus the newest update times and counts of its children."""
+    def child_stats(model):
+        return (
+            select(func.max(model.updated_at)).where(model.claim_id == Claim.id).scalar_subquery(),
+            select(func.count(model.id)).where(model.claim_id == Claim.id).scalar_subquery(),
+        )
+    
+    denials_updated_at, denial_count = child_stats(Denial)
+    issues_updated_at, issue_count = child_stats(Issue)
+    return select(
+        Claim.created_by, Claim.updated_at,
+        denials_updated_at.label('denials_updated_at'), denial_count.label('denial_count'),
+        issues_updated_at.label('issues_updated_at'), issue_count.label('issue_count'),
+    ).where(Claim.id == claim_id)
+
+def _page_etag(*parts):
+    """Build an ETag for a page rendered for the current user from data validators."""
+    key = '|'.join(str(part) for part in (
+        current_app.config.get('ETAG_VERSION', '1'), current_user.id, current_user.role, *parts
+    ))
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+def _not_modified(etag, last_modified):
+    """True if the client's cached copy is current.
+    
+    Pending flash messages always force a full render so they are shown.
+    """
+    if '_flashes' in session:
+        return False
+    return not is_resource_modified(request.environ, etag=etag, last_modified=last_modified)
+
+def _not_modified_response(etag, last_modified):
+    return _with_validators(make_response('', 304), etag, last_modified)
+
+def _with_validators(response, etag, last_modified):
+    """Mark a per-user page as revalidate-always and attach its validators.
+    
+    Pass ``etag=None`` for pages that showed one-off flash messages so they
+    are never served from the browser cache.
+    """
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    if etag:
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+    return response
+
 @main.route('/claims/<int:claim_id>/deny', methods=['POST'])
 @login_required
 @require_role('manager')  # Only managers and admins can deny claims
@@ -329,6 +653,7 @@ def deny_claim(claim_id):
         claim.status = 'denied'
         
         db.session.add(denial)
+        DataVersion.bump_claims(db.session.connection(), [claim.created_by])
         db.session.commit()
         
         log_security_event('CLAIM_DENIED', f'Claim {claim.claim_number} denied with code {data["denial_code"]}', current_user.id)
@@ -341,55 +666,326 @@ def deny_claim(claim_id):
     
     return redirect(url_for('main.view_claim', claim_id=claim_id))
 
-def analyze_claim(claim):
-    """Analyze a claim for potential issues and create Issue records"""
+@main.route('/api/claims/bulk-deny', methods=['POST'])
+@login_required
+@require_role('manager')  # Only managers and admins can deny claims
+@limiter.limit("10 per hour")
+def bulk_deny():
+    """API endpoint to deny many claims with one denial code in a single transaction.
+
+    Accepts JSON with either ``claim_ids`` (a list of ids) or ``filter``
+    (``status``, ``provider_id``, ``service_date_from``, ``service_date_to``)
+    plus ``denial_code``, ``denial_date`` and an optional ``appeal_deadline``.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+
+    data = sanitize_user_input({
+        'denial_code': str(payload.get('denial_code') or '').strip(),
+        'denial_date': str(payload.get('denial_date') or '').strip(),
+        'appeal_deadline': str(payload.get('appeal_deadline') or '').strip(),
+    })
+
+    # Validate denial code
+    if data['denial_code'] not in DENIAL_CODES:
+        return jsonify({'error': 'Invalid denial code.'}), 400
+
+    # Validate dates
     try:
-        issues = []
-        
-        # Check for missing or invalid claim number
-        if not claim.claim_number or len(claim.claim_number) < 3:
-            issues.append(Issue(
-                claim_id=claim.id,
-                issue_type='missing_code',
-                description='Claim number is missing or too short',
-                severity='high'
-            ))
-        
-        # Check for zero or negative amount
-        if claim.total_amount <= 0:
-            issues.append(Issue(
-                claim_id=claim.id,
-                issue_type='invalid_amount',
-                description='Claim amount is zero or negative',
-                severity='high'
-            ))
+        denial_date = datetime.strptime(data['denial_date'], '%Y-%m-%d').date()
+        appeal_deadline = None
+        if data['appeal_deadline']:
+            appeal_deadline = datetime.strptime(data['appeal_deadline'], '%Y-%m-%d').date()
+            if appeal_deadline <= denial_date:
+                return jsonify({'error': 'Appeal deadline must be after denial date.'}), 400
+    except ValueError:
+        return jsonify({'error': 'Invalid date format.'}), 400
+
+    max_claims = current_app.config.get('BULK_DENIAL_MAX_CLAIMS', 10000)
+
+    # Resolve the target claim ids
+    if 'claim_ids' in payload:
+        claim_ids = payload.get('claim_ids')
+        if not isinstance(claim_ids, list) or not claim_ids:
+            return jsonify({'error': 'claim_ids must be a non-empty list'}), 400
+        try:
+            claim_ids = [int(claim_id) for claim_id in claim_ids]
+        except (TypeError, ValueError):
+            return jsonify({'error': 'claim_ids must contain integers'}), 400
+    elif 'filter' in payload:
+        claim_filter = payload.get('filter')
+        if not isinstance(claim_filter, dict) or not claim_filter:
+            return jsonify({'error': 'filter must be a non-empty object'}), 400
+        query, error = _bulk_filter_query(sanitize_user_input(claim_filter))
+        if error:
+            return jsonify({'error': error}), 400
+        claim_ids = list(db.session.scalars(query.limit(max_claims + 1)))
+    else:
+        return jsonify({'error': 'Either claim_ids or filter is required'}), 400
+
+    if len(claim_ids) > max_claims:
+        return jsonify({'error': f'Too many claims; at most {max_claims} can be denied at once'}), 400
+
+    try:
+        results = bulk_deny_claims(claim_ids, data['denial_code'], denial_date, appeal_deadline)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error bulk denying claims: {e}')
+        return jsonify({'error': 'Error processing denials. No claims were changed.'}), 500
+
+    denied = sum(1 for result in results if result['result'] == 'denied')
+    log_security_event('BULK_CLAIMS_DENIED', f'Denied {denied} of {len(results)} claims with code {data["denial_code"]}', current_user.id)
+    return jsonify({
+        'denial_code': data['denial_code'],
+        'requested': len(results),
+        'denied': denied,
+        'results': results,
+    })
+
+@main.route('/api/claims/remittance', methods=['POST'])
+@login_required
+@require_role('manager')  # Only managers and admins can deny claims
+@limiter.limit("10 per hour")
+@allow_large_upload
+def ingest_remittance():
+    """API endpoint to create denials from an X12 835 remittance file (form field ``file``).
+
+    Files up to UPLOAD_MAX_SIZE are accepted; the upload is spooled to disk
+    and parsed as a stream. Larger files can go through ``flask remittance
+    import``.
+    """
+    from app.remittance import ingest_835
+
+    if 'file' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+    valid, error_msg, filename = secure_file_upload(request.files['file'],
+                                                    current_app.config.get('REMITTANCE_EXTENSIONS'))
+    if not valid:
+        return jsonify({'error': error_msg}), 400
+
+    try:
+        summary = ingest_835(request.files['file'].stream)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid 835 file: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Error ingesting remittance: {e}')
+        return jsonify({'error': 'Error processing remittance file.'}), 500
+
+    log_security_event('REMITTANCE_INGESTED', f'{filename}: denied {summary["denied"]} of {summary["claims"]} claims, '
+                       f'{summary["unmatched"]} unmatched', current_user.id)
+    return jsonify({'filename': filename, **summary})
+
+def _bulk_filter_query(claim_filter):
+    """Build a SELECT of claim ids from a bulk denial filter.
+
+    Returns (query, error_message).
+    """
+    allowed = {'status', 'provider_id', 'service_date_from', 'service_date_to'}
+    unknown = set(claim_filter) - allowed
+    if unknown:
+        return None, f"Unsupported filter fields: {', '.join(sorted(unknown))}"
+
+    query = select(Claim.id).order_by(Claim.id)
+    if claim_filter.get('status'):
+        query = query.where(Claim.status == claim_filter['status'])
+    if claim_filter.get('provider_id'):
+        valid, msg = validate_provider_id(claim_filter['provider_id'])
+        if not valid:
+            return None, msg
+        query = query.where(Claim.provider_id == claim_filter['provider_id'])
+    try:
+        if claim_filter.get('service_date_from'):
+            date_from = datetime.strptime(claim_filter['service_date_from'], '%Y-%m-%d').date()
+            query = query.where(Claim.service_date >= date_from)
+        if claim_filter.get('service_date_to'):
+            date_to = datetime.strptime(claim_filter['service_date_to'], '%Y-%m-%d').date()
+            query = query.where(Claim.service_date <= date_to)
+    except (TypeError, ValueError):
+        return None, 'Invalid date format.'
+
+    return query, None
+
+def _chunked(items, size=BULK_CHUNK_SIZE):
+    """Yield successive slices of ``items`` holding at most ``size`` entries."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+def claim_numbers_in_use(claim_numbers):
+    """Return the subset of ``claim_numbers`` taken by working or archived claims."""
+    taken = set()
+    for chunk in _chunked(claim_numbers):
+        for model in (Claim, ClaimArchive):
+            taken.update(db.session.execute(
+                select(model.claim_number).where(model.claim_number.in_(chunk))
+            ).scalars())
+    return taken
+
+def bulk_deny_claims(claim_ids, denial_code, denial_date, appeal_deadline=None):
+    """Deny many claims with set-based statements and commit once.
+
+    Only pending claims are denied. Returns one result dict per requested
+    claim id, in request order, with ``result`` set to ``denied``,
+    ``not_found`` or ``not_pending``.
+    """
+    claim_ids = list(dict.fromkeys(claim_ids))  # De-duplicate, keep order
+
+    # Validate every claim with one SELECT per chunk
+    found = {}
+    for chunk in _chunked(claim_ids):
+        rows = db.session.execute(
+            select(Claim.id, Claim.claim_number, Claim.status, Claim.created_by)
+            .where(Claim.id.in_(chunk))
+        )
+        for row in rows:
+            found[row.id] = row
+
+    to_deny = [claim_id for claim_id in claim_ids
+               if claim_id in found and found[claim_id].status == 'pending']
+
+    if to_deny:
+        now = datetime.utcnow()
+        denial_reason = DENIAL_CODES.get(denial_code, 'Unknown reason')
+        db.session.execute(insert(Denial), [
+            {
+                'claim_id': claim_id,
+                'denial_code': denial_code,
+                'denial_reason': denial_reason,
+                'denial_date': denial_date,
+                'appeal_deadline': appeal_deadline,
+                'appeal_status': 'pending',
+                'created_at': now,
+                'updated_at': now,
+            }
+            for claim_id in to_deny
+        ])
+        for chunk in _chunked(to_deny):
+            db.session.execute(
+                update(Claim)
+                .where(Claim.id.in_(chunk), Claim.status == 'pending')
+                .values(status='denied', updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
         
-        # Check for unusually high amounts
-        if claim.total_amount > 50000:  # $50k threshold
-            issues.append(Issue(
-                claim_id=claim.id,
-                issue_type='high_amount',
-                description='Claim amount is unusually high and requires review',
-                severity='medium'
-            ))
+        DataVersion.bump_claims(db.session.connection(), {found[claim_id].created_by for claim_id in to_deny})
         
-        # Check for future service dates
-        if claim.service_date > datetime.now().date():
-            issues.append(Issue(
-                claim_id=claim.id,
-                issue_type='future_date',
-                description='Service date is in the future',
-                severity='high'
-            ))
+        # Core inserts bypass the ORM flush hooks, so keep the tallies in step here
+        if appeal_deadline is not None:
+            owners = Counter(found[claim_id].created_by for claim_id in to_deny)
+            AppealDeadlineTally.adjust(
+                db.session.connection(),
+                {(owner_id, appeal_deadline): count for owner_id, count in owners.items()},
+            )
+    db.session.commit()
+
+    denied = set(to_deny)
+    results = []
+    for claim_id in claim_ids:
+        row = found.get(claim_id)
+        if row is None:
+            results.append({'claim_id': claim_id, 'claim_number': None, 'result': 'not_found'})
+        else:
+            results.append({
+                'claim_id': claim_id,
+                'claim_number': row.claim_number,
+                'result': 'denied' if claim_id in denied else 'not_pending',
+            })
+    return results
+
+def flag_duplicate_claims(claim_ids):
+    """Add a possible_duplicate issue to each claim whose fingerprint matches an earlier claim.
+
+    One self-join on the fingerprint index per chunk of ids; the claims must
+    already be flushed. Returns the number of issues added.
+    """
+    earlier = aliased(Claim)
+    flagged = 0
+    for chunk in _chunked(claim_ids):
+        rows = db.session.execute(
+            select(Claim.id, earlier.claim_number)
+            .join(earlier, (earlier.fingerprint == Claim.fingerprint) & (earlier.id < Claim.id))
+            .where(Claim.id.in_(chunk))
+            .order_by(Claim.id, earlier.id)
+        ).all()
+        first_match = {}
+        for claim_id, claim_number in rows:
+            first_match.setdefault(claim_id, claim_number)
+        if first_match:
+            db.session.execute(insert(Issue), [
+                {'claim_id': claim_id, 'issue_type': 'possible_duplicate',
+                 'description': _duplicate_description(claim_number), 'severity': 'high'}
+                for claim_id, claim_number in first_match.items()
+            ])
+            flagged += len(first_match)
+    return flagged
+
+def _duplicate_description(claim_number):
+    return f'Same patient, provider, service date and amount as claim {claim_number} (likely CO-18 duplicate)'
+
+def claim_rule_issues(claim_number, total_amount, service_date, today=None):
+    """Return (issue_type, description, severity) for each field rule a claim breaks.
+
+    Pure, so a dry-run upload can apply the same rules without building claims.
+    """
+    today = today or datetime.now().date()
+    issues = []
+    
+    # Check for missing or invalid claim number
+    if not claim_number or len(claim_number) < 3:
+        issues.append(('missing_code', 'Claim number is missing or too short', 'high'))
+    
+    # Check for zero or negative amount
+    if total_amount <= 0:
+        issues.append(('invalid_amount', 'Claim amount is zero or negative', 'high'))
+    
+    # Check for unusually high amounts
+    if total_amount > 50000:  # $50k threshold
+        issues.append(('high_amount', 'Claim amount is unusually high and requires review', 'medium'))
+    
+    # Check for future service dates
+    if service_date > today:
+        issues.append(('future_date', 'Service date is in the future', 'high'))
+    
+    # Check for old service dates (over 1 year)
+    if (today - service_date).days > OLD_CLAIM_DAYS:
+        issues.append(('old_claim', 'Service date is over 1 year old', 'medium'))
+    
+    return issues
+
+# Built once: constructing and cache-keying the SELECT cost more than running it
+_FIRST_WITH_FINGERPRINT = (
+    select(Claim.claim_number).where(Claim.fingerprint == bindparam('fingerprint')).order_by(Claim.id).limit(1)
+)
+_EARLIER_WITH_FINGERPRINT = _FIRST_WITH_FINGERPRINT.where(Claim.id < bindparam('before'))
+
+def analyze_claim(claim, check_duplicates=True):
+    """Analyze a claim for potential issues and create Issue records"""
+    try:
+        issues = [
+            Issue(claim=claim, issue_type=issue_type, description=description, severity=severity)
+            for issue_type, description, severity in claim_rule_issues(
+                claim.claim_number, claim.total_amount, claim.service_date)
+        ]
         
-        # Check for old service dates (over 1 year)
-        if (datetime.now().date() - claim.service_date).days > 365:
-            issues.append(Issue(
-                claim_id=claim.id,
-                issue_type='old_claim',
-                description='Service date is over 1 year old',
-                severity='medium'
-            ))
+        # Check for a resubmission of the same service under another claim number
+        if check_duplicates:
+            fingerprint = claim_fingerprint(claim.patient_id, claim.provider_id, claim.service_date,
+                                            claim.total_amount)
+            # A Core execute never autoflushes, so an unflushed claim cannot match itself
+            connection = db.session.connection()
+            if claim.id is None:
+                duplicate_of = connection.execute(_FIRST_WITH_FINGERPRINT, {'fingerprint': fingerprint}).scalar()
+            else:
+                duplicate_of = connection.execute(_EARLIER_WITH_FINGERPRINT,
+                                                  {'fingerprint': fingerprint, 'before': claim.id}).scalar()
+            if duplicate_of:
+                issues.append(Issue(
+                    claim=claim,
+                    issue_type='possible_duplicate',
+                    description=_duplicate_description(duplicate_of),
+                    severity='high'
+                ))
         
         # Save any issues found
         if issues:
@@ -399,6 +995,13 @@ def analyze_claim(claim):
     except Exception as e:
         current_app.logger.error(f'Claim analysis error: {e}')
 
+@main.route('/admin/cache-stats')
+@login_required
+@require_role('admin')
+def cache_stats():
+    """Admin-only fragment cache hit ratios and store usage."""
+    return jsonify(fragment_cache().stats())
+
 @main.route('/api/denial-codes')
 @login_required
 @limiter.limit("50 per hour")
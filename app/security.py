@@ -6,7 +6,6 @@ import bleach
 from functools import wraps
 from flask import request, jsonify, current_app, abort
 from flask_login import current_user
-import pandas as pd
 from werkzeug.utils import secure_filename
 import os
 
@@ -156,12 +155,15 @@ def secure_file_upload(file, allowed_extensions=None):
     
     return True, "", filename
 
+# Columns every claim upload CSV must have
+CSV_CLAIM_COLUMNS = ['claim_number', 'patient_id', 'provider_id', 'service_date', 'total_amount']
+
 def validate_csv_claims_data(df):
     """Validate CSV claims data structure and content."""
-    required_columns = ['claim_number', 'patient_id', 'provider_id', 'service_date', 'total_amount']
+    import pandas as pd  # Deferred so importing this module stays cheap
     
     # Check required columns
-    missing_columns = [col for col in required_columns if col not in df.columns]
+    missing_columns = [col for col in CSV_CLAIM_COLUMNS if col not in df.columns]
     if missing_columns:
         return False, f"Missing required columns: {', '.join(missing_columns)}"
     
@@ -217,6 +219,15 @@ def require_role(required_role):
         return decorated_function
     return decorator
 
+def allow_large_upload(f):
+    """Decorator to accept request bodies up to UPLOAD_MAX_SIZE instead of MAX_CONTENT_LENGTH.
+
+    The limit is applied by a before_request hook in create_app(), since
+    CSRF protection parses the form before the view runs.
+    """
+    f.allow_large_upload = True
+    return f
+
 def log_security_event(event_type, details, user_id=None):
     """Log security events for monitoring."""
     if user_id is None and current_user.is_authenticated:
@@ -0,0 +1,255 @@
+"""
+Deterministic synthetic data for load and scale testing.
+
+ClaimGenerator draws claims from production-like distributions: a long tail
+of providers, repeat patients, log-normal amounts, weekday-heavy service
+dates, and a status mix that leaves recent claims mostly pending. Denials
+follow observed code frequencies and appeal windows. The same seed always
+yields the same rows.
+
+seed_database() writes users, claims, issues and denials with multi-row
+inserts, in transactions of ``commit_every`` claims. write_upload_csvs()
+emits CSV files in the upload format.
+"""
+import csv
+import itertools
+import os
+import random
+from bisect import bisect
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from sqlalchemy import Date, DateTime, func, select, text
+from werkzeug.security import generate_password_hash
+from app import db
+from app.models import Claim, Denial, Issue, User, AppealDeadlineTally, DataVersion, claim_fingerprint
+
+# Relative frequency of each denial code among denied claims
+DENIAL_CODE_WEIGHTS = {
+    'CO-16': 30,  # Missing information / billing error
+    'PR-2': 14,
+    'CO-97': 16,
+    'CO-18': 12,  # Duplicate
+    'PR-1': 12,
+    'CO-29': 8,   # Timely filing
+    'PR-3': 8,
+}
+APPEAL_WINDOWS = ((30, 2), (60, 4), (90, 3), (180, 1))  # (days, weight)
+HIGH_AMOUNT = 50000
+UPLOAD_COLUMNS = ['claim_number', 'patient_id', 'provider_id', 'service_date', 'total_amount']
+
+class ClaimGenerator:
+    """Reproducible stream of synthetic claim, issue and denial rows."""
+
+    def __init__(self, seed=0, scale=100_000, today=None, prefix='SYN'):
+        self.rng = random.Random(seed)
+        self.seed = seed
+        self.prefix = prefix
+        self.today = today or date.today()
+        provider_count = max(20, scale // 2000)
+        self.providers = [f'PROV{i:05d}' for i in range(provider_count)]
+        # Zipf-like: a few large groups submit most claims
+        self.provider_weights = list(itertools.accumulate(1 / (rank + 1) ** 1.1 for rank in range(provider_count)))
+        self.patient_count = max(100, scale // 4)
+        self.denial_codes = list(DENIAL_CODE_WEIGHTS)
+        self.denial_weights = list(itertools.accumulate(DENIAL_CODE_WEIGHTS.values()))
+        self.appeal_days = [days for days, _ in APPEAL_WINDOWS]
+        self.appeal_weights = list(itertools.accumulate(weight for _, weight in APPEAL_WINDOWS))
+
+    def _pick(self, values, cum_weights):
+        return values[bisect(cum_weights, self.rng.random() * cum_weights[-1])]
+
+    def _between(self, low, high):
+        return low + int(self.rng.random() * (high - low))
+
+    def claim_number(self, index):
+        return f'{self.prefix}{self.seed:04d}{index:09d}'
+
+    def upload_row(self, claim_number):
+        """Return one claim as the dict of upload CSV columns."""
+        rng = self.rng
+        service_date = self._service_date()
+        return {
+            'claim_number': claim_number,
+            'patient_id': f'PAT{int(self.patient_count * rng.random() ** 2):07d}',  # Repeat patients
+            'provider_id': self._pick(self.providers, self.provider_weights),
+            'service_date': service_date,
+            'total_amount': max(15.0, min(round(rng.lognormvariate(6.2, 1.1), 2), 250000.0)),
+        }
+
+    def _service_date(self):
+        service_date = self.today - timedelta(days=int(730 * self.rng.random()))
+        if service_date.weekday() >= 5 and self.rng.random() < 0.8:
+            service_date -= timedelta(days=service_date.weekday() - 4)  # Move most weekend visits to Friday
+        return service_date
+
+    def claim_rows(self, claim_id, index, owner_id):
+        """Return (claim, issues, denial or None) rows for one claim."""
+        rng = self.rng
+        claim = self.upload_row(self.claim_number(index))
+        service_date = claim['service_date']
+        age_days = (self.today - service_date).days
+        created_at = datetime.combine(min(service_date + timedelta(days=self._between(1, 10)), self.today),
+                                      time(self._between(8, 18), self._between(0, 60)))
+
+        if age_days < 45:
+            status = 'pending' if rng.random() < 0.7 else 'approved'
+        else:
+            roll = rng.random()
+            status = 'denied' if roll < 0.14 else 'pending' if roll < 0.24 else 'approved'
+        claim.update(id=claim_id, status=status, created_by=owner_id, created_at=created_at, updated_at=created_at,
+                     fingerprint=claim_fingerprint(claim['patient_id'], claim['provider_id'], service_date,
+                                                   claim['total_amount']))
+
+        # Same rules analyze_claim applies, plus occasional documentation gaps
+        issues = []
+        if claim['total_amount'] > HIGH_AMOUNT:
+            issues.append(('high_amount', 'Claim amount is unusually high and requires review', 'medium'))
+        if age_days > 365:
+            issues.append(('old_claim', 'Service date is over 1 year old', 'medium'))
+        if rng.random() < 0.04:
+            issues.append(('documentation', 'Supporting documentation is missing', 'low'))
+        issue_rows = [
+            {'claim_id': claim_id, 'issue_type': issue_type, 'description': description, 'severity': severity,
+             'status': 'open', 'created_at': created_at, 'updated_at': created_at}
+            for issue_type, description, severity in issues
+        ]
+
+        denial = None
+        if status == 'denied':
+            code = self._pick(self.denial_codes, self.denial_weights)
+            denial_date = min(service_date + timedelta(days=self._between(14, 61)), self.today)
+            deadline = denial_date + timedelta(days=self._pick(self.appeal_days, self.appeal_weights))
+            if deadline < self.today:
+                appeal_status = rng.choices(['pending', 'submitted', 'approved', 'denied'], [15, 35, 30, 20])[0]
+            else:
+                appeal_status = 'pending' if rng.random() < 0.7 else 'submitted'
+            denied_at = datetime.combine(denial_date, time(12))
+            claim['updated_at'] = max(created_at, denied_at)
+            denial = {
+                'claim_id': claim_id, 'denial_code': code, 'denial_reason': _denial_reason(code),
+                'denial_date': denial_date, 'appeal_deadline': deadline, 'appeal_status': appeal_status,
+                'created_at': denied_at, 'updated_at': denied_at,
+            }
+        return claim, issue_rows, denial
+
+def _denial_reason(code):
+    from app.routes import DENIAL_CODES
+    return DENIAL_CODES[code]
+
+def _bulk_insert(connection, table, rows):
+    """Multi-row insert. On SQLite, bind preformatted values and skip per-row type processing."""
+    if not rows:
+        return
+    if connection.dialect.name != 'sqlite':
+        connection.execute(table.insert(), rows)
+        return
+    columns = list(rows[0])
+    converters = []
+    for column in columns:
+        column_type = table.c[column].type
+        if isinstance(column_type, DateTime):
+            converters.append(lambda value: value.isoformat(' ', 'microseconds'))  # SQLAlchemy's storage format
+        elif isinstance(column_type, Date):
+            converters.append(date.isoformat)
+        else:
+            converters.append(None)
+    quote = connection.dialect.identifier_preparer.quote
+    sql = (f"INSERT INTO {quote(table.name)} ({', '.join(quote(column) for column in columns)}) "
+           f"VALUES ({', '.join('?' * len(columns))})")
+    pairs = list(zip(columns, converters))
+    connection.exec_driver_sql(sql, [
+        tuple(convert(row[column]) if convert else row[column] for column, convert in pairs) for row in rows
+    ])
+
+def seed_users(count, password, prefix='seed_user'):
+    """Create ``count`` users (every tenth a manager), reusing existing ones; return their ids."""
+    password_hash = generate_password_hash(password)  # One hash for all: hashing is deliberately slow
+    existing = {user.username: user.id for user in User.query.filter(User.username.like(f'{prefix}%'))}
+    new_rows = []
+    for index in range(count):
+        username = f'{prefix}{index:04d}'
+        if username not in existing:
+            new_rows.append({
+                'username': username, 'email': f'{username}@seed.local', 'password_hash': password_hash,
+                'first_name': 'Seed', 'last_name': f'User{index}', 'role': 'manager' if index % 10 == 0 else 'user',
+                'is_active': True, 'created_at': datetime.utcnow(),
+            })
+    if new_rows:
+        db.session.execute(User.__table__.insert(), new_rows)
+        db.session.commit()
+    return [user_id for _, user_id in sorted(
+        (user.username, user.id) for user in User.query.filter(User.username.like(f'{prefix}%'))
+    )][:count]
+
+def seed_database(claims, owner_ids, seed=0, prefix='SYN', batch_size=10000, commit_every=100_000, progress=None):
+    """Insert ``claims`` synthetic claims (with issues and denials) owned by ``owner_ids``.
+
+    Returns a Counter of rows written per table.
+    """
+    generator = ClaimGenerator(seed, claims, prefix=prefix)
+    if db.session.execute(select(Claim.id).where(Claim.claim_number == generator.claim_number(0))).first():
+        raise ValueError(f'Claims with prefix {prefix} and seed {seed} already exist; use another prefix or seed')
+
+    # Explicit ids let issues and denials reference claims without reading them back
+    next_id = (db.session.execute(select(func.max(Claim.id))).scalar() or 0) + 1
+    owner_rng = random.Random(seed + 1)
+    totals = Counter()
+
+    for txn_start in range(0, claims, commit_every):
+        connection = db.session.connection()
+        tally = Counter()
+        txn_end = min(txn_start + commit_every, claims)
+        for start in range(txn_start, txn_end, batch_size):
+            claim_rows, issue_rows, denial_rows = [], [], []
+            for index in range(start, min(start + batch_size, txn_end)):
+                claim, issues, denial = generator.claim_rows(next_id + index, index, owner_rng.choice(owner_ids))
+                claim_rows.append(claim)
+                issue_rows.extend(issues)
+                if denial:
+                    denial_rows.append(denial)
+                    if denial['appeal_status'] == 'pending':
+                        tally[(claim['created_by'], denial['appeal_deadline'])] += 1
+            _bulk_insert(connection, Claim.__table__, claim_rows)
+            _bulk_insert(connection, Issue.__table__, issue_rows)
+            _bulk_insert(connection, Denial.__table__, denial_rows)
+            totals.update(claims=len(claim_rows), issues=len(issue_rows), denials=len(denial_rows))
+        AppealDeadlineTally.adjust(connection, tally)
+        DataVersion.bump_claims(connection, owner_ids)
+        db.session.commit()
+        if progress:
+            progress(totals)
+
+    if db.engine.dialect.name == 'postgresql':
+        # Explicit ids bypass the sequence; move it past them
+        db.session.execute(text("SELECT setval(pg_get_serial_sequence('claim', 'id'), (SELECT MAX(id) FROM claim))"))
+        db.session.commit()
+    return totals
+
+def write_upload_csvs(directory, files, rows_per_file, seed=0, prefix='UPL', duplicate_rate=0.0,
+                      seeded_claims=0, seeded_prefix='SYN'):
+    """Write CSV files in the upload format; return their paths.
+
+    ``duplicate_rate`` of the rows reuse claim numbers of the ``seeded_claims``
+    previously written by seed_database with the same seed and ``seeded_prefix``,
+    so uploads exercise the duplicate-skipping path.
+    """
+    os.makedirs(directory, exist_ok=True)
+    generator = ClaimGenerator(seed + 1000, max(files * rows_per_file, seeded_claims), prefix=prefix)
+    seeded = ClaimGenerator(seed, seeded_claims or 1, prefix=seeded_prefix)
+    rng = random.Random(seed + 2000)
+    paths = []
+    for file_index in range(files):
+        path = os.path.join(directory, f'claims_{seed:04d}_{file_index:03d}.csv')
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=UPLOAD_COLUMNS, lineterminator='\n')
+            writer.writeheader()
+            for row_index in range(rows_per_file):
+                if seeded_claims and rng.random() < duplicate_rate:
+                    claim_number = seeded.claim_number(rng.randrange(seeded_claims))
+                else:
+                    claim_number = generator.claim_number(file_index * rows_per_file + row_index)
+                row = generator.upload_row(claim_number)
+                row['service_date'] = row['service_date'].isoformat()
+                writer.writerow(row)
+        paths.append(path)
+    return paths
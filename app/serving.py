@@ -0,0 +1,67 @@
+"""
+Production serving: SQLite connection pragmas and per-worker warm-up.
+
+``gunicorn -c gunicorn.conf.py wsgi:app`` builds the app once in the master
+(``preload_app``) and compiles every template there, so forked workers share
+that memory copy-on-write. Each worker then calls warm_up() before taking
+requests: it drops pool connections inherited from the master, opens its own
+(applying SQLITE_PRAGMAS), and loads the per-process caches that would
+otherwise be filled by the first requests it serves.
+"""
+import time
+from sqlalchemy import event, text
+from app import db, warm_templates
+
+def init_sqlite_pragmas(app):
+    """Run SQLITE_PRAGMAS on every new connection to a SQLite database."""
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+def warm_up(app, connections=1):
+    """Ready a freshly forked worker; return {step: milliseconds}.
+
+    Opens ``connections`` pool connections at once (one per request thread
+    is enough), compiles templates and letter templates not already compiled,
+    loads the risk tables and, with WARMUP_ANALYTICS, builds the analytics
+    snapshot.
+    """
+    timings = {}
+
+    def step(name, fn):
+        started = time.perf_counter()
+        fn()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    with app.app_context():
+        # Connections opened before the fork belong to the master; never share them
+        db.engine.dispose(close=False)
+
+        def open_connections():
+            opened = [db.engine.connect() for _ in range(connections)]  # Held together, so each is a new connection
+            try:
+                for connection in opened:
+                    connection.execute(text('SELECT 1'))
+            finally:
+                for connection in opened:
+                    connection.close()
+
+        step('db_connections', open_connections)
+        step('templates', lambda: warm_templates(app))
+        if 'risk' in app.extensions:
+            step('risk_tables', app.extensions['risk'].tables)
+        if app.config.get('WARMUP_ANALYTICS') and 'analytics' in app.extensions:
+            step('analytics_snapshot', app.extensions['analytics'].current)
+        db.session.remove()
+    return timings
@@ -0,0 +1,186 @@
+"""
+Slow-query log with query-plan capture.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are aggregated by fingerprint:
+the SQL with literals and parameter lists collapsed. Bound parameters are
+never stored, because they carry patient and claim identifiers. The first
+time a shape is seen, its plan is captured with EXPLAIN QUERY PLAN (SQLite)
+or EXPLAIN (PostgreSQL), so full table scans show up next to the timing.
+
+Records live in process memory; each worker keeps its own log.
+"""
+import hashlib
+import re
+import threading
+import time
+from datetime import datetime
+from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash, current_app, has_request_context
+from flask_login import login_required, current_user
+from sqlalchemy import event
+from app import db
+from app.security import require_role, log_security_event
+
+slowlog = Blueprint('slowlog', __name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_REPEATED_GROUPS = re.compile(r'(\([^()]*\))(?:\s*,\s*\1)+')
+_WHITESPACE = re.compile(r'\s+')
+
+EXPLAIN_PREFIX = {
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+    'postgresql': 'EXPLAIN ',
+}
+
+def redact_sql(statement):
+    """Return the statement's shape: literals replaced and IN/VALUES lists collapsed."""
+    shape = _STRING_LITERAL.sub('?', statement)
+    shape = _NUMBER_LITERAL.sub('?', shape)
+    shape = _PLACEHOLDER_LIST.sub('(?, ...)', shape)
+    shape = _REPEATED_GROUPS.sub(r'\1, ...', shape)  # Multi-row VALUES (...), (...)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+def fingerprint(shape):
+    return hashlib.sha1(shape.encode('utf-8')).hexdigest()[:12]
+
+class SlowQueryLog:
+    """Thread-safe aggregate of slow statements keyed by fingerprint."""
+
+    def __init__(self, threshold_ms=100, max_shapes=500):
+        self.threshold = threshold_ms / 1000
+        self.max_shapes = max_shapes
+        self.dropped = 0
+        self._records = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement, seconds, endpoint):
+        """Add one slow execution; return the record if this is a new shape, else None."""
+        shape = redact_sql(statement)
+        key = fingerprint(shape)
+        now = datetime.utcnow()
+        with self._lock:
+            record = self._records.get(key)
+            is_new = record is None
+            if is_new:
+                if len(self._records) >= self.max_shapes:
+                    self.dropped += 1
+                    return None
+                record = self._records[key] = {
+                    'fingerprint': key, 'sql': shape, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'endpoints': {}, 'first_seen': now, 'last_seen': now, 'plan': None, 'full_scan': None,
+                }
+            record['count'] += 1
+            record['total_ms'] += seconds * 1000
+            record['max_ms'] = max(record['max_ms'], seconds * 1000)
+            record['last_seen'] = now
+            record['endpoints'][endpoint] = record['endpoints'].get(endpoint, 0) + 1
+        return record if is_new else None
+
+    def set_plan(self, key, plan_lines):
+        with self._lock:
+            record = self._records.get(key)
+            if record is not None:
+                record['plan'] = plan_lines
+                record['full_scan'] = any(_is_full_scan(line) for line in plan_lines)
+
+    def records(self):
+        """Return records sorted by total time, slowest first."""
+        with self._lock:
+            records = [dict(record, endpoints=dict(record['endpoints'])) for record in self._records.values()]
+        for record in records:
+            record['avg_ms'] = record['total_ms'] / record['count']
+        return sorted(records, key=lambda record: record['total_ms'], reverse=True)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self.dropped = 0
+
+def _is_full_scan(line):
+    # SQLite: "SCAN claim" (not "SEARCH ... USING INDEX"); PostgreSQL: "Seq Scan on claim"
+    if line.startswith('SCAN '):
+        return 'USING' not in line and 'CONSTANT ROW' not in line
+    return 'Seq Scan' in line
+
+def explain(connection, dialect, statement, parameters):
+    """Return the plan for a statement as a list of redacted lines."""
+    prefix = EXPLAIN_PREFIX.get(dialect)
+    if prefix is None:
+        return ['EXPLAIN not supported for this database']
+    cursor = connection.cursor()  # Raw DBAPI cursor, so this does not re-enter the listeners
+    try:
+        cursor.execute(prefix + statement, parameters)
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    if dialect == 'sqlite':
+        lines = [row[-1] for row in rows]
+    else:
+        lines = [row[0] for row in rows]
+    return [redact_sql(str(line)) for line in lines]
+
+def _instrument_engine(engine, log):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('slowlog_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['slowlog_started'].pop()
+        if elapsed < log.threshold:
+            return
+        endpoint = (request.endpoint or 'unmatched') if has_request_context() else 'background'
+        record = log.record(statement, elapsed, endpoint)
+        if record is None:
+            return  # Shape already known: its plan was captured on first sight
+
+        current_app.logger.warning(f"Slow query {record['fingerprint']} ({elapsed * 1000:.0f} ms in {endpoint}): "
+                                   f"{record['sql'][:200]}")
+        if executemany or statement.lstrip()[:6].upper() not in ('SELECT', 'WITH', 'UPDATE', 'DELETE'):
+            return
+        try:
+            plan = explain(conn.connection.dbapi_connection, conn.dialect.name, statement, parameters)
+        except Exception as e:
+            plan = [f'EXPLAIN failed: {type(e).__name__}']
+        log.set_plan(record['fingerprint'], plan)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(context):
+        if context.connection is not None and context.connection.info.get('slowlog_started'):
+            context.connection.info['slowlog_started'].pop()
+
+def slow_query_log():
+    """Return the current application's SlowQueryLog."""
+    return current_app.extensions['slow_queries']
+
+@slowlog.route('/admin/slow-queries')
+@login_required
+@require_role('admin')
+def slow_queries():
+    """Slow statements aggregated by fingerprint, as a page or ?format=json."""
+    log = slow_query_log()
+    records = log.records()
+    if request.args.get('format') == 'json':
+        return jsonify({'threshold_ms': log.threshold * 1000, 'dropped': log.dropped, 'queries': records})
+    return render_template('admin/slow_queries.html', records=records, threshold_ms=log.threshold * 1000,
+                           dropped=log.dropped)
+
+@slowlog.route('/admin/slow-queries/reset', methods=['POST'])
+@login_required
+@require_role('admin')
+def reset_slow_queries():
+    slow_query_log().clear()
+    log_security_event('SLOW_QUERY_LOG_RESET', 'Slow query log cleared', current_user.id)
+    flash('Slow query log cleared.', 'success')
+    return redirect(url_for('slowlog.slow_queries'))
+
+def init_slowlog(app):
+    """Attach the slow-query log and its SQL listeners to the app."""
+    if not app.config.get('SLOW_QUERY_LOG_ENABLED', True):
+        return
+    log = SlowQueryLog(app.config.get('SLOW_QUERY_THRESHOLD_MS', 100), app.config.get('SLOW_QUERY_MAX_SHAPES', 500))
+    app.extensions['slow_queries'] = log
+    app.register_blueprint(slowlog)
+    with app.app_context():
+        _instrument_engine(db.engine, log)
@@ -0,0 +1,211 @@
+"""
+Dry-run checks of claim upload CSVs.
+
+check_claims_csv() runs an upload through the same field validation, claim
+number checks and issue rules as import_claims_csv(), but writes nothing to
+the database. Rows are streamed with the csv module in batches of
+UPLOAD_CHECK_BATCH_SIZE; claim numbers and fingerprints are looked up with one
+IN query per chunk. Only SELECTs run, so no write lock is taken and a large
+check does not hold up other users' imports.
+
+The import stops at the first five invalid rows. A check reports every
+rejected row with all of its reasons in a CSV report, saved under
+``UPLOAD_PATH/reports`` for its owner to download until UPLOAD_SESSION_TTL.
+"""
+import csv
+import io
+import os
+import re
+import secrets
+import time
+from collections import Counter
+from contextlib import suppress
+from datetime import date, datetime
+from flask import current_app
+from sqlalchemy import select
+from app import db
+from app.models import Claim, claim_fingerprint
+from app.routes import _chunked, claim_numbers_in_use, claim_rule_issues
+from app.security import (
+    CSV_CLAIM_COLUMNS, validate_claim_number, validate_patient_id, validate_provider_id, validate_amount
+)
+from app.uploads import remove_stale
+
+REPORT_COLUMNS = ['row', 'reasons'] + CSV_CLAIM_COLUMNS
+REPORT_TOKEN = re.compile(r'^[0-9a-f]{32}$')
+
+def _reports_root():
+    return os.path.join(current_app.config.get('UPLOAD_PATH', 'uploads'), 'reports')
+
+def report_path(user_id, token):
+    """Return the path of ``user_id``'s report ``token``, or None if the token is malformed."""
+    if not REPORT_TOKEN.match(token or ''):
+        return None
+    return os.path.join(_reports_root(), f'{int(user_id)}-{token}.csv')
+
+def _parse_service_date(value, cache):
+    """Parse a service date as the import would, caching by string since dates repeat."""
+    if value not in cache:
+        try:
+            cache[value] = datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            import pandas as pd  # Only for other date formats, which the import also accepts
+            try:
+                parsed = pd.to_datetime(value)
+                cache[value] = None if pd.isna(parsed) else parsed.date()
+            except Exception:
+                cache[value] = None
+    return cache[value]
+
+def _field_errors(row, dates):
+    """Return (reasons, service_date, amount) for one row; reasons is empty when every field is valid."""
+    reasons = []
+    for column, validate in (('claim_number', validate_claim_number), ('patient_id', validate_patient_id),
+                             ('provider_id', validate_provider_id), ('total_amount', validate_amount)):
+        valid, msg = validate(row[column])
+        if not valid:
+            reasons.append(msg)
+    service_date = _parse_service_date(row['service_date'], dates)
+    if service_date is None:
+        reasons.append('Invalid service date format')
+    amount = None if reasons else float(row['total_amount'])
+    return reasons, service_date, amount
+
+def _risk_flags(providers, amounts, ages):
+    """Return how many of these claims score at or above RISK_SCORE_THRESHOLD (0 before the tables exist)."""
+    scorer = current_app.extensions.get('risk')
+    tables = scorer.tables() if scorer is not None and providers else None
+    if tables is None:
+        return 0
+    threshold = current_app.config.get('RISK_SCORE_THRESHOLD', 0.3)
+    return int((tables.score(providers, amounts, ages) >= threshold).sum())
+
+class _Check:
+    """Running state of one check: what earlier rows claimed, and the counts so far."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.today = date.today()
+        self.dates = {}
+        self.numbers = {}  # claim number -> first row using it
+        self.fingerprints = {}  # fingerprint -> claim number of the first new row with it
+        self.counts = Counter()
+        self.issues = Counter()
+
+    def reject(self, row_num, row, reasons):
+        self.counts['rejected'] += 1
+        self.writer.writerow([row_num, '; '.join(reasons)] + [row[column] for column in CSV_CLAIM_COLUMNS])
+
+    def batch(self, rows):
+        """Check (row number, row) pairs in file order."""
+        in_use = claim_numbers_in_use(list({row['claim_number'] for _, row in rows}))
+        new = []
+        for row_num, row in rows:
+            reasons, service_date, amount = _field_errors(row, self.dates)
+            if reasons:
+                self.counts['invalid'] += 1
+            number = row['claim_number']
+            if number in in_use:
+                reasons.append('Claim number already exists')
+            elif number in self.numbers:
+                reasons.append(f'Claim number repeats row {self.numbers[number]}')
+            else:
+                self.numbers[number] = row_num
+            if reasons:
+                self.reject(row_num, row, reasons)
+                continue
+            new.append((row, service_date, amount))
+        self.counts['new'] += len(new)
+        self.analyze(new)
+
+    def analyze(self, new):
+        """Count the issues the import would open on these new claims."""
+        if not new:
+            return
+        fingerprints = [
+            claim_fingerprint(row['patient_id'], row['provider_id'], service_date, amount)
+            for row, service_date, amount in new
+        ]
+        earlier = {}
+        for chunk in _chunked(list(set(fingerprints))):
+            for fingerprint, claim_number in db.session.execute(
+                select(Claim.fingerprint, Claim.claim_number).where(Claim.fingerprint.in_(chunk)).order_by(Claim.id)
+            ):
+                earlier.setdefault(fingerprint, claim_number)
+        for (row, service_date, amount), fingerprint in zip(new, fingerprints):
+            self.issues.update(issue_type for issue_type, _, _ in
+                               claim_rule_issues(row['claim_number'], amount, service_date, self.today))
+            duplicate_of = earlier.get(fingerprint) or self.fingerprints.get(fingerprint)
+            if duplicate_of:
+                self.issues['possible_duplicate'] += 1
+            else:
+                self.fingerprints[fingerprint] = row['claim_number']
+        flagged = _risk_flags(
+            [row['provider_id'] for row, _, _ in new],
+            [amount for _, _, amount in new],
+            [(self.today - service_date).days for _, service_date, _ in new],
+        )
+        if flagged:
+            self.issues['denial_risk'] += flagged
+
+def check_claims_csv(source, user_id, batch_size=None):
+    """Check an upload CSV without importing it; return a summary dict.
+
+    ``source`` is a path or binary file object. The summary has ``rows``,
+    ``new`` (rows the import would create), ``rejected`` rows split into
+    ``invalid`` (bad fields; the import refuses the whole file while there
+    are any) and ``duplicates`` (claim number in use or repeated, which the
+    import skips), ``issues`` the new claims would open by type, ``report``
+    (the token of the rejected-row CSV, or None) and ``seconds``. Raises
+    ValueError when the file is not a readable claims CSV.
+    """
+    started = time.perf_counter()
+    batch_size = batch_size or current_app.config.get('UPLOAD_CHECK_BATCH_SIZE', 5000)
+    remove_stale(_reports_root(), current_app.config.get('UPLOAD_SESSION_TTL', 24 * 3600))
+    os.makedirs(_reports_root(), exist_ok=True)
+    token = secrets.token_hex(16)
+    path = report_path(user_id, token)
+    partial = f'{path}.tmp'
+
+    stream = open(source, 'rb') if isinstance(source, (str, os.PathLike)) else source
+    try:
+        with io.TextIOWrapper(stream, encoding='utf-8-sig', newline='') as text, \
+                open(partial, 'w', newline='') as report:
+            reader = csv.DictReader(text)
+            missing = [column for column in CSV_CLAIM_COLUMNS if column not in (reader.fieldnames or [])]
+            if missing:
+                raise ValueError(f"Missing required columns: {', '.join(missing)}")
+            writer = csv.writer(report)
+            writer.writerow(REPORT_COLUMNS)
+            check = _Check(writer)
+            rows = []
+            # Row 1 is the header; short rows are padded with '' so every column reads as a string
+            for row_num, row in enumerate(reader, start=2):
+                rows.append((row_num, {column: row[column] or '' for column in CSV_CLAIM_COLUMNS}))
+                if len(rows) >= batch_size:
+                    check.batch(rows)
+                    rows = []
+            if rows:
+                check.batch(rows)
+    except Exception as e:
+        with suppress(OSError):
+            os.remove(partial)
+        if isinstance(e, csv.Error):
+            raise ValueError(f'Invalid CSV format: {e}') from e
+        raise
+
+    counts = check.counts
+    if counts['rejected']:
+        os.replace(partial, path)
+    else:
+        os.remove(partial)
+    return {
+        'rows': counts['new'] + counts['rejected'],
+        'new': counts['new'],
+        'rejected': counts['rejected'],
+        'invalid': counts['invalid'],
+        'duplicates': counts['rejected'] - counts['invalid'],
+        'issues': dict(check.issues.most_common()),
+        'report': token if counts['rejected'] else None,
+        'seconds': round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,284 @@
+"""
+Resumable chunked uploads of claim CSVs.
+
+A single upload request is capped by MAX_CONTENT_LENGTH. Larger files are
+sent in UPLOAD_CHUNK_SIZE pieces:
+
+1. ``POST /api/uploads`` with ``{"filename", "size", "sha256"}`` (sha256
+   optional) starts a session. If the user already uploaded a file with that
+   hash, the earlier result comes back at once with ``duplicate: true``.
+   Files over UPLOAD_IMPORT_MAX_SIZE are refused here, since the import runs
+   in one request; add ``"dry_run": true`` to only check one, up to
+   UPLOAD_MAX_SIZE.
+2. ``PUT /api/uploads/<id>/chunks/<index>`` sends the raw bytes of one chunk.
+   Re-sending a chunk replaces it.
+3. ``GET /api/uploads/<id>`` lists the chunks received so far, so a client
+   can resume after a timeout by sending only the missing ones.
+4. ``POST /api/uploads/<id>/complete`` assembles the file, checks its size
+   and hash, and imports it like a form upload. With ``{"dry_run": true}``
+   it returns a check of every row instead (see app.upload_check) and keeps
+   the chunks for a later import.
+
+Chunks are staged under ``UPLOAD_PATH/chunks/<id>/`` next to a manifest, so
+any worker sharing UPLOAD_PATH can take any request. Sessions left unfinished
+(no chunk for UPLOAD_SESSION_TTL seconds) are removed when new ones start.
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import shutil
+import time
+from flask import Blueprint, request, jsonify, current_app, url_for
+from flask_login import login_required, current_user
+from werkzeug.utils import secure_filename
+from app import db, limiter
+from app.models import UploadRecord
+from app.security import log_security_event
+
+uploads = Blueprint('uploads', __name__)
+
+MANIFEST = 'manifest.json'
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+def _staging_root():
+    return os.path.join(current_app.config.get('UPLOAD_PATH', 'uploads'), 'chunks')
+
+def _expected_chunks(manifest):
+    return -(-manifest['size'] // manifest['chunk_size'])
+
+def _chunk_path(directory, index):
+    return os.path.join(directory, f'{index:06d}.part')
+
+def _received(directory):
+    return sorted(int(name[:-5]) for name in os.listdir(directory) if name.endswith('.part'))
+
+def _record_json(record, duplicate):
+    return {
+        'duplicate': duplicate,
+        'filename': record.filename,
+        'sha256': record.content_hash,
+        'claims_created': record.claims_created,
+        'claims_skipped': record.claims_skipped,
+        'uploaded_at': record.created_at.isoformat(),
+    }
+
+def _session(upload_id):
+    """Return (directory, manifest) for the current user's session, or (None, None)."""
+    if not UPLOAD_ID.match(upload_id):
+        return None, None
+    directory = os.path.join(_staging_root(), upload_id)
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None, None
+    if manifest['user_id'] != current_user.id:
+        return None, None
+    return directory, manifest
+
+def _status(upload_id, directory, manifest):
+    received = _received(directory)
+    received_set = set(received)
+    return {
+        'upload_id': upload_id,
+        'filename': manifest['filename'],
+        'size': manifest['size'],
+        'chunk_size': manifest['chunk_size'],
+        'chunks': _expected_chunks(manifest),
+        'received': received,
+        'missing': [index for index in range(_expected_chunks(manifest)) if index not in received_set],
+    }
+
+def remove_stale(root, max_age):
+    """Delete entries of ``root`` not modified for ``max_age`` seconds; return how many."""
+    if not os.path.isdir(root):
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            stale = os.path.getmtime(path) < cutoff  # A session directory is bumped by every chunk written
+        except OSError:
+            continue
+        if stale:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+            removed += 1
+    return removed
+
+def remove_stale_sessions(max_age):
+    """Delete staged uploads with no new chunk for ``max_age`` seconds; return how many."""
+    return remove_stale(_staging_root(), max_age)
+
+@uploads.route('', methods=['POST'])
+@login_required
+@limiter.limit("20 per hour")
+def start_upload():
+    """Start a chunked upload, or return the earlier result for a file already uploaded."""
+    from app.routes import import_size_error
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+
+    filename = secure_filename(str(payload.get('filename') or ''))
+    if not filename:
+        return jsonify({'error': 'Invalid filename'}), 400
+    allowed = current_app.config.get('UPLOAD_EXTENSIONS', ['.csv'])
+    if os.path.splitext(filename)[1].lower() not in allowed:
+        return jsonify({'error': f"File type not allowed. Allowed types: {', '.join(allowed)}"}), 400
+
+    size = payload.get('size')
+    max_size = current_app.config.get('UPLOAD_MAX_SIZE', 512 * 1024 * 1024)
+    if not isinstance(size, int) or isinstance(size, bool) or not 0 < size <= max_size:
+        return jsonify({'error': f'size must be a whole number of bytes between 1 and {max_size}'}), 400
+    if payload.get('dry_run') is not True and import_size_error(size):
+        return jsonify({'error': import_size_error(size)}), 413
+
+    content_hash = str(payload.get('sha256') or '').lower() or None
+    if content_hash and not re.match(r'^[0-9a-f]{64}$', content_hash):
+        return jsonify({'error': 'sha256 must be 64 hex digits'}), 400
+    if content_hash:
+        prior = UploadRecord.prior(current_user.id, content_hash)
+        if prior:
+            return jsonify(_record_json(prior, duplicate=True))
+
+    remove_stale_sessions(current_app.config.get('UPLOAD_SESSION_TTL', 24 * 3600))
+    upload_id = secrets.token_hex(16)
+    directory = os.path.join(_staging_root(), upload_id)
+    os.makedirs(directory, mode=0o700)
+    manifest = {
+        'user_id': current_user.id,
+        'filename': filename,
+        'size': size,
+        'sha256': content_hash,
+        'chunk_size': current_app.config.get('UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024),
+    }
+    with open(os.path.join(directory, MANIFEST), 'w') as f:
+        json.dump(manifest, f)
+    return jsonify(_status(upload_id, directory, manifest)), 201
+
+@uploads.route('/<upload_id>', methods=['GET'])
+@login_required
+def upload_status(upload_id):
+    """Report which chunks have arrived, for resuming."""
+    directory, manifest = _session(upload_id)
+    if directory is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    return jsonify(_status(upload_id, directory, manifest))
+
+@uploads.route('/<upload_id>/chunks/<int:index>', methods=['PUT'])
+@login_required
+@limiter.limit("2000 per hour")
+def put_chunk(upload_id, index):
+    """Store one chunk. Every chunk but the last must be exactly chunk_size bytes."""
+    directory, manifest = _session(upload_id)
+    if directory is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    chunks = _expected_chunks(manifest)
+    if index >= chunks:
+        return jsonify({'error': f'Chunk index must be below {chunks}'}), 400
+
+    data = request.get_data(cache=False)
+    expected = min(manifest['chunk_size'], manifest['size'] - index * manifest['chunk_size'])
+    if len(data) != expected:
+        return jsonify({'error': f'Chunk {index} must be {expected} bytes, got {len(data)}'}), 400
+
+    # Write then rename, so a chunk cut off mid-request is never taken as received
+    path = _chunk_path(directory, index)
+    partial = f'{path}.{secrets.token_hex(4)}.tmp'
+    with open(partial, 'wb') as f:
+        f.write(data)
+    os.replace(partial, path)
+    return jsonify({'upload_id': upload_id, 'index': index, 'bytes': len(data)})
+
+@uploads.route('/<upload_id>/complete', methods=['POST'])
+@login_required
+@limiter.limit("20 per hour")
+def complete_upload(upload_id):
+    """Assemble the chunks, verify size and hash, and import the claims.
+
+    With ``{"dry_run": true}`` the file is only checked, as on the upload
+    page, and the chunks are kept so the same session can be completed again
+    to import it.
+    """
+    from app.routes import import_claims_csv, import_size_error
+    from app.upload_check import check_claims_csv
+    import pandas as pd  # Heavy; only upload needs it
+
+    directory, manifest = _session(upload_id)
+    if directory is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    status = _status(upload_id, directory, manifest)
+    if status['missing']:
+        return jsonify({'error': 'Upload is missing chunks', **status}), 409
+    dry_run = (request.get_json(silent=True) or {}).get('dry_run') is True
+    if not dry_run and import_size_error(manifest['size']):  # Started as a check only
+        return jsonify({'error': import_size_error(manifest['size'])}), 413
+
+    # Assemble in one pass, hashing as we go
+    assembled = os.path.join(directory, 'assembled')
+    digest = hashlib.sha256()
+    size = 0
+    with open(assembled, 'wb') as out:
+        for index in range(status['chunks']):
+            with open(_chunk_path(directory, index), 'rb') as part:
+                for block in iter(lambda: part.read(1024 * 1024), b''):
+                    digest.update(block)
+                    out.write(block)
+                    size += len(block)
+    content_hash = digest.hexdigest()
+    if size != manifest['size'] or (manifest['sha256'] and manifest['sha256'] != content_hash):
+        shutil.rmtree(directory, ignore_errors=True)
+        return jsonify({'error': 'Assembled file does not match the declared size or sha256; start over'}), 400
+
+    try:
+        prior = UploadRecord.prior(current_user.id, content_hash)
+        if dry_run:
+            check = check_claims_csv(assembled, current_user.id)
+            return jsonify({
+                **check,
+                'upload_id': upload_id,
+                'sha256': content_hash,
+                'uploaded_at': prior.created_at.isoformat() if prior else None,
+                'report_url': url_for('main.download_upload_report', token=check['report'])
+                              if check['report'] else None,
+            })
+        if prior:
+            return jsonify(_record_json(prior, duplicate=True))
+        record = import_claims_csv(assembled, manifest['filename'], content_hash, size)
+        return jsonify(_record_json(record, duplicate=False))
+    except pd.errors.EmptyDataError:
+        return jsonify({'error': 'Uploaded file is empty.'}), 400
+    except pd.errors.ParserError:
+        return jsonify({'error': 'Invalid CSV format.'}), 400
+    except ValueError as e:  # After the pandas errors, which subclass it
+        return jsonify({'error': f'Invalid CSV data: {e}'}), 400
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.error(f'Chunked upload error: {e}')
+        log_security_event('UPLOAD_FAILED', f'Chunked upload {upload_id} failed', current_user.id)
+        return jsonify({'error': 'Error processing file. Please check the format.'}), 500
+    finally:
+        if dry_run:
+            os.remove(assembled)
+        else:
+            shutil.rmtree(directory, ignore_errors=True)
+
+@uploads.route('/<upload_id>', methods=['DELETE'])
+@login_required
+def cancel_upload(upload_id):
+    """Discard a chunked upload and its staged chunks."""
+    directory, _ = _session(upload_id)
+    if directory is None:
+        return jsonify({'error': 'Upload not found'}), 404
+    shutil.rmtree(directory, ignore_errors=True)
+    return '', 204
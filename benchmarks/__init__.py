@@ -0,0 +1,5 @@
+"""Performance benchmarks for the Denial Management System.
+
+Run individual benchmarks as modules from the project root, e.g.
+``python -m benchmarks.bench_compression``.
+"""
@@ -0,0 +1,58 @@
+"""
+Bandwidth/latency benchmark for response compression.
+
+Measures server time and bytes on the wire for the claims list (HTML), the
+CSV export and the JSON API under each available encoding, then estimates
+end-to-end latency over a link of the given bandwidth and round-trip time.
+
+    python -m benchmarks.bench_compression --claims 3000 --mbps 10 --rtt-ms 40
+"""
+import argparse
+import os
+from app.compression import available_encodings
+from benchmarks.common import build_app, create_user, seed_claims, login, time_call
+
+ENDPOINTS = [
+    ('claims list (HTML)', '/claims'),
+    ('export (CSV)', '/claims/export'),
+    ('api v1 (JSON)', '/api/v1/claims?limit=500&embed=issues'),
+]
+
+def run(claims, mbps, rtt_ms, repeat):
+    app = build_app()
+    try:
+        with app.app_context():
+            user = create_user()
+            seed_claims(user.id, claims)
+
+        client = app.test_client()
+        login(client)
+        encodings = ['identity'] + sorted(available_encodings())
+        bytes_per_second = mbps * 1_000_000 / 8
+
+        print(f'{claims} claims, {mbps} Mbit/s link, {rtt_ms} ms RTT, median of {repeat}')
+        print(f"{'endpoint':<22}{'encoding':<10}{'bytes':>12}{'ratio':>8}{'server ms':>11}{'est. total ms':>15}")
+        for label, url in ENDPOINTS:
+            baseline = None
+            for encoding in encodings:
+                seconds, response = time_call(
+                    lambda: client.get(url, headers={'Accept-Encoding': encoding}).get_data(), repeat)
+                size = len(response)
+                baseline = baseline or size
+                total_ms = (seconds + size / bytes_per_second) * 1000 + rtt_ms
+                print(f'{label:<22}{encoding:<10}{size:>12,}{size / baseline:>8.2f}'
+                      f'{seconds * 1000:>11.1f}{total_ms:>15.1f}')
+    finally:
+        os.remove(app.bench_db_path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--claims', type=int, default=3000, help='Number of synthetic claims')
+    parser.add_argument('--mbps', type=float, default=10.0, help='Link bandwidth in Mbit/s')
+    parser.add_argument('--rtt-ms', type=float, default=40.0, help='Round-trip time in milliseconds')
+    parser.add_argument('--repeat', type=int, default=5, help='Requests per measurement')
+    args = parser.parse_args()
+    run(args.claims, args.mbps, args.rtt_ms, args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Per-request overhead of each connection pool profile.
+
+Every scenario builds a fresh app, seeds a few claims and sends the same mix
+of read requests (claims API page, claim detail) from ``--threads`` logged-in
+clients. It reports request latency and, from the pool metrics, checkout
+wait per request, connections opened, and the most connections in use and in
+overflow at once:
+
+- legacy:         QueuePool with pre-ping and 300 s recycling (the old fixed options)
+- sqlite-file:    QueuePool, no pre-ping, no recycling
+- server-db:      the server profile (pre-ping, LIFO, recycling) run on the SQLite file
+- sqlite-memory:  StaticPool on an in-memory database (one thread only)
+
+On SQLite a pre-ping costs a local round trip; on a database server it is a
+network round trip, so the legacy and server-db rows are a lower bound.
+
+    python -m benchmarks.bench_pool --requests 2000 --threads 1,8
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+from benchmarks.common import build_app, create_user, seed_claims, login
+from app import db
+
+SCENARIOS = {
+    'legacy': {'POOL_PROFILE': 'sqlite-file',
+               'SQLALCHEMY_ENGINE_OPTIONS': {'pool_pre_ping': True, 'pool_recycle': 300}},
+    'sqlite-file': {'POOL_PROFILE': 'sqlite-file'},
+    'server-db': {'POOL_PROFILE': 'server-db'},
+    'sqlite-memory': {'POOL_PROFILE': 'sqlite-memory', 'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'},
+}
+
+def _pool_stats(registry, profile):
+    merged = registry.collect()
+    labels = (('profile', profile),)
+    _, wait_total, checkouts = merged['histograms'].get(('dms_db_pool_checkout_wait_seconds', labels),
+                                                        (None, 0.0, 0))
+    gauges = {name: value for (name, gauge_labels), value in merged['gauges'].items()
+              if dict(gauge_labels).get('profile') == profile}
+    return {
+        'checkouts': checkouts,
+        'wait_seconds': wait_total,
+        'connections': merged['counters'].get(('dms_db_pool_connections_total', labels), 0),
+        'peak_in_use': gauges.get('dms_db_pool_checked_out_max'),
+        'peak_overflow': gauges.get('dms_db_pool_overflow_max'),
+    }
+
+def run_scenario(name, requests, threads, claims=200):
+    app = build_app(**SCENARIOS[name])
+    try:
+        with app.app_context():
+            user = create_user()
+            seed_claims(user.id, claims)
+            claim_ids = list(range(1, claims + 1))
+            db.session.remove()
+        clients = [app.test_client() for _ in range(threads)]
+        for client in clients:
+            login(client)
+        registry, profile = app.extensions['metrics'], app.config['POOL_PROFILE']
+        before = _pool_stats(registry, profile)
+
+        latencies = [[] for _ in range(threads)]
+
+        def worker(index):
+            client = clients[index]
+            for i in range(index, requests, threads):
+                path = '/api/v1/claims?limit=20' if i % 2 else f'/claims/{claim_ids[i % claims]}'
+                started = time.perf_counter()
+                response = client.get(path)
+                latencies[index].append(time.perf_counter() - started)
+                assert response.status_code == 200, (path, response.status_code)
+
+        started = time.perf_counter()
+        workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        after = _pool_stats(registry, profile)
+        samples = sorted(value for values in latencies for value in values)
+        checkouts = after['checkouts'] - before['checkouts']
+        return {
+            'requests_per_second': len(samples) / elapsed,
+            'mean_ms': statistics.fmean(samples) * 1000,
+            'p99_ms': samples[int(len(samples) * 0.99) - 1] * 1000,
+            'checkouts_per_request': checkouts / len(samples),
+            'wait_us_per_request': (after['wait_seconds'] - before['wait_seconds']) / len(samples) * 1e6,
+            'connections_opened': after['connections'],
+            'peak_in_use': after['peak_in_use'],
+            'peak_overflow': after['peak_overflow'],
+        }
+    finally:
+        os.remove(app.bench_db_path)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', default='1,8', help='Comma-separated client thread counts')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    args = parser.parse_args()
+
+    print(f"{'scenario':<15}{'threads':>8}{'req/s':>9}{'mean ms':>9}{'p99 ms':>9}{'checkouts/req':>15}"
+          f"{'wait us/req':>13}{'opened':>8}{'peak':>6}{'overflow':>10}")
+    for name in args.scenarios.split(','):
+        for threads in (int(value) for value in args.threads.split(',')):
+            if name == 'sqlite-memory' and threads > 1:
+                continue  # One shared connection; not meant for concurrent use
+            r = run_scenario(name, args.requests, threads)
+            print(f"{name:<15}{threads:>8}{r['requests_per_second']:>9.0f}{r['mean_ms']:>9.2f}{r['p99_ms']:>9.2f}"
+                  f"{r['checkouts_per_request']:>15.2f}{r['wait_us_per_request']:>13.1f}"
+                  f"{r['connections_opened']:>8}{r['peak_in_use'] if r['peak_in_use'] is not None else '-':>6}"
+                  f"{r['peak_overflow'] if r['peak_overflow'] is not None else '-':>10}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Throughput and memory of 835 remittance ingest.
+
+Seeds ``--claims`` pending claims, then writes an 835 with ``--loops`` CLP
+loops (a claim loop with one service line each, as payers send them).
+``--denial-rate`` of the loops deny a seeded claim; ``--unmatched-rate`` name
+claims we do not have; the rest are paid. It reports the file size, ingest
+time, MB/s and how much the peak RSS of the process grew during the ingest.
+A file of a few hundred MB should leave the peak close to where it started.
+
+For comparison, it then denies ``--manual`` claims the way the claim page
+does: one claim loaded, one Denial added and one commit at a time.
+
+    python -m benchmarks.bench_remittance --claims 200000 --loops 2000000
+"""
+import argparse
+import os
+import random
+import resource
+import time
+from datetime import date
+from benchmarks.common import build_app, create_user, seed_claims
+from app import db
+from app.models import Claim, Denial, DataVersion
+from app.remittance import ingest_835
+from app.routes import DENIAL_CODES
+
+ISA = 'ISA*00*          *00*          *ZZ*PAYER          *ZZ*PROVIDER       *240501*1200*^*00501*000000001*0*P*:~\n'
+CODES = ['CO-16', 'CO-18', 'CO-29', 'CO-97', 'PR-1', 'PR-2', 'PR-3', 'CO-50']
+
+def write_era(path, loops, claims, denial_rate, unmatched_rate, seed=0):
+    """Write an 835 with ``loops`` claim loops, mostly paid; denied loops name seeded claims."""
+    rng = random.Random(seed)
+    denied = rng.sample(range(claims), min(claims, int(loops * denial_rate)))
+    denied_at = set(rng.sample(range(loops), len(denied)))
+    denied = iter(denied)
+    with open(path, 'w') as f:
+        f.write(ISA)
+        f.write('GS*HP*PAYER*PROVIDER*20240501*1200*1*X*005010X221A1~\nST*835*0001~\n'
+                'BPR*I*0*C*NON************20240501~\nTRN*1*12345*1512345678~\nDTM*405*20240502~\nN1*PR*PAYER~\nLX*1~\n')
+        for i in range(loops):
+            if i in denied_at:
+                number, status, paid = f'BCH{next(denied):08d}', '4', 0
+                group, reason = rng.choice(CODES).split('-')
+            elif rng.random() < unmatched_rate:
+                number, status, paid, group, reason = f'UNK{i:08d}', '4', 0, 'CO', '16'
+            else:
+                number, status, paid, group, reason = f'PAID{i:08d}', '1', 120, 'CO', '45'
+            f.write(f'CLP*{number}*{status}*150*{paid}*0*12*PAYER{i:010d}~\nNM1*QC*1*DOE*JANE****MI*M{i:09d}~\n'
+                    f'DTM*232*20240315~\nCAS*{group}*{reason}*{150 - paid}~\n'
+                    f'SVC*HC:99213*150*{paid}~\nDTM*472*20240315~\nCAS*{group}*{reason}*{150 - paid}~\n')
+        f.write('SE*99*0001~\nGE*1*1~\nIEA*1*000000001~\n')
+
+def manual_denials(claim_numbers):
+    """Deny claims one at a time, as the deny_claim view does; return seconds."""
+    started = time.perf_counter()
+    for claim_number in claim_numbers:
+        claim = Claim.query.filter_by(claim_number=claim_number).one()
+        db.session.add(Denial(claim_id=claim.id, denial_code='CO-16', denial_reason=DENIAL_CODES['CO-16'],
+                              denial_date=date(2024, 5, 2)))
+        claim.status = 'denied'
+        DataVersion.bump_claims(db.session.connection(), [claim.created_by])
+        db.session.commit()
+    return time.perf_counter() - started
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--claims', type=int, default=200_000)
+    parser.add_argument('--loops', type=int, default=2_000_000)
+    parser.add_argument('--denial-rate', type=float, default=0.08)
+    parser.add_argument('--unmatched-rate', type=float, default=0.01)
+    parser.add_argument('--manual', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = build_app()
+    era_path = f'{app.bench_db_path}.835'
+    try:
+        with app.app_context():
+            user = create_user()
+            seed_claims(user.id, args.claims)
+            write_era(era_path, args.loops, args.claims, args.denial_rate, args.unmatched_rate)
+            size_mb = os.path.getsize(era_path) / 1024 / 1024
+            db.session.remove()
+
+            peak_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            with open(era_path, 'rb') as stream:
+                summary = ingest_835(stream)
+            peak_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+            print(f"835 file:   {size_mb:.0f} MB, {summary['claims']:,} claim loops")
+            print(f"ingest:     {summary['seconds']:.1f} s ({size_mb / summary['seconds']:.0f} MB/s), "
+                  f"{summary['denied']:,} denials created, {summary['unmatched']:,} unmatched")
+            print(f'peak RSS:   {peak_before:.0f} MB -> {peak_after:.0f} MB')
+            print(f"per denial: {summary['seconds'] / max(summary['denied'], 1) * 1e6:.0f} us")
+
+            pending = db.session.scalars(db.select(Claim.claim_number).where(Claim.status == 'pending')
+                                         .limit(args.manual)).all()
+            seconds = manual_denials(pending)
+            print(f'one at a time: {len(pending):,} denials in {seconds:.1f} s '
+                  f'({seconds / max(len(pending), 1) * 1e6:.0f} us per denial)')
+    finally:
+        for path in (app.bench_db_path, era_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+if __name__ == '__main__':
+    main()
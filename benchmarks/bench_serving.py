@@ -0,0 +1,196 @@
+"""
+Throughput of the production gunicorn setup against ``run.py``.
+
+Both servers serve the same app, built from the production config with rate
+limits and CSRF off, against the same seeded SQLite file. Client processes
+log in, then request the dashboard, the claims list, claim pages and an API
+page in a loop over keep-alive connections for ``--seconds``. Besides
+throughput and latency it reports how long a fresh server takes to serve its
+first dashboard and claim page (cold caches show up there), and the combined
+proportional set size (PSS) of the server's processes after boot and after
+the load, where memory shared copy-on-write counts once:
+
+- run.py:               the Werkzeug development server as run.py starts it (debug=True)
+- gunicorn-no-preload:  gunicorn.conf.py with PRELOAD_APP=false (each worker builds the app)
+- gunicorn:             gunicorn.conf.py (preloaded app, warmed gthread workers)
+
+    python -m benchmarks.bench_serving --clients 8 --seconds 20
+"""
+import argparse
+import http.client
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from benchmarks.common import BENCH_PASSWORD, build_app, create_user, seed_claims, seed_issues_and_denials
+
+HOST = '127.0.0.1'
+CLAIMS = 2000
+
+def bench_app():
+    """App factory for both servers (``gunicorn 'benchmarks.bench_serving:bench_app()'``)."""
+    from app import create_app
+
+    return create_app('production', {
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.environ['BENCH_DB']}",
+        'RATELIMIT_ENABLED': False,
+        'WTF_CSRF_ENABLED': False,
+    })
+
+def serve_dev(port):
+    """Run the development server exactly as run.py does."""
+    bench_app().run(host=HOST, port=port, debug=True)
+
+def _request(connection, method, path, cookie, body=None):
+    headers = {'X-Forwarded-Proto': 'https'}  # As behind the TLS proxy production expects
+    if cookie:
+        headers['Cookie'] = cookie
+    if body is not None:
+        headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    connection.request(method, path, body=body, headers=headers)
+    response = connection.getresponse()
+    response.read()
+    return response
+
+def client(port, seconds, index):
+    """One client process: log in, then loop over the pages; return latencies in seconds."""
+    connection = http.client.HTTPConnection(HOST, port, timeout=30)
+    response = _request(connection, 'POST', '/auth/login', None,
+                        f'username=bench&password={BENCH_PASSWORD.replace("#", "%23")}')
+    cookie = re.search(r'session=[^;]+', response.getheader('Set-Cookie') or '')
+    assert response.status == 302 and cookie, f'login failed: {response.status}'
+    cookie = cookie.group(0)
+    paths = ['/', '/claims', '/api/v1/claims?limit=50'] + [f'/claims/{1 + (index * 37 + i) % CLAIMS}' for i in range(5)]
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    i = 0
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            status = _request(connection, 'GET', path, cookie).status
+        except (http.client.HTTPException, OSError):
+            connection.close()
+            connection = http.client.HTTPConnection(HOST, port, timeout=30)
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        if status != 200:
+            errors += 1
+    return latencies, errors
+
+def _session_pss_mb(session_id):
+    """Proportional set size of every process in a session, in MB (None off Linux)."""
+    total = 0
+    try:
+        pids = [int(name) for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        try:
+            if os.getsid(pid) != session_id:
+                continue
+            with open(f'/proc/{pid}/smaps_rollup') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('Pss:'))
+        except (OSError, StopIteration):
+            continue
+    return total / 1024
+
+def _first_requests_ms(port):
+    """Log in on a fresh server and time its first dashboard and claim page, before any load."""
+    connection = http.client.HTTPConnection(HOST, port, timeout=30)
+    response = _request(connection, 'POST', '/auth/login', None,
+                        f'username=bench&password={BENCH_PASSWORD.replace("#", "%23")}')
+    cookie = re.search(r'session=[^;]+', response.getheader('Set-Cookie') or '').group(0)
+    started = time.perf_counter()
+    for path in ('/', '/claims/1'):
+        assert _request(connection, 'GET', path, cookie).status == 200, path
+    return (time.perf_counter() - started) * 1000
+
+def _wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection(HOST, port, timeout=1)
+            connection.request('GET', '/metrics', headers={'X-Forwarded-Proto': 'https'})  # Renders no template
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start')
+
+def run_server(name, port, clients, seconds, env):
+    if name == 'run.py':
+        args = [sys.executable, '-m', 'benchmarks.bench_serving', '--serve-dev', str(port)]
+    else:
+        args = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'{HOST}:{port}',
+                'benchmarks.bench_serving:bench_app()']
+        env = dict(env, PRELOAD_APP=str(name == 'gunicorn'))
+    server = subprocess.Popen(args, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                              start_new_session=True)
+    try:
+        _wait_for(port)
+        time.sleep(2)  # Let every worker finish booting
+        boot_memory_mb = _session_pss_mb(server.pid)
+        first_ms = _first_requests_ms(port)
+        with ProcessPoolExecutor(clients) as pool:
+            results = list(pool.map(client, [port] * clients, [seconds] * clients, range(clients)))
+        memory_mb = _session_pss_mb(server.pid)
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)  # The debug reloader runs the server in a child process
+        server.wait()
+    latencies = sorted(value for values, _ in results for value in values)
+    return {
+        'requests_per_second': len(latencies) / seconds,
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        'first_ms': first_ms,
+        'boot_memory_mb': boot_memory_mb,
+        'memory_mb': memory_mb,
+        'errors': sum(errors for _, errors in results),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=20)
+    parser.add_argument('--port', type=int, default=8051)
+    parser.add_argument('--workers', type=int, help='gunicorn workers (default: gunicorn.conf.py)')
+    parser.add_argument('--serve-dev', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_dev:
+        serve_dev(args.serve_dev)
+        return
+
+    workdir = tempfile.mkdtemp(prefix='dms_serving_')
+    db_path = os.path.join(workdir, 'bench.db')
+    app = build_app(db_path)
+    with app.app_context():
+        user = create_user()
+        seed_claims(user.id, CLAIMS)
+        seed_issues_and_denials(user.id)
+
+    env = dict(os.environ, BENCH_DB=db_path, SECRET_KEY='bench', ACCESS_LOG='',
+               METRICS_MULTIPROC_DIR=os.path.join(workdir, 'metrics'))
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    try:
+        print(f'{os.cpu_count()} CPUs, {args.clients} client processes, {args.seconds:.0f} s each')
+        print(f"{'server':<20}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'first ms':>10}{'boot PSS MB':>13}{'PSS MB':>9}{'errors':>8}")
+        for offset, name in enumerate(('run.py', 'gunicorn-no-preload', 'gunicorn')):
+            r = run_server(name, args.port + offset, args.clients, args.seconds, env)
+            boot_memory, memory = (f'{value:.0f}' if value is not None else '-'
+                                   for value in (r['boot_memory_mb'], r['memory_mb']))
+            print(f"{name:<20}{r['requests_per_second']:>9.0f}{r['p50_ms']:>9.1f}{r['p99_ms']:>9.1f}"
+                  f"{r['first_ms']:>10.1f}{boot_memory:>13}{memory:>9}{r['errors']:>8}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Cold vs warm first-request latency for template compilation.
+
+Each scenario runs in a fresh interpreter (like a newly forked worker) and
+times the first request to a few template-heavy pages:
+
+- cold:      no bytecode cache, templates compiled on first use
+- bytecode:  bytecode cache already populated by ``flask templates compile``
+- warmup:    bytecode cache plus TEMPLATE_WARMUP (templates loaded at startup)
+
+    python -m benchmarks.bench_templates
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+PAGES = ['/', '/claims', '/claims/1', '/appeals/worklist']
+
+def child(cache_dir, warmup):
+    """Run inside the subprocess: build the app and time the first hit of each page."""
+    from benchmarks.common import build_app, create_user, seed_claims, login
+    from app import db
+
+    overrides = {'JINJA_BYTECODE_CACHE': bool(cache_dir), 'JINJA_BYTECODE_CACHE_DIR': cache_dir,
+                 'TEMPLATE_WARMUP': warmup}
+    started = time.perf_counter()
+    app = build_app(**overrides)
+    startup_ms = (time.perf_counter() - started) * 1000
+    try:
+        with app.app_context():
+            user = create_user()
+            seed_claims(user.id, 50)
+            db.session.remove()
+        client = app.test_client()
+        login(client)
+        timings = {}
+        for page in PAGES:
+            started = time.perf_counter()
+            response = client.get(page)
+            timings[page] = round((time.perf_counter() - started) * 1000, 2)
+            assert response.status_code == 200, (page, response.status_code)
+        print(json.dumps({'startup_ms': round(startup_ms, 1), 'first_request_ms': timings}))
+    finally:
+        os.remove(app.bench_db_path)
+
+def _run_child(cache_dir, warmup):
+    args = [sys.executable, '-m', 'benchmarks.bench_templates', '--child', '--cache-dir', cache_dir or '']
+    if warmup:
+        args.append('--warmup')
+    output = subprocess.run(args, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def run(repeat):
+    cache_dir = tempfile.mkdtemp(prefix='dms_jinja_')
+    try:
+        # Populate the bytecode cache the same way a deploy would
+        _run_child(cache_dir, warmup=True)
+        scenarios = [('cold', None, False), ('bytecode', cache_dir, False), ('warmup', cache_dir, True)]
+
+        print(f"{'scenario':<10}{'startup ms':>12}" + ''.join(f'{page:>20}' for page in PAGES) + f"{'total ms':>12}")
+        for name, directory, warmup in scenarios:
+            results = [_run_child(directory, warmup) for _ in range(repeat)]
+            startup = sorted(r['startup_ms'] for r in results)[len(results) // 2]
+            pages = {page: sorted(r['first_request_ms'][page] for r in results)[len(results) // 2] for page in PAGES}
+            print(f'{name:<10}{startup:>12.1f}' + ''.join(f'{pages[page]:>20.1f}' for page in PAGES)
+                  + f'{sum(pages.values()):>12.1f}')
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh processes per scenario (median reported)')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--cache-dir', default='', help=argparse.SUPPRESS)
+    parser.add_argument('--warmup', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.cache_dir or None, args.warmup)
+    else:
+        run(args.repeat)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Shared helpers for benchmarks: a file-backed app, synthetic claims and login.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import insert, select, update
+from app import create_app, db
+from app.models import Claim, Denial, Issue, User, AppealDeadlineTally, DataVersion, claim_fingerprint
+
+BENCH_PASSWORD = 'Bench#Passw0rd'
+
+def build_app(db_path=None, **overrides):
+    """Create a testing app backed by a SQLite file (a temp file by default)."""
+    if db_path is None:
+        handle, db_path = tempfile.mkstemp(prefix='dms_bench_', suffix='.db')
+        os.close(handle)
+    config_overrides = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{db_path}'}
+    config_overrides.update(overrides)
+    app = create_app('testing', config_overrides)
+    with app.app_context():
+        db.create_all()
+    app.bench_db_path = db_path
+    return app
+
+def create_user(username='bench', role='manager'):
+    """Create (or fetch) a benchmark user. Requires an app context."""
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        user = User(username=username, email=f'{username}@bench.local', first_name='Bench',
+                    last_name='User', role=role)
+        user.set_password(BENCH_PASSWORD)
+        db.session.add(user)
+        db.session.commit()
+    return user
+
+def seed_claims(user_id, count, seed=0, prefix='BCH', batch_size=10000):
+    """Bulk insert ``count`` pending claims owned by ``user_id``. Requires an app context."""
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        rows = [
+            {
+                'claim_number': f'{prefix}{i:08d}',
+                'patient_id': f'PAT{rng.randrange(20000):05d}',
+                'provider_id': f'PROV{rng.randrange(200):03d}',
+                'service_date': today - timedelta(days=rng.randrange(720)),
+                'total_amount': round(rng.lognormvariate(6.5, 1.0), 2),
+                'status': 'pending',
+                'created_by': user_id,
+                'created_at': now,
+                'updated_at': now,
+            }
+            for i in range(start, min(start + batch_size, count))
+        ]
+        for row in rows:  # Core inserts skip the ORM hook that sets it
+            row['fingerprint'] = claim_fingerprint(row['patient_id'], row['provider_id'], row['service_date'],
+                                                   row['total_amount'])
+        db.session.execute(insert(Claim), rows)
+        db.session.commit()
+
+ISSUE_TYPES = (
+    ('high_amount', 'Claim amount is unusually high and requires review', 'medium'),
+    ('old_claim', 'Service date is over 1 year old', 'medium'),
+    ('documentation', 'Supporting documentation is missing', 'low'),
+)
+
+def seed_issues_and_denials(user_id, issue_rate=0.3, denial_rate=0.15, seed=0, batch_size=10000):
+    """Give a share of a user's pending claims an issue and deny another share.
+    
+    Keeps claim statuses, appeal tallies and data versions consistent with
+    what the application would have written. Requires an app context.
+    """
+    from app.routes import DENIAL_CODES, BULK_CHUNK_SIZE, _chunked
+
+    rng = random.Random(seed)
+    today = date.today()
+    codes = sorted(DENIAL_CODES)
+    claim_ids = db.session.execute(
+        select(Claim.id).where(Claim.created_by == user_id, Claim.status == 'pending').order_by(Claim.id)
+    ).scalars().all()
+
+    issues, denials, denied_ids, tally = [], [], [], Counter()
+    for claim_id in claim_ids:
+        if rng.random() < issue_rate:
+            issue_type, description, severity = rng.choice(ISSUE_TYPES)
+            issues.append({'claim_id': claim_id, 'issue_type': issue_type,
+                           'description': description, 'severity': severity})
+        if rng.random() < denial_rate:
+            code = rng.choice(codes)
+            denial_date = today - timedelta(days=rng.randrange(60))
+            deadline = denial_date + timedelta(days=rng.choice((30, 60, 90)))
+            denials.append({'claim_id': claim_id, 'denial_code': code, 'denial_reason': DENIAL_CODES[code],
+                            'denial_date': denial_date, 'appeal_deadline': deadline})
+            denied_ids.append(claim_id)
+            tally[(user_id, deadline)] += 1
+
+    for start in range(0, len(issues), batch_size):
+        db.session.execute(insert(Issue), issues[start:start + batch_size])
+    for start in range(0, len(denials), batch_size):
+        db.session.execute(insert(Denial), denials[start:start + batch_size])
+    for chunk in _chunked(denied_ids, BULK_CHUNK_SIZE):
+        db.session.execute(
+            update(Claim).where(Claim.id.in_(chunk)).values(status='denied')
+            .execution_options(synchronize_session=False)
+        )
+    connection = db.session.connection()
+    AppealDeadlineTally.adjust(connection, tally)
+    DataVersion.bump_claims(connection, [user_id])
+    db.session.commit()
+    return len(issues), len(denials)
+
+def login(client, username='bench'):
+    response = client.post('/auth/login', data={'username': username, 'password': BENCH_PASSWORD})
+    assert response.status_code == 302, 'benchmark login failed'
+
+def time_samples(fn, repeat=5):
+    """Call ``fn`` ``repeat`` times; return (list of seconds per call, last result)."""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return timings, result
+
+def time_call(fn, repeat=5):
+    """Call ``fn`` ``repeat`` times; return (median seconds, last result)."""
+    timings, result = time_samples(fn, repeat)
+    return statistics.median(timings), result
@@ -0,0 +1,280 @@
+"""
+Concurrent load test: scripted biller sessions against a local app.
+
+Each virtual user is a thread with its own test client and its own seeded
+claims. After logging in it runs a fixed number of actions drawn from a
+seeded RNG: open the dashboard, open the claims list, page through the JSON
+API, view a claim, deny a claim or upload a small CSV. The script for a given
+--seed is identical from run to run; timings naturally vary.
+
+Reports throughput and p50/p95/p99 latency per endpoint, plus SQLite lock
+timeouts ("database is locked") and slow write statements (writes that took
+longer than --lock-wait-ms, which on SQLite is almost always time spent
+waiting for the write lock).
+
+    python -m benchmarks.loadtest --users 50 --iterations 20 --seed 1
+"""
+import argparse
+import io
+import json
+import logging
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from sqlalchemy import event, select
+from app import db
+from app.models import Claim
+from config import Config
+from benchmarks.common import BENCH_PASSWORD, build_app, create_user, seed_claims, seed_issues_and_denials
+
+# Relative weight of each scripted action
+ACTIONS = {
+    'dashboard': 20,
+    'claims_list': 15,
+    'api_pages': 15,
+    'view_claim': 30,
+    'deny_claim': 12,
+    'upload': 8,
+}
+API_PAGES = 3       # Cursor pages fetched per api_pages action
+UPLOAD_ROWS = 50    # Rows per uploaded CSV
+
+class LoadStats:
+    """Thread-safe latency samples per endpoint plus SQLite contention counters."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock_timeouts = 0
+        self.slow_writes = 0
+        self.slow_write_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, ok=True):
+        with self._lock:
+            self.samples[endpoint].append(seconds)
+            if not ok:
+                self.errors[endpoint] += 1
+
+    def record_lock_timeout(self):
+        with self._lock:
+            self.lock_timeouts += 1
+
+    def record_slow_write(self, seconds):
+        with self._lock:
+            self.slow_writes += 1
+            self.slow_write_seconds += seconds
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def watch_sqlite_contention(engine, stats, lock_wait_seconds):
+    """Count lock timeouts and slow write statements on ``engine``."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('loadtest_started', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _finish(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['loadtest_started'].pop()
+        if elapsed > lock_wait_seconds and statement.lstrip()[:6].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            stats.record_slow_write(elapsed)
+
+    @event.listens_for(engine, 'handle_error')
+    def _error(context):
+        conn = context.connection
+        if conn is not None and conn.info.get('loadtest_started'):
+            conn.info['loadtest_started'].pop()
+        if 'database is locked' in str(context.original_exception):
+            stats.record_lock_timeout()
+
+def _csv_body(prefix, count, today):
+    lines = ['claim_number,patient_id,provider_id,service_date,total_amount']
+    lines.extend(
+        f'{prefix}{i:04d},PAT{i:05d},PROV{i % 50:03d},{(today - timedelta(days=i * 3)).isoformat()},{120 + i}.00'
+        for i in range(count)
+    )
+    return ('\n'.join(lines) + '\n').encode()
+
+class VirtualUser(threading.Thread):
+    """One biller session running a seeded script of actions."""
+
+    def __init__(self, app, stats, username, claim_ids, pending_ids, iterations, seed, start_barrier):
+        super().__init__(name=f'vu-{username}')
+        self.client = app.test_client()
+        self.stats = stats
+        self.username = username
+        self.claim_ids = claim_ids
+        self.pending_ids = list(pending_ids)
+        self.iterations = iterations
+        self.rng = random.Random(seed)
+        self.start_barrier = start_barrier
+        self.uploads = 0
+
+    def _timed(self, endpoint, method, url, expected=(200,), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = getattr(self.client, method)(url, **kwargs)
+            body = response.get_data()
+            ok = response.status_code in expected
+        except Exception:
+            body, ok = b'', False
+        self.stats.record(endpoint, time.perf_counter() - started, ok)
+        return body
+
+    def dashboard(self):
+        self._timed('GET /', 'get', '/')
+
+    def claims_list(self):
+        self._timed('GET /claims', 'get', '/claims')
+
+    def api_pages(self):
+        url = '/api/v1/claims?limit=50&fields=id,claim_number,status,total_amount'
+        for _ in range(API_PAGES):
+            body = self._timed('GET /api/v1/claims', 'get', url)
+            try:
+                cursor = json.loads(body).get('next_cursor')
+            except ValueError:
+                return
+            if not cursor:
+                return
+            url = f'/api/v1/claims?limit=50&fields=id,claim_number,status,total_amount&cursor={cursor}'
+
+    def view_claim(self):
+        self._timed('GET /claims/<id>', 'get', f'/claims/{self.rng.choice(self.claim_ids)}')
+
+    def deny_claim(self):
+        if not self.pending_ids:
+            return self.view_claim()
+        claim_id = self.pending_ids.pop(self.rng.randrange(len(self.pending_ids)))
+        today = date.today()
+        self._timed('POST /claims/<id>/deny', 'post', f'/claims/{claim_id}/deny', expected=(302,), data={
+            'denial_code': self.rng.choice(['CO-16', 'CO-18', 'CO-29', 'CO-97']),
+            'denial_date': today.isoformat(),
+            'appeal_deadline': (today + timedelta(days=self.rng.choice((30, 60, 90)))).isoformat(),
+        })
+
+    def upload(self):
+        self.uploads += 1
+        body = _csv_body(f'LT{self.username[-3:]}U{self.uploads:02d}N', UPLOAD_ROWS, date.today())
+        self._timed('POST /claims/upload', 'post', '/claims/upload', expected=(302,),
+                    data={'file': (io.BytesIO(body), 'claims.csv')}, content_type='multipart/form-data')
+
+    def run(self):
+        script = self.rng.choices(list(ACTIONS), weights=list(ACTIONS.values()), k=self.iterations)
+        self.start_barrier.wait()
+        self._timed('POST /auth/login', 'post', '/auth/login', expected=(302,),
+                    data={'username': self.username, 'password': BENCH_PASSWORD})
+        for action in script:
+            getattr(self, action)()
+
+def _seed_users(app, users, claims_per_user, seed):
+    """Create one manager per virtual user with their own claims; return per-user ids."""
+    seeded = []
+    with app.app_context():
+        for index in range(users):
+            user = create_user(f'biller{index:03d}', role='manager')
+            seed_claims(user.id, claims_per_user, seed=seed + index, prefix=f'LT{index:03d}')
+            seed_issues_and_denials(user.id, seed=seed + index)
+            claim_ids = db.session.execute(select(Claim.id).where(Claim.created_by == user.id)).scalars().all()
+            pending_ids = db.session.execute(
+                select(Claim.id).where(Claim.created_by == user.id, Claim.status == 'pending')
+            ).scalars().all()
+            seeded.append((user.username, claim_ids, pending_ids))
+        db.session.remove()
+    return seeded
+
+def report(stats, elapsed):
+    """Summarize samples as {endpoint: {...}} plus totals."""
+    endpoints = {}
+    total = 0
+    for endpoint, samples in sorted(stats.samples.items()):
+        ordered = sorted(samples)
+        total += len(ordered)
+        endpoints[endpoint] = {
+            'requests': len(ordered),
+            'errors': stats.errors.get(endpoint, 0),
+            'throughput_rps': round(len(ordered) / elapsed, 2),
+            'p50_ms': round(percentile(ordered, 50) * 1000, 2),
+            'p95_ms': round(percentile(ordered, 95) * 1000, 2),
+            'p99_ms': round(percentile(ordered, 99) * 1000, 2),
+        }
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2),
+        'endpoints': endpoints,
+        'sqlite': {
+            'lock_timeouts': stats.lock_timeouts,
+            'slow_writes': stats.slow_writes,
+            'slow_write_ms': round(stats.slow_write_seconds * 1000, 1),
+        },
+    }
+
+def run(users, iterations, claims_per_user, seed, sqlite_timeout, lock_wait_ms):
+    engine_options = dict(Config.SQLALCHEMY_ENGINE_OPTIONS, connect_args={'timeout': sqlite_timeout})
+    app = build_app(SQLALCHEMY_ENGINE_OPTIONS=engine_options)
+    app.logger.setLevel(logging.ERROR)
+    try:
+        seeded = _seed_users(app, users, claims_per_user, seed)
+        stats = LoadStats()
+        with app.app_context():
+            watch_sqlite_contention(db.engine, stats, lock_wait_ms / 1000)
+
+        barrier = threading.Barrier(users + 1)
+        threads = [
+            VirtualUser(app, stats, username, claim_ids, pending_ids, iterations, seed * 1000 + index, barrier)
+            for index, (username, claim_ids, pending_ids) in enumerate(seeded)
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return report(stats, time.perf_counter() - started)
+    finally:
+        os.remove(app.bench_db_path)
+
+def print_report(result):
+    print(f"{result['requests']} requests in {result['elapsed_seconds']} s "
+          f"({result['throughput_rps']} req/s)")
+    print(f"{'endpoint':<26}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for endpoint, row in result['endpoints'].items():
+        print(f"{endpoint:<26}{row['requests']:>9}{row['errors']:>8}{row['throughput_rps']:>9.1f}"
+              f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}")
+    sqlite = result['sqlite']
+    print(f"SQLite: {sqlite['lock_timeouts']} lock timeouts, {sqlite['slow_writes']} slow writes "
+          f"({sqlite['slow_write_ms']} ms total)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=50, help='Concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=20, help='Scripted actions per user')
+    parser.add_argument('--claims-per-user', type=int, default=200, help='Seeded claims per user')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for data and session scripts')
+    parser.add_argument('--sqlite-timeout', type=float, default=5.0, help='SQLite busy timeout in seconds')
+    parser.add_argument('--lock-wait-ms', type=float, default=20.0, help='Write duration counted as a lock wait')
+    parser.add_argument('--output', help='Also write the report as JSON to this file')
+    args = parser.parse_args()
+
+    result = run(args.users, args.iterations, args.claims_per_user, args.seed, args.sqlite_timeout, args.lock_wait_ms)
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+            f.write('\n')
+    if any(row['errors'] for row in result['endpoints'].values()):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+"""
+Benchmark suite for ingest, listing, dashboard and denial workflows.
+
+Builds a deterministic synthetic dataset per scale (claims plus issues and
+denials) in a temporary SQLite file, times the real code paths, and writes
+the results as JSON. With --baseline, results are compared against a stored
+run and the exit status is 1 if any benchmark slowed down by more than
+--threshold.
+
+    python -m benchmarks.suite --scales 10k --output results.json
+    python -m benchmarks.suite --scales 10k --baseline benchmarks/baseline.json
+    python -m benchmarks.suite --scales 10k --output benchmarks/baseline.json   # refresh the baseline
+
+The fragment cache is disabled so page timings measure queries and rendering
+rather than cache hits.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from app import db
+from app.models import Claim, Denial
+from app.risk import rebuild_risk_tables
+from benchmarks.common import build_app, create_user, seed_claims, seed_issues_and_denials, login, time_samples
+
+SCALES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+UPLOAD_ROWS = 500     # Rows per uploaded CSV / validated DataFrame
+ANALYZE_CLAIMS = 1000  # Claims analyzed per analyze_claim sample
+
+def _csv_rows(prefix, count, start_date):
+    lines = ['claim_number,patient_id,provider_id,service_date,total_amount']
+    for i in range(count):
+        service_date = start_date - timedelta(days=i % 400)
+        lines.append(f'{prefix}{i:06d},PAT{i % 5000:05d},PROV{i % 200:03d},{service_date.isoformat()},{100 + i % 900}.50')
+    return '\n'.join(lines) + '\n'
+
+def bench_validate_csv(ctx):
+    import pandas as pd
+    from app.security import validate_csv_claims_data
+
+    df = pd.read_csv(io.StringIO(_csv_rows('VAL', UPLOAD_ROWS, date.today())), dtype=str)
+
+    def run():
+        valid, message = validate_csv_claims_data(df)
+        assert valid, message
+    return run
+
+def bench_upload_claims(ctx):
+    calls = iter(range(10_000))
+
+    def run():
+        body = _csv_rows(f'UP{next(calls):04d}X', UPLOAD_ROWS, date.today())
+        response = ctx['client'].post('/claims/upload', data={'file': (io.BytesIO(body.encode()), 'claims.csv')},
+                                      content_type='multipart/form-data')
+        assert response.status_code == 302, response.status_code
+    return run
+
+def bench_analyze_claim(ctx):
+    from app.routes import analyze_claim
+
+    today = date.today()
+
+    def run():
+        with ctx['app'].app_context():
+            for i in range(ANALYZE_CLAIMS):
+                claim = Claim(claim_number=f'ANL{i:06d}', patient_id='PAT00001', provider_id='PROV001',
+                              service_date=today - timedelta(days=i % 800), total_amount=float(i * 97 % 80000),
+                              status='pending')
+                analyze_claim(claim)
+            db.session.rollback()
+    return run
+
+def _get(ctx, url):
+    def run():
+        response = ctx['client'].get(url)
+        assert response.status_code == 200, (url, response.status_code)
+    return run
+
+def bench_index(ctx):
+    return _get(ctx, '/')
+
+def bench_claims_list(ctx):
+    return _get(ctx, '/claims')
+
+def bench_view_claim(ctx):
+    return _get(ctx, f"/claims/{ctx['denied_claim_id']}")
+
+def bench_deny_claim(ctx):
+    pending = iter(ctx['pending_claim_ids'])
+    today = date.today()
+    form = {'denial_code': 'CO-16', 'denial_date': today.isoformat(),
+            'appeal_deadline': (today + timedelta(days=60)).isoformat()}
+
+    def run():
+        response = ctx['client'].post(f'/claims/{next(pending)}/deny', data=form)
+        assert response.status_code == 302, response.status_code
+    return run
+
+BENCHMARKS = {
+    'validate_csv_claims_data': bench_validate_csv,
+    'upload_claims': bench_upload_claims,
+    'analyze_claim': bench_analyze_claim,
+    'index': bench_index,
+    'claims_list': bench_claims_list,
+    'view_claim': bench_view_claim,
+    'deny_claim': bench_deny_claim,
+}
+
+def run_scale(scale, names, repeat, seed):
+    """Seed one dataset and time each named benchmark against it."""
+    app = build_app(CACHE_BACKEND='none')
+    app.logger.setLevel(logging.ERROR)  # Keep per-request security events out of the output
+    try:
+        started = time.perf_counter()
+        with app.app_context():
+            user = create_user()
+            seed_claims(user.id, SCALES[scale], seed=seed)
+            seed_issues_and_denials(user.id, seed=seed)
+            rebuild_risk_tables()  # So uploads pay for scoring, as in production
+            denied_claim_id = db.session.execute(select(Denial.claim_id).order_by(Denial.id).limit(1)).scalar()
+            pending_claim_ids = db.session.execute(
+                select(Claim.id).where(Claim.status == 'pending').order_by(Claim.id).limit(repeat)
+            ).scalars().all()
+            db.session.remove()
+        seed_seconds = time.perf_counter() - started
+
+        client = app.test_client()
+        login(client)
+        ctx = {'app': app, 'client': client, 'denied_claim_id': denied_claim_id,
+               'pending_claim_ids': pending_claim_ids}
+
+        results = {}
+        for name in names:
+            fn = BENCHMARKS[name](ctx)
+            timings, _ = time_samples(fn, repeat)
+            results[name] = {
+                'median_ms': round(statistics.median(timings) * 1000, 3),
+                'min_ms': round(min(timings) * 1000, 3),
+                'max_ms': round(max(timings) * 1000, 3),
+            }
+            print(f"{scale:<6}{name:<28}{results[name]['median_ms']:>12.2f} ms", file=sys.stderr)
+        return {'claims': SCALES[scale], 'seed_seconds': round(seed_seconds, 2), 'benchmarks': results}
+    finally:
+        os.remove(app.bench_db_path)
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return a list of regression messages for benchmarks present in both runs."""
+    regressions = []
+    for scale, current in results['scales'].items():
+        previous = baseline.get('scales', {}).get(scale)
+        if previous is None:
+            continue
+        for name, stats in current['benchmarks'].items():
+            before = previous['benchmarks'].get(name)
+            if before is None:
+                continue
+            now_ms, then_ms = stats['median_ms'], before['median_ms']
+            if now_ms > then_ms * (1 + threshold) and now_ms - then_ms > min_delta_ms:
+                regressions.append(f'{scale} {name}: {then_ms:.2f} ms -> {now_ms:.2f} ms '
+                                   f'(+{(now_ms / then_ms - 1) * 100:.0f}%)')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='10k', help=f"Comma-separated scales: {', '.join(SCALES)}")
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS), help='Comma-separated benchmark names')
+    parser.add_argument('--repeat', type=int, default=5, help='Samples per benchmark (median reported)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic dataset')
+    parser.add_argument('--output', help='Write results JSON here (default: stdout)')
+    parser.add_argument('--baseline', help='Baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore slowdowns smaller than this')
+    args = parser.parse_args()
+
+    scales = [scale.strip().lower() for scale in args.scales.split(',') if scale.strip()]
+    names = [name.strip() for name in args.benchmarks.split(',') if name.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES] + [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown scales/benchmarks: {', '.join(unknown)}")
+
+    results = {
+        'meta': {
+            'created_at': datetime.utcnow().isoformat(timespec='seconds'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+            'seed': args.seed,
+        },
+        'scales': {scale: run_scale(scale, names, args.repeat, args.seed) for scale in scales},
+    }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        for message in regressions:
+            print(f'REGRESSION {message}', file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against baseline', file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -11,9 +11,41 @@ class Config:
     # Database Configuration
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///denial_management.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SQLALCHEMY_ENGINE_OPTIONS = {
-        'pool_pre_ping': True,
-        'pool_recycle': 300,
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Merged over the pool profile's settings
+    SQLITE_PRAGMAS = {  # Run on every new SQLite connection
+        'journal_mode': 'WAL',  # Readers and the writer no longer block each other
+        'synchronous': 'NORMAL',  # Durable with WAL; syncs at checkpoints instead of every commit
+        'temp_store': 'MEMORY',
+        'cache_size': -16000,  # Negative means KiB: 16MB page cache per connection
+    }
+    
+    # Connection pool profiles. POOL_PROFILE picks one; unset, the database URL decides.
+    POOL_PROFILE = os.environ.get('POOL_PROFILE')  # sqlite-file, sqlite-memory or server-db
+    POOL_PROFILES = {
+        # A local file never drops a connection: no ping per checkout, no recycling
+        'sqlite-file': {
+            'poolclass': 'QueuePool',
+            'pool_size': 10,  # Opening an overflow connection per request under load costs more than idling
+            'max_overflow': 10,
+            'pool_timeout': 30,
+            'pool_pre_ping': False,
+            'pool_recycle': -1,
+        },
+        # Every checkout must share one connection, or each would see its own empty database
+        'sqlite-memory': {
+            'poolclass': 'StaticPool',
+            'pool_pre_ping': False,
+        },
+        # Servers and proxies close idle connections: ping on checkout, recycle well inside their timeouts
+        'server-db': {
+            'poolclass': 'QueuePool',
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+            'pool_timeout': 10,
+            'pool_pre_ping': True,
+            'pool_recycle': 1800,
+            'pool_use_lifo': True,  # Idle spares age out instead of being kept warm in rotation
+        },
     }
     
     # Session Security
@@ -30,11 +62,79 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     UPLOAD_EXTENSIONS = ['.csv', '.xlsx', '.xls']
     UPLOAD_PATH = 'uploads'
+    UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Chunked uploads (/api/uploads); must stay under MAX_CONTENT_LENGTH
+    UPLOAD_MAX_SIZE = 512 * 1024 * 1024  # Largest file a chunked upload may assemble for a check, or a remittance file
+    UPLOAD_IMPORT_MAX_SIZE = 2 * 1024 * 1024  # Largest claims CSV imported in one request: ~40k rows, well inside TIMEOUT
+    UPLOAD_SESSION_TTL = 24 * 3600  # Seconds before an unfinished chunked upload is discarded
+    UPLOAD_CHECK_BATCH_SIZE = 5000  # Rows per batch of claim number/fingerprint lookups in a dry-run check
     
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL') or 'memory://'
     RATELIMIT_DEFAULT = "100 per hour"
     
+    # Bulk Operations
+    BULK_DENIAL_MAX_CLAIMS = 10000  # Max claims denied per bulk request
+    APPEAL_LETTER_BATCH_MAX = 1000  # Max letters per ZIP download
+    REMITTANCE_EXTENSIONS = ['.835', '.edi', '.txt', '.x12']
+    REMITTANCE_BATCH_SIZE = 5000  # Denied claims per batch of claim number lookups and bulk denials
+    REMITTANCE_READ_SIZE = 1024 * 1024  # Bytes read from an 835 file at a time
+    REMITTANCE_UNMATCHED_LIMIT = 1000  # Unmatched claims listed in an ingest summary
+    REMITTANCE_APPEAL_DAYS = 90  # Payer's appeal window: deadline is the denial date plus this; None for no deadline
+    
+    # Response Compression
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 500  # Bytes; smaller bodies are sent as-is
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_ALGORITHMS = ['zstd', 'br', 'gzip']  # Server preference; zstd/br only if installed
+    COMPRESSION_MIMETYPES = ['text/html', 'text/csv', 'text/plain', 'text/css', 'application/json', 'application/javascript']
+    COMPRESSION_BLUEPRINTS = {
+        'auth': False,  # Pages carry credentials; avoid BREACH-style leaks (any page with a CSRF token is skipped too)
+    }
+    
+    # Fragment Cache for rendered dashboard/list fragments
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'lru')  # lru, redis or none
+    CACHE_MAX_BYTES = 32 * 1024 * 1024  # In-process LRU size bound
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')  # memory:// uses an in-process stand-in
+    CACHE_TTL = 300  # Seconds, redis backend only
+    
+    # Templates
+    JINJA_BYTECODE_CACHE = True
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')  # Defaults to instance/jinja_cache
+    TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'false').lower() in ['true', 'on', '1']
+    
+    # Metrics (/metrics, Prometheus text format)
+    METRICS_ENABLED = True
+    METRICS_MULTIPROC_DIR = os.environ.get('METRICS_MULTIPROC_DIR')  # Shared by all workers; empty it on deploy
+    METRICS_FLUSH_INTERVAL = 5  # Seconds between per-worker snapshot writes
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Bearer token for scrapers; admins may also view
+    
+    # Slow-query log (/admin/slow-queries)
+    SLOW_QUERY_LOG_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = int(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+    SLOW_QUERY_MAX_SHAPES = 500  # Distinct statement shapes kept per worker
+    
+    # Denial analytics (/api/analytics), a per-worker columnar snapshot
+    ANALYTICS_ENABLED = True
+    ANALYTICS_REFRESH_SECONDS = 10  # Reports may lag writes by this much
+    ANALYTICS_REBUILD_SECONDS = 3600  # Full rebuild; also drops deleted claims
+    ANALYTICS_WATERMARK_OVERLAP_SECONDS = 5  # Re-read rows this far behind the watermark
+    
+    # Denial-risk scoring of new claims (tables rebuilt by `flask risk rebuild`)
+    RISK_SCORING_ENABLED = True
+    RISK_SCORE_THRESHOLD = float(os.environ.get('RISK_SCORE_THRESHOLD', 0.3))  # Flag claims at or above this
+    RISK_PRIOR_WEIGHT = 50  # Claims of history a factor needs before it counts fully
+    RISK_TABLE_TTL = 300  # Seconds before a worker reloads the tables
+    
+    # Archival of settled claims (`flask archive run`)
+    ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))  # Unchanged for this long
+    ARCHIVE_BATCH_SIZE = 5000  # Claims moved per transaction
+    
+    # Worker warm-up under gunicorn (gunicorn.conf.py)
+    WARMUP_ANALYTICS = os.environ.get('WARMUP_ANALYTICS', 'false').lower() in ['true', 'on', '1']  # Build the snapshot before serving
+    
+    # Conditional GET - change to invalidate every cached page (e.g. per deploy)
+    ETAG_VERSION = os.environ.get('APP_VERSION', '1')
+    
     # Email Configuration (for notifications)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
@@ -113,6 +213,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    RATELIMIT_ENABLED = False
+    JINJA_BYTECODE_CACHE = False
     SESSION_COOKIE_SECURE = False
     SECURITY_HEADERS = {
         'force_https': False,
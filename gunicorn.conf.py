@@ -0,0 +1,56 @@
+"""
+Gunicorn settings for serving the app in production:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is built once in the master and its templates compiled there, so
+workers share that memory copy-on-write. Each worker warms up (its own DB
+connections, risk tables, optionally the analytics snapshot) before taking
+requests, and is replaced after about MAX_REQUESTS requests to bound memory
+growth; the metrics snapshot it leaves in METRICS_MULTIPROC_DIR is folded into
+the totals when it exits. Every setting can be overridden from the environment.
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('THREADS', 4))
+preload_app = os.environ.get('PRELOAD_APP', 'true').lower() in ['true', 'on', '1']  # Off lets HUP reload code
+max_requests = int(os.environ.get('MAX_REQUESTS', 5000))
+max_requests_jitter = int(os.environ.get('MAX_REQUESTS_JITTER', max_requests // 10))  # Workers don't all restart at once
+timeout = int(os.environ.get('TIMEOUT', 120))  # Large uploads and exports stream for a while
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.environ.get('ACCESS_LOG', '-') or None  # Set empty to turn the access log off
+
+def when_ready(server):
+    """Compile every template in the master, before the first fork."""
+    from app import warm_templates
+
+    if not preload_app:
+        return  # Workers load the app themselves
+    app = server.app.wsgi()
+    with app.app_context():
+        count = warm_templates(app)
+    # Keep the collector from writing to every preloaded object, which would copy its page into each worker
+    gc.collect()
+    gc.freeze()
+    server.log.info(f'Preloaded app with {count} templates')
+
+def post_worker_init(worker):
+    """Warm the new worker up before it accepts a request."""
+    from app.serving import warm_up
+
+    timings = warm_up(worker.wsgi, connections=threads)
+    worker.log.info(f"Worker {worker.pid} warmed up: {', '.join(f'{k} {v} ms' for k, v in timings.items())}")
+
+def child_exit(server, worker):
+    """Fold the exited worker's metrics snapshot into the archive, so scrapes stop re-reading it."""
+    from app.metrics import mark_process_dead
+
+    multiproc_dir = os.environ.get('METRICS_MULTIPROC_DIR')
+    if multiproc_dir:
+        mark_process_dead(multiproc_dir, worker.pid)
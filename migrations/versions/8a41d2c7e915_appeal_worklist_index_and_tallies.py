@@ -0,0 +1,40 @@
+"""Appeal worklist index and deadline tallies
+
+Revision ID: 8a41d2c7e915
+Revises: 3cf5cf7f401e
+Create Date: 2026-10-19 09:12:44.118203
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a41d2c7e915'
+down_revision = '3cf5cf7f401e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_denial_appeal_status_deadline', 'denial', ['appeal_status', 'appeal_deadline'], unique=False)
+    op.create_table('appeal_deadline_tally',
+    sa.Column('owner_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('appeal_deadline', sa.Date(), nullable=False),
+    sa.Column('pending_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('owner_id', 'appeal_deadline')
+    )
+
+    # Seed the tallies from existing pending appeals
+    op.execute(
+        "INSERT INTO appeal_deadline_tally (owner_id, appeal_deadline, pending_count) "
+        "SELECT COALESCE(claim.created_by, 0), denial.appeal_deadline, COUNT(*) "
+        "FROM denial JOIN claim ON claim.id = denial.claim_id "
+        "WHERE denial.appeal_status = 'pending' AND denial.appeal_deadline IS NOT NULL "
+        "GROUP BY COALESCE(claim.created_by, 0), denial.appeal_deadline"
+    )
+
+
+def downgrade():
+    op.drop_table('appeal_deadline_tally')
+    op.drop_index('ix_denial_appeal_status_deadline', table_name='denial')
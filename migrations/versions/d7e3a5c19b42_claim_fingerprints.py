@@ -0,0 +1,67 @@
+"""Claim fingerprints for near-duplicate detection
+
+Revision ID: d7e3a5c19b42
+Revises: f2b9c81d3a60
+Create Date: 2026-10-19 14:02:31.604218
+
+"""
+import hashlib
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e3a5c19b42'
+down_revision = 'f2b9c81d3a60'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 10000
+
+
+def _fingerprint(patient_id, provider_id, service_date, total_amount):
+    # Frozen copy of app.models.claim_fingerprint as of this revision
+    if isinstance(service_date, str):
+        service_date = datetime.strptime(service_date[:10], '%Y-%m-%d').date()
+    key = '|'.join([
+        str(patient_id).strip().upper(),
+        str(provider_id).strip().upper(),
+        service_date.isoformat(),
+        str(int(round(float(total_amount) * 100))),
+    ])
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()[:32]
+
+
+def upgrade():
+    with op.batch_alter_table('claim', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('fingerprint', sa.String(length=32), nullable=True))
+
+    # Backfill in id order, one batch per round trip
+    connection = op.get_bind()
+    claim = sa.table('claim', sa.column('id', sa.Integer), sa.column('patient_id', sa.String),
+                     sa.column('provider_id', sa.String), sa.column('service_date', sa.Date),
+                     sa.column('total_amount', sa.Float), sa.column('fingerprint', sa.String))
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(claim.c.id, claim.c.patient_id, claim.c.provider_id, claim.c.service_date, claim.c.total_amount)
+            .where(claim.c.id > last_id).order_by(claim.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        connection.execute(
+            claim.update().where(claim.c.id == sa.bindparam('claim_id')).values(fingerprint=sa.bindparam('fp')),
+            [{'claim_id': row.id, 'fp': _fingerprint(row.patient_id, row.provider_id, row.service_date,
+                                                     row.total_amount)} for row in rows],
+        )
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('claim', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_claim_fingerprint'), ['fingerprint'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('claim', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_claim_fingerprint'))
+        batch_op.drop_column('fingerprint')
@@ -0,0 +1,46 @@
+"""Never reuse claim, denial and issue ids after archiving
+
+Revision ID: e4a8c3b9d215
+Revises: d7f4273672ed
+Create Date: 2026-10-19 16:40:12.118305
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4a8c3b9d215'
+down_revision = 'd7f4273672ed'
+branch_labels = None
+depends_on = None
+
+# (working table, archive table); PostgreSQL sequences never go back, only SQLite needs this
+TABLES = (('claim', 'claim_archive'), ('denial', 'denial_archive'), ('issue', 'issue_archive'))
+
+
+def upgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'sqlite':
+        return
+    for table, archive in TABLES:
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': True}):
+            pass  # Rebuilding the table is the whole change
+        # Start above every id already archived, not just the ones still in the working table
+        seq = connection.execute(sa.text(
+            f'SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM {table} UNION ALL SELECT MAX(id) FROM {archive})'
+        )).scalar() or 0
+        connection.execute(sa.text('DELETE FROM sqlite_sequence WHERE name = :name'), {'name': table})
+        connection.execute(sa.text('INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)'),
+                           {'name': table, 'seq': seq})
+
+
+def downgrade():
+    connection = op.get_bind()
+    if connection.dialect.name != 'sqlite':
+        return
+    for table, _ in reversed(TABLES):
+        with op.batch_alter_table(table, schema=None, recreate='always',
+                                  table_kwargs={'sqlite_autoincrement': False}):
+            pass  # Rebuilding the table is the whole change
@@ -1,3 +1,4 @@
+"""Development server. In production use ``gunicorn -c gunicorn.conf.py wsgi:app``."""
 from app import create_app
 import argparse
 
@@ -35,4 +35,71 @@ def setup_logging():
     logging.basicConfig(level=logging.INFO)
     # Prevent logging from interfering with test output
     logging.getLogger('alembic').setLevel(logging.WARNING)
-    logging.getLogger('sqlalchemy').setLevel(logging.WARNING) 
\ No newline at end of file
+    logging.getLogger('sqlalchemy').setLevel(logging.WARNING) 
+@pytest.fixture
+def app():
+    """Create the application with a fresh in-memory database."""
+    from tests.test_app import create_test_app
+    from app import db
+
+    app = create_test_app()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+@pytest.fixture
+def make_user(app):
+    """Factory fixture that creates users with a known password."""
+    from app import db
+    from app.models import User
+
+    def _make_user(username='biller', role='user', password='Passw0rd!'):
+        user = User(
+            username=username,
+            email=f'{username}@example.com',
+            first_name='Test',
+            last_name='User',
+            role=role,
+        )
+        user.set_password(password)
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return _make_user
+
+@pytest.fixture
+def login(client):
+    """Log a user in through the real login view."""
+    def _login(user, password='Passw0rd!'):
+        return client.post('/auth/login', data={'username': user.username, 'password': password})
+
+    return _login
+
+@pytest.fixture
+def make_claims(app):
+    """Factory fixture that bulk creates pending claims for a user."""
+    from datetime import date
+    from app import db
+    from app.models import Claim
+
+    def _make_claims(user, count, provider_id='PROV001', prefix='CLM', **fields):
+        claims = [
+            Claim(
+                claim_number=f'{prefix}{i:06d}',
+                patient_id=f'PAT{i % 50:03d}',
+                provider_id=provider_id,
+                service_date=fields.get('service_date', date(2024, 3, 15)),
+                total_amount=fields.get('total_amount', 100.0 + i),
+                status=fields.get('status', 'pending'),
+                created_by=user.id,
+            )
+            for i in range(count)
+        ]
+        db.session.add_all(claims)
+        db.session.commit()
+        return claims
+
+    return _make_claims
@@ -0,0 +1,73 @@
+"""Tests for the columnar denial analytics."""
+from datetime import date
+from app import db
+from app.models import Claim, Denial
+from app.routes import DENIAL_CODES
+
+
+def _deny(claim, code):
+    claim.status = 'denied'
+    db.session.add(Denial(claim_id=claim.id, denial_code=code, denial_reason=code, denial_date=date(2024, 4, 1)))
+
+
+def _report(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+def test_denial_rate_by_provider_and_month(app, client, make_user, make_claims, login):
+    manager = make_user('manager1', role='manager')
+    other = make_user('manager2', role='manager')
+    claims = make_claims(manager, 4, provider_id='PROV001') + make_claims(manager, 2, provider_id='PROV002',
+                                                                          prefix='B', service_date=date(2024, 5, 2))
+    make_claims(other, 3, provider_id='PROV001', prefix='OTHER')
+    _deny(claims[0], 'CO-16')
+    _deny(claims[4], 'CO-18')
+    db.session.commit()
+    login(manager)
+
+    data = _report(client, '/api/analytics/denial-rate?by=provider')
+    assert data['claims'] == 6 and data['denied'] == 2  # The other manager's claims are out of scope
+    by_provider = {group['provider']: group for group in data['data']}
+    assert by_provider['PROV001']['claims'] == 4 and by_provider['PROV001']['denial_rate'] == 0.25
+    assert by_provider['PROV002']['denied_amount'] == claims[4].total_amount
+
+    months = _report(client, '/api/analytics/denial-rate?by=month')['data']
+    assert [(group['month'], group['claims'], group['denied']) for group in months] == [
+        ('2024-03', 4, 1), ('2024-05', 2, 1),
+    ]
+    in_may = _report(client, '/api/analytics/denial-rate?by=provider&service_date_from=2024-05-01')
+    assert in_may['claims'] == 2
+
+
+def test_top_reasons_follow_incremental_refresh(app, client, make_user, make_claims, login):
+    manager = make_user('manager1', role='manager')
+    claims = make_claims(manager, 5)
+    _deny(claims[0], 'CO-16')
+    db.session.commit()
+    login(manager)
+    assert [group['denial_code'] for group in _report(client, '/api/analytics/top-denial-reasons')['data']] == [
+        'CO-16']
+
+    snapshot = app.extensions['analytics']
+    snapshot.refresh_interval = 0
+    built_at = snapshot.built_at
+    _deny(claims[3], 'CO-97')
+    _deny(claims[4], 'CO-97')
+    db.session.add(Claim(claim_number='NEW0001', patient_id='PAT999', provider_id='PROV003',
+                         service_date=date(2024, 3, 20), total_amount=10.0, created_by=manager.id))
+    db.session.commit()
+
+    data = _report(client, '/api/analytics/top-denial-reasons')
+    assert snapshot.built_at == built_at  # Merged, not rebuilt
+    assert data['claims'] == 6
+    top = data['data'][0]
+    assert top['denial_code'] == 'CO-97' and top['denied'] == 2
+    assert top['denied_amount'] == round(claims[3].total_amount + claims[4].total_amount, 2)
+    assert top['reason'] == DENIAL_CODES['CO-97']
+
+
+def test_analytics_requires_manager(client, make_user, login):
+    login(make_user())
+    assert client.get('/api/analytics/denial-rate').status_code == 403
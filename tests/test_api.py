@@ -0,0 +1,71 @@
+"""Tests for the v1 JSON claims API."""
+from datetime import date
+from app import db
+from app.models import Denial, Issue
+
+
+def test_cursor_pagination_walks_all_visible_claims(client, make_user, login, make_claims):
+    user = make_user()
+    other = make_user('other')
+    claims = make_claims(user, 23)
+    make_claims(other, 5, prefix='OTH')
+    login(user)
+
+    seen, cursor = [], None
+    while True:
+        url = '/api/v1/claims?limit=10' + (f'&cursor={cursor}' if cursor else '')
+        body = client.get(url).get_json()
+        seen.extend(item['id'] for item in body['data'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert seen == sorted((c.id for c in claims), reverse=True)
+
+
+def test_sparse_fields_and_embeds(client, make_user, login, make_claims):
+    user = make_user()
+    claims = make_claims(user, 2)
+    db.session.add_all([
+        Issue(claim_id=claims[0].id, issue_type='old_claim', description='old'),
+        Denial(claim_id=claims[0].id, denial_code='CO-16', denial_reason='r', denial_date=date(2024, 4, 1)),
+    ])
+    db.session.commit()
+    login(user)
+
+    body = client.get('/api/v1/claims?fields=claim_number,status').get_json()
+    assert set(body['data'][0]) == {'id', 'claim_number', 'status'}
+
+    body = client.get(f'/api/v1/claims/{claims[0].id}?fields=claim_number&embed=issues,denials').get_json()
+    data = body['data']
+    assert data['claim_number'] == claims[0].claim_number
+    assert [i['issue_type'] for i in data['issues']] == ['old_claim']
+    assert data['denials'][0]['denial_date'] == '2024-04-01'
+
+    assert client.get('/api/v1/claims?fields=password_hash').status_code == 400
+    assert client.get('/api/v1/claims?embed=creator').status_code == 400
+    assert client.get('/api/v1/claims?cursor=!!').status_code == 400
+
+
+def test_filters_and_visibility(client, make_user, login, make_claims):
+    user = make_user()
+    other = make_user('other')
+    make_claims(user, 3, provider_id='PROV001')
+    make_claims(user, 2, provider_id='PROV002', prefix='B')
+    foreign = make_claims(other, 1, prefix='OTH')[0]
+    login(user)
+
+    body = client.get('/api/v1/claims?provider_id=PROV002').get_json()
+    assert len(body['data']) == 2
+    body = client.get('/api/v1/claims?status=denied').get_json()
+    assert body['data'] == []
+    assert client.get(f'/api/v1/claims/{foreign.id}').status_code == 403
+    assert client.get('/api/v1/claims/999999').status_code == 404
+
+
+def test_anonymous_clients_get_a_json_401(client):
+    for url in ('/api/v1/claims', '/api/v1/claims/1', '/api/appeals/worklist'):
+        response = client.get(url)
+        assert response.status_code == 401 and response.get_json() == {'error': 'Authentication required'}
+    # Pages still send people to the login form
+    response = client.get('/claims')
+    assert response.status_code == 302 and '/auth/login?next=' in response.headers['Location']
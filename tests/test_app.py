@@ -0,0 +1,27 @@
+"""Application factory helpers and smoke tests for the main blueprint."""
+from app import create_app
+
+
+def create_test_app():
+    """Create an application configured for testing."""
+    return create_app('testing')
+
+
+def test_create_test_app():
+    app = create_test_app()
+    assert app.testing
+    assert app.config['SQLALCHEMY_DATABASE_URI'] == 'sqlite:///:memory:'
+
+
+def test_dashboard_requires_login(client):
+    response = client.get('/')
+    assert response.status_code == 302
+    assert '/auth/login' in response.headers['Location']
+
+
+def test_dashboard_after_login(client, make_user, login):
+    user = make_user()
+    login(user)
+    response = client.get('/')
+    assert response.status_code == 200
+    assert b'Claim Statistics' in response.data
@@ -0,0 +1,217 @@
+"""Tests for the appeal deadline worklist and its incremental tallies."""
+import re
+from datetime import date, timedelta
+from urllib.parse import parse_qs, urlsplit
+from app import db
+from app.appeals import OVERDUE_WINDOW_DAYS, appeal_bucket_counts
+from app.models import Denial, AppealDeadlineTally
+
+
+def _deny(claim, deadline, code='CO-16'):
+    denial = Denial(claim_id=claim.id, denial_code=code, denial_reason='reason',
+                    denial_date=date.today() - timedelta(days=1), appeal_deadline=deadline)
+    claim.status = 'denied'
+    db.session.add(denial)
+    db.session.commit()
+    return denial
+
+
+def _tally_total():
+    return sum(t.pending_count for t in AppealDeadlineTally.query.all())
+
+
+def test_tallies_follow_orm_writes(make_user, make_claims):
+    user = make_user()
+    claims = make_claims(user, 3)
+    today = date.today()
+    first = _deny(claims[0], today + timedelta(days=3))
+    _deny(claims[1], today + timedelta(days=10))
+    _deny(claims[2], today + timedelta(days=25))
+
+    assert appeal_bucket_counts(user.id) == {
+        'next_7_days': 1, 'next_14_days': 2, 'next_30_days': 3, 'overdue': 0,
+    }
+
+    first.appeal_status = 'submitted'
+    db.session.commit()
+    assert appeal_bucket_counts(user.id)['next_7_days'] == 0
+    assert _tally_total() == 2
+
+    first.appeal_status = 'pending'
+    first.appeal_deadline = today - timedelta(days=2)
+    db.session.commit()
+    assert appeal_bucket_counts()['overdue'] == 1
+
+    # Deadlines lapsed before the overdue window are no longer summed
+    first.appeal_deadline = today - timedelta(days=OVERDUE_WINDOW_DAYS + 1)
+    db.session.commit()
+    assert appeal_bucket_counts()['overdue'] == 0
+    assert _tally_total() == 3
+
+
+def test_tally_moves_when_only_the_deadline_changes(make_user, make_claims):
+    user = make_user()
+    claims = make_claims(user, 1)
+    today = date.today()
+    denial = _deny(claims[0], today + timedelta(days=3))
+
+    # Loaded in an earlier transaction, so the old deadline is not in memory
+    denial.appeal_deadline = today + timedelta(days=20)
+    db.session.commit()
+    assert appeal_bucket_counts(user.id) == {
+        'next_7_days': 0, 'next_14_days': 0, 'next_30_days': 1, 'overdue': 0,
+    }
+    assert _tally_total() == 1
+
+
+def test_bulk_deny_updates_tallies(client, make_user, login, make_claims):
+    manager = make_user('manager', role='manager')
+    claims = make_claims(manager, 20)
+    login(manager)
+    deadline = date.today() + timedelta(days=5)
+    response = client.post('/api/claims/bulk-deny', json={
+        'claim_ids': [c.id for c in claims], 'denial_code': 'CO-29',
+        'denial_date': date.today().isoformat(), 'appeal_deadline': deadline.isoformat(),
+    })
+    assert response.status_code == 200
+    assert appeal_bucket_counts(manager.id)['next_7_days'] == 20
+    assert _tally_total() == Denial.query.filter_by(appeal_status='pending').count()
+
+
+def test_worklist_orders_by_deadline_then_amount(client, make_user, login, make_claims):
+    user = make_user()
+    other = make_user('other')
+    claims = make_claims(user, 3)
+    foreign = make_claims(other, 1, prefix='OTH')
+    today = date.today()
+    claims[0].total_amount = 10
+    claims[1].total_amount = 500
+    _deny(claims[0], today + timedelta(days=4))
+    _deny(claims[1], today + timedelta(days=4), code='PR-1')
+    _deny(claims[2], today + timedelta(days=2))
+    _deny(foreign[0], today + timedelta(days=1))
+    login(user)
+
+    body = client.get('/api/appeals/worklist').get_json()
+    numbers = [item['claim_number'] for item in body['items']]
+    assert numbers == [claims[2].claim_number, claims[1].claim_number, claims[0].claim_number]
+    assert body['buckets']['next_7_days'] == 3
+
+    body = client.get('/api/appeals/worklist?denial_code=PR-1').get_json()
+    assert [item['claim_number'] for item in body['items']] == [claims[1].claim_number]
+    assert client.get('/api/appeals/worklist?denial_code=BAD').status_code == 400
+
+    response = client.get('/appeals/worklist')
+    assert response.status_code == 200
+    assert claims[2].claim_number.encode() in response.data
+    assert foreign[0].claim_number.encode() not in response.data
+
+
+def test_update_appeal_status(client, make_user, login, make_claims):
+    user = make_user()
+    claim = make_claims(user, 1)[0]
+    denial = _deny(claim, date.today() + timedelta(days=6))
+    login(user)
+
+    response = client.post(f'/denials/{denial.id}/appeal-status', data={'appeal_status': 'submitted'})
+    assert response.status_code == 302
+    assert db.session.get(Denial, denial.id).appeal_status == 'submitted'
+    assert appeal_bucket_counts(user.id)['next_7_days'] == 0
+    assert response.headers['Location'] == f'/claims/{claim.id}'
+
+
+def test_update_appeal_status_never_redirects_off_site(client, make_user, login, make_claims):
+    user = make_user()
+    denial = _deny(make_claims(user, 1)[0], date.today() + timedelta(days=6))
+    login(user)
+    url = f'/denials/{denial.id}/appeal-status'
+    page = client.get('/appeals/worklist?days=30').get_data(as_text=True)
+    form = page[page.index(url):page.index('</form>', page.index(url))]
+    assert 'name="return_to" value="worklist"' in form and 'name="days" value="30"' in form and 'name="next"' not in form
+
+    for target in ('//evil.example', '//evil.example/x', 'https://evil.example', '/\\evil.example'):
+        response = client.post(url, data={'appeal_status': 'submitted', 'next': target})
+        assert response.status_code == 302 and 'evil.example' not in response.headers['Location']
+
+    # The worklist form returns to its own page and filters
+    response = client.post(url, data={'appeal_status': 'pending', 'return_to': 'worklist', 'days': '30',
+                                      'denial_code': 'CO-16', 'page': '2'})
+    location = urlsplit(response.headers['Location'])
+    assert location.netloc == '' and location.path == '/appeals/worklist'
+    assert parse_qs(location.query) == {'days': ['30'], 'denial_code': ['CO-16'], 'page': ['2']}
+
+
+def test_worklist_status_form_carries_csrf_token(app, client, make_user, login, make_claims):
+    user = make_user()
+    denial = _deny(make_claims(user, 1)[0], date.today() + timedelta(days=6))
+    login(user)
+    app.config['WTF_CSRF_ENABLED'] = True
+
+    page = client.get('/appeals/worklist').get_data(as_text=True)
+    form = page[page.index(f'/denials/{denial.id}/appeal-status'):]
+    token = re.search(r'name="csrf_token" value="([^"]+)"', form).group(1)
+    url = f'/denials/{denial.id}/appeal-status'
+    assert client.post(url, data={'appeal_status': 'submitted'}).status_code == 400
+    assert client.post(url, data={'appeal_status': 'submitted', 'csrf_token': token}).status_code == 302
+    assert db.session.get(Denial, denial.id).appeal_status == 'submitted'
+
+
+def test_letter_templates_fall_back_by_group():
+    from app.appeals import letter_template
+    assert letter_template('CO-29').name == 'CO-29.txt'
+    assert letter_template('PR-3').name == 'PR.txt'
+    assert letter_template('OA-23').name == 'default.txt'
+    assert letter_template('CO-29') is letter_template('CO-29')
+
+
+def test_batch_letters_stream_zip_and_persist(client, make_user, login, make_claims):
+    import io
+    import zipfile
+
+    user = make_user()
+    other = make_user('other')
+    claims = make_claims(user, 120)
+    foreign = _deny(make_claims(other, 1, prefix='OTH')[0], None)
+    denials = [_deny(claim, date.today() + timedelta(days=9), code=code)
+               for claim, code in zip(claims, ['CO-18', 'PR-2', 'CO-97'] * 40)]
+    login(user)
+
+    ids = [d.id for d in denials] + [foreign.id]
+    response = client.post('/appeals/letters', json={'denial_ids': ids, 'persist': True})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
+    assert response.is_streamed
+
+    archive = zipfile.ZipFile(io.BytesIO(response.get_data()))
+    names = archive.namelist()
+    assert len(names) == 120
+    letter = archive.read(f'appeal_{claims[0].claim_number}_{denials[0].id}.txt').decode()
+    assert 'CO-18' in letter and claims[0].claim_number in letter
+
+    db.session.expire_all()
+    assert db.session.get(Denial, denials[1].id).appeal_message.startswith(letter.splitlines()[0])
+    assert db.session.get(Denial, foreign.id).appeal_message is None
+
+
+def test_single_letter(client, make_user, login, make_claims):
+    user = make_user()
+    denial = _deny(make_claims(user, 1)[0], None, code='CO-29')
+    login(user)
+    response = client.get(f'/denials/{denial.id}/appeal-letter')
+    assert response.status_code == 200
+    assert b'time limit for' in response.data
+
+
+def test_letters_form_carries_csrf_token(app, client, make_user, login, make_claims):
+    user = make_user()
+    denial = _deny(make_claims(user, 1)[0], date.today() + timedelta(days=6))
+    login(user)
+    app.config['WTF_CSRF_ENABLED'] = True
+
+    page = client.get('/appeals/worklist').get_data(as_text=True)
+    form = page[page.index('id="lettersForm"'):]
+    token = re.search(r'name="csrf_token" value="([^"]+)"', form[:form.index('</form>')]).group(1)
+    assert client.post('/appeals/letters', data={'denial_ids': denial.id}).status_code == 400
+    response = client.post('/appeals/letters', data={'denial_ids': denial.id, 'csrf_token': token})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/zip'
@@ -0,0 +1,120 @@
+"""Tests for hot/cold archival of settled claims."""
+import csv
+import io
+from datetime import date, datetime, timedelta
+from sqlalchemy import update
+from app import db
+from app.archive import archive_claims, table_stats
+from app.models import Claim, Denial, Issue, ClaimArchive, AppealDeadlineTally
+from app.routes import claim_numbers_in_use
+
+LONG_AGO = datetime.utcnow() - timedelta(days=400)
+
+
+def _age(claims):
+    db.session.execute(update(Claim).where(Claim.id.in_([claim.id for claim in claims]))
+                       .values(updated_at=LONG_AGO))
+    db.session.execute(update(Denial).values(updated_at=LONG_AGO))
+    db.session.commit()
+
+
+def _seed(user, make_claims):
+    """Return ids of old claims (approved; denied with a decided, lapsed and submitted appeal; pending)
+    followed by a recent approved claim."""
+    approved = make_claims(user, 1, prefix='APP', status='approved')[0]
+    decided, lapsed, appealing = make_claims(user, 3, prefix='DEN', status='denied')
+    pending = make_claims(user, 1, prefix='PEN')[0]
+    recent = make_claims(user, 1, prefix='NEW', status='approved')[0]
+    db.session.add_all([
+        Issue(claim_id=approved.id, issue_type='old_claim', description='old'),
+        Denial(claim_id=decided.id, denial_code='CO-16', denial_reason='r', denial_date=date(2024, 4, 1),
+               appeal_deadline=date(2024, 6, 1), appeal_status='denied'),
+        Denial(claim_id=lapsed.id, denial_code='CO-16', denial_reason='r', denial_date=date(2024, 4, 1),
+               appeal_deadline=date(2024, 6, 1), appeal_status='pending'),
+        Denial(claim_id=appealing.id, denial_code='CO-16', denial_reason='r', denial_date=date(2024, 4, 1),
+               appeal_deadline=date(2024, 6, 1), appeal_status='submitted'),
+    ])
+    db.session.commit()
+    _age([approved, decided, lapsed, appealing, pending])
+    return [claim.id for claim in (approved, decided, lapsed, appealing, pending, recent)]
+
+
+def test_archive_moves_settled_claims_with_children(app, make_user, make_claims):
+    user = make_user()
+    approved, decided, lapsed, *_ = _seed(user, make_claims)
+    user_id = user.id
+    assert db.session.get(AppealDeadlineTally, (user_id, date(2024, 6, 1))).pending_count == 1
+
+    totals = archive_claims(older_than_days=365, batch_size=2)
+    assert totals == {'claims': 3, 'denials': 2, 'issues': 1}
+    assert sorted(claim.claim_number for claim in ClaimArchive.query) == ['APP000000', 'DEN000000', 'DEN000001']
+    assert sorted(claim.claim_number for claim in Claim.query) == ['DEN000002', 'NEW000000', 'PEN000000']
+    assert Denial.query.count() == 1 and Issue.query.count() == 0
+
+    archived = db.session.get(ClaimArchive, approved)
+    assert archived.issues[0].issue_type == 'old_claim' and archived.archived_at is not None
+    assert [denial.appeal_status for denial in db.session.get(ClaimArchive, lapsed).denials] == ['pending']
+    # The lapsed appeal left the worklist tallies with its claim
+    assert db.session.get(AppealDeadlineTally, (user_id, date(2024, 6, 1))).pending_count == 0
+    assert archive_claims(older_than_days=365) == {}
+
+
+def test_archived_ids_are_never_reused(app, make_user, make_claims):
+    user = make_user()
+    old = make_claims(user, 1, prefix='OLD', status='approved')[0]
+    make_claims(user, 1, prefix='NEW', status='approved')
+    db.session.add_all([Issue(claim_id=old.id, issue_type='old_claim', description='old'),
+                        Denial(claim_id=old.id, denial_code='CO-16', denial_reason='r',
+                               denial_date=date(2024, 4, 1), appeal_status='denied')])
+    db.session.commit()
+    _age([old])
+    # The newest denial and issue leave the working tables with their claim
+    assert archive_claims(older_than_days=365) == {'claims': 1, 'denials': 1, 'issues': 1}
+
+    later = make_claims(user, 2, prefix='LATER', status='approved')[0]
+    db.session.add_all([Issue(claim_id=later.id, issue_type='old_claim', description='old'),
+                        Denial(claim_id=later.id, denial_code='CO-16', denial_reason='r',
+                               denial_date=date(2024, 4, 1), appeal_status='denied')])
+    db.session.commit()
+    assert later.issues[0].id == 2 and later.denials[0].id == 2
+    _age([later])
+    assert archive_claims(older_than_days=365) == {'claims': 1, 'denials': 1, 'issues': 1}
+
+
+def test_archived_claims_stay_reachable(client, make_user, login, make_claims):
+    user = make_user()
+    _, decided, *_ = _seed(user, make_claims)
+    archive_claims(older_than_days=365)
+    login(user)
+
+    page = client.get(f'/claims/{decided}')
+    assert page.status_code == 200 and b'Archived' in page.data and b'CO-16' in page.data
+
+    item = client.get(f'/api/v1/claims/{decided}?embed=denials').get_json()['data']
+    assert item['claim_number'] == 'DEN000000' and item['denials'][0]['appeal_status'] == 'denied'
+
+    # Working and archived claims come back merged, newest first, across pages
+    seen, cursor = [], ''
+    while True:
+        body = client.get(f'/api/v1/claims?limit=2&fields=claim_number{cursor}').get_json()
+        seen += [row['id'] for row in body['data']]
+        if not body['next_cursor']:
+            break
+        cursor = f"&cursor={body['next_cursor']}"
+    assert seen == sorted(seen, reverse=True) and len(seen) == 6
+    assert len(client.get('/api/v1/claims?status=approved').get_json()['data']) == 2
+
+    rows = list(csv.DictReader(io.StringIO(client.get('/claims/export').get_data(as_text=True))))
+    assert len(rows) == 6 and rows[0]['claim_number'] == 'APP000000'
+
+    assert claim_numbers_in_use(['APP000000', 'NEW000000', 'FREE']) == {'APP000000', 'NEW000000'}
+
+
+def test_table_stats_reports_rows_and_depth(app, make_user, make_claims):
+    _seed(make_user(), make_claims)
+    archive_claims(older_than_days=365)
+    stats = table_stats()
+    assert stats['claim']['rows'] == 3 and stats['claim_archive']['rows'] == 3
+    assert stats['issue_archive']['rows'] == 1 and stats['denial_archive']['rows'] == 2
+    if stats['claim']['depth'] is not None:  # dbstat available
+        assert stats['claim']['depth'] >= 1 and 'ix_denial_claim_id' in stats['denial']['indexes']
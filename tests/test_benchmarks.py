@@ -0,0 +1,27 @@
+"""Tests for the benchmark suite and load-test harness."""
+from benchmarks.suite import compare
+
+
+def _run(**medians):
+    return {'scales': {'10k': {'benchmarks': {name: {'median_ms': ms} for name, ms in medians.items()}}}}
+
+
+def test_compare_flags_only_real_regressions():
+    baseline = _run(index=10.0, claims_list=100.0, view_claim=1.0)
+    current = _run(index=11.0, claims_list=140.0, view_claim=2.0, deny_claim=5.0)
+    regressions = compare(current, baseline, threshold=0.25, min_delta_ms=2.0)
+    assert len(regressions) == 1  # view_claim doubled but by less than min_delta_ms
+    assert regressions[0].startswith('10k claims_list: 100.00 ms -> 140.00 ms')
+    assert compare(current, {'scales': {}}, 0.25, 2.0) == []
+
+
+def test_loadtest_percentiles_and_small_run():
+    from benchmarks.loadtest import percentile, run
+    values = [i / 100 for i in range(1, 101)]
+    assert (percentile(values, 50), percentile(values, 95), percentile(values, 99)) == (0.5, 0.95, 0.99)
+    assert percentile([], 50) == 0.0
+
+    result = run(users=2, iterations=4, claims_per_user=20, seed=3, sqlite_timeout=5.0, lock_wait_ms=20.0)
+    assert result['requests'] >= 6
+    assert result['endpoints']['POST /auth/login']['requests'] == 2
+    assert all(row['errors'] == 0 for row in result['endpoints'].values())
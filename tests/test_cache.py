@@ -0,0 +1,61 @@
+"""Tests for the rendered fragment cache."""
+from datetime import date
+from app.cache import LRUCache, RedisCache, InMemoryRedis, FragmentCache, fragment_cache
+
+
+def test_lru_evicts_by_size():
+    cache = LRUCache(max_bytes=10)
+    cache.set('a', 'xxxx')
+    cache.set('b', 'yyyy')
+    assert cache.get('a') == 'xxxx'  # 'a' is now most recently used
+    cache.set('c', 'zzzz')
+    assert cache.get('b') is None
+    assert cache.get('a') == 'xxxx'
+    assert cache.current_bytes == 8
+    cache.set('huge', 'x' * 50)
+    assert cache.get('huge') is None and len(cache) == 2
+
+
+def test_redis_backend_with_stand_in(app):
+    cache = FragmentCache(RedisCache(InMemoryRedis(), ttl=60))
+    calls = []
+    render = lambda: calls.append(1) or '<b>hi</b>'
+    assert cache.get_or_render('frag', (1, 2), render) == '<b>hi</b>'
+    assert cache.get_or_render('frag', (1, 2), render) == '<b>hi</b>'
+    assert len(calls) == 1
+    assert cache.stats()['fragments']['frag'] == {'hits': 1, 'misses': 1, 'errors': 0, 'hit_ratio': 0.5}
+
+
+def test_dashboard_fragments_invalidated_by_writes(client, app, make_user, login):
+    user = make_user('manager', role='manager')
+    login(user)
+
+    client.get('/')
+    client.get('/')
+    stats = fragment_cache().stats()['fragments']
+    assert stats['dashboard_stats']['hits'] == 1
+    assert stats['recent_claims']['hits'] == 1
+
+    client.post('/claims/new', data={
+        'claim_number': 'NEW001', 'patient_id': 'PAT001', 'provider_id': 'PROV001',
+        'service_date': date.today().isoformat(), 'total_amount': '10',
+    })
+    response = client.get('/')
+    assert b'NEW001' in response.data
+    assert fragment_cache().stats()['fragments']['recent_claims']['misses'] == 2
+
+
+def test_claims_rows_cached_and_stats_endpoint(client, make_user, login, make_claims):
+    admin = make_user('admin', role='admin')
+    make_claims(admin, 5)
+    login(admin)
+    first = client.get('/claims').data
+    assert client.get('/claims').data == first
+    body = client.get('/admin/cache-stats').get_json()
+    assert body['backend'] == 'LRUCache'
+    assert body['fragments']['claims_rows']['hits'] == 1
+
+
+def test_cache_stats_admin_only(client, make_user, login):
+    login(make_user())
+    assert client.get('/admin/cache-stats').status_code == 403
@@ -0,0 +1,62 @@
+"""Tests for Accept-Encoding negotiated response compression."""
+import gzip
+import zlib
+
+
+def _gunzip_stream(data):
+    return zlib.decompress(data, 31)
+
+
+def test_large_html_is_gzipped(client, make_user, login, make_claims):
+    user = make_user()
+    make_claims(user, 40)
+    login(user)
+
+    plain = client.get('/claims')
+    assert 'Content-Encoding' not in plain.headers
+
+    response = client.get('/claims', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    body = gzip.decompress(response.data)
+    assert body == plain.data
+    assert len(response.data) < len(body) / 3
+
+
+def test_small_and_refused_responses_are_not_compressed(client, make_user, login):
+    login(make_user())
+    small = client.get('/api/v1/claims', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+    refused = client.get('/claims', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+    assert 'Content-Encoding' not in refused.headers
+
+
+def test_streamed_csv_is_compressed_incrementally(client, make_user, login, make_claims):
+    user = make_user()
+    make_claims(user, 3000)
+    login(user)
+
+    plain = client.get('/claims/export').get_data()
+    response = client.get('/claims/export', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert _gunzip_stream(response.get_data()) == plain
+
+
+def test_blueprint_opt_out(client, app):
+    response = client.get('/auth/login', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert 'Content-Encoding' not in response.headers
+
+    app.config['COMPRESSION_BLUEPRINTS'] = {'auth': True}
+    response = client.get('/auth/login', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_pages_with_csrf_tokens_are_not_compressed(client, make_user, login):
+    login(make_user())
+    response = client.get('/claims/upload', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert b'name="csrf_token"' in response.data
+    assert 'Content-Encoding' not in response.headers
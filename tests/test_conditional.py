@@ -0,0 +1,60 @@
+"""Tests for ETag / Last-Modified revalidation of claim pages."""
+from datetime import date
+from app import db
+from app.models import Issue
+
+
+def test_view_claim_revalidates(client, make_user, login, make_claims):
+    user = make_user()
+    claim = make_claims(user, 1)[0]
+    login(user)
+
+    first = client.get(f'/claims/{claim.id}')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert first.headers['Cache-Control'] == 'private, no-cache'
+
+    cached = client.get(f'/claims/{claim.id}', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+
+    # A new child row changes the validator
+    db.session.add(Issue(claim_id=claim.id, issue_type='documentation', description='missing notes'))
+    db.session.commit()
+    changed = client.get(f'/claims/{claim.id}', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+
+def test_view_claim_etag_is_per_user(client, make_user, login, make_claims):
+    owner = make_user()
+    admin = make_user('admin', role='admin')
+    claim = make_claims(owner, 1)[0]
+    login(owner)
+    etag = client.get(f'/claims/{claim.id}').headers['ETag']
+    client.get('/auth/logout')
+    login(admin)
+    assert client.get(f'/claims/{claim.id}', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_claims_list_version_bumped_by_writes(client, make_user, login, make_claims):
+    manager = make_user('manager', role='manager')
+    claim = make_claims(manager, 2)[0]
+    login(manager)
+
+    etag = client.get('/claims').headers['ETag']
+    assert client.get('/claims', headers={'If-None-Match': etag}).status_code == 304
+
+    client.post(f'/claims/{claim.id}/deny', data={'denial_code': 'CO-16', 'denial_date': '2024-05-01'})
+    response = client.get('/claims', headers={'If-None-Match': etag})
+    # The deny redirect flashed a message, so this render must not be cached
+    assert response.status_code == 200
+    assert 'ETag' not in response.headers
+
+    etag = client.get('/claims').headers['ETag']
+    client.post('/claims/new', data={
+        'claim_number': 'NEW001', 'patient_id': 'PAT001', 'provider_id': 'PROV001',
+        'service_date': date.today().isoformat(), 'total_amount': '10',
+    })
+    client.get('/claims')  # Consume the flash
+    assert client.get('/claims', headers={'If-None-Match': etag}).status_code == 200
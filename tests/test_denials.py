@@ -0,0 +1,67 @@
+"""Tests for single and bulk claim denial."""
+from app import db
+from app.models import Claim, Denial
+
+
+def _bulk_deny(client, **payload):
+    payload.setdefault('denial_code', 'CO-29')
+    payload.setdefault('denial_date', '2024-05-01')
+    return client.post('/api/claims/bulk-deny', json=payload)
+
+
+def test_bulk_deny_requires_manager(client, make_user, login, make_claims):
+    user = make_user()
+    claims = make_claims(user, 3)
+    login(user)
+    response = _bulk_deny(client, claim_ids=[c.id for c in claims])
+    assert response.status_code == 403
+    assert Denial.query.count() == 0
+
+
+def test_bulk_deny_by_ids(client, make_user, login, make_claims):
+    manager = make_user('manager', role='manager')
+    claims = make_claims(manager, 1200)
+    claims[0].status = 'approved'
+    db.session.commit()
+    login(manager)
+
+    ids = [c.id for c in claims] + [999999]
+    response = _bulk_deny(client, claim_ids=ids, appeal_deadline='2024-06-30')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['requested'] == 1201
+    assert body['denied'] == 1199
+    by_id = {r['claim_id']: r['result'] for r in body['results']}
+    assert by_id[claims[0].id] == 'not_pending'
+    assert by_id[999999] == 'not_found'
+
+    assert Denial.query.count() == 1199
+    assert Claim.query.filter_by(status='denied').count() == 1199
+    denial = Denial.query.first()
+    assert denial.denial_reason.startswith('The time limit for filing')
+    assert denial.appeal_status == 'pending'
+
+
+def test_bulk_deny_by_filter(client, make_user, login, make_claims):
+    manager = make_user('manager', role='manager')
+    make_claims(manager, 5, provider_id='PROV001', prefix='A')
+    make_claims(manager, 4, provider_id='PROV002', prefix='B')
+    login(manager)
+
+    response = _bulk_deny(client, filter={'provider_id': 'PROV002', 'status': 'pending'})
+    assert response.status_code == 200
+    assert response.get_json()['denied'] == 4
+    assert Claim.query.filter_by(provider_id='PROV001', status='pending').count() == 5
+
+
+def test_bulk_deny_validation(client, make_user, login, make_claims):
+    manager = make_user('manager', role='manager')
+    claims = make_claims(manager, 2)
+    login(manager)
+    ids = [c.id for c in claims]
+
+    assert _bulk_deny(client, claim_ids=ids, denial_code='XX-1').status_code == 400
+    assert _bulk_deny(client, claim_ids=ids, appeal_deadline='2024-04-01').status_code == 400
+    assert _bulk_deny(client, filter={'payer': 'x'}).status_code == 400
+    assert _bulk_deny(client).status_code == 400
+    assert Denial.query.count() == 0
@@ -0,0 +1,65 @@
+"""Tests for fingerprint-based near-duplicate detection."""
+import io
+from datetime import date
+from app import db
+from app.models import Claim, Issue, claim_fingerprint
+
+
+def _upload(client, body):
+    return client.post('/claims/upload', data={'file': (io.BytesIO(body.encode()), 'claims.csv')},
+                       content_type='multipart/form-data')
+
+
+def _duplicate_issues():
+    return Issue.query.filter_by(issue_type='possible_duplicate').all()
+
+
+def test_fingerprint_normalizes_fields():
+    expected = claim_fingerprint('PAT001', 'PROV001', date(2024, 3, 15), 100)
+    assert claim_fingerprint(' pat001 ', 'prov001', '2024-03-15', '100.00') == expected
+    assert claim_fingerprint('PAT001', 'PROV001', date(2024, 3, 15), 100.01) != expected
+    assert claim_fingerprint('PAT001', 'PROV001', date(2024, 3, 16), 100) != expected
+
+
+def test_orm_writes_set_fingerprint(make_user, make_claims):
+    claim = make_claims(make_user(), 1)[0]
+    assert claim.fingerprint == claim_fingerprint(claim.patient_id, claim.provider_id, claim.service_date,
+                                                  claim.total_amount)
+    claim.total_amount = 250.0
+    db.session.commit()
+    assert claim.fingerprint == claim_fingerprint(claim.patient_id, claim.provider_id, claim.service_date, 250.0)
+
+
+def test_new_claim_flags_resubmission(client, make_user, make_claims, login):
+    user = make_user()
+    original = make_claims(user, 1, service_date=date(2025, 6, 2), total_amount=480.0)[0]
+    login(user)
+    response = client.post('/claims/new', data={
+        'claim_number': 'RESUB001', 'patient_id': original.patient_id, 'provider_id': original.provider_id,
+        'service_date': '2025-06-02', 'total_amount': '480.00',
+    })
+    assert response.status_code == 302
+    [issue] = _duplicate_issues()
+    assert issue.claim.claim_number == 'RESUB001'
+    assert original.claim_number in issue.description
+    assert issue.severity == 'high'
+
+
+def test_upload_flags_duplicates_in_one_pass(client, make_user, make_claims, login):
+    user = make_user()
+    original = make_claims(user, 1, service_date=date(2025, 6, 2), total_amount=480.0)[0]
+    login(user)
+    body = (
+        'claim_number,patient_id,provider_id,service_date,total_amount\n'
+        f'UPD001,{original.patient_id},{original.provider_id},2025-06-02,480\n'  # Matches the existing claim
+        'UPD002,PAT900,PROV001,2025-06-03,75.5\n'
+        'UPD003,PAT900,PROV001,2025-06-03,75.50\n'  # Matches the row above
+        'UPD004,PAT901,PROV001,2025-06-03,75.5\n'
+        'UPD004,PAT902,PROV001,2025-06-03,80\n'  # Repeated claim number: skipped
+    )
+    assert _upload(client, body).status_code == 302
+    assert Claim.query.count() == 5
+    flagged = {issue.claim.claim_number: issue.description for issue in _duplicate_issues()}
+    assert set(flagged) == {'UPD001', 'UPD003'}
+    assert original.claim_number in flagged['UPD001']
+    assert 'UPD002' in flagged['UPD003']
@@ -0,0 +1,50 @@
+"""Tests for the streaming claims CSV export."""
+import csv
+import io
+from datetime import date
+from app import db
+from app.models import Denial, Issue
+
+
+def test_export_streams_visible_claims_with_summaries(client, make_user, login, make_claims):
+    user = make_user()
+    other = make_user('other')
+    claims = make_claims(user, 2500)
+    make_claims(other, 3, prefix='OTH')
+    db.session.add_all([
+        Issue(claim_id=claims[0].id, issue_type='old_claim', description='old'),
+        Issue(claim_id=claims[0].id, issue_type='high_amount', description='high'),
+        Denial(claim_id=claims[0].id, denial_code='CO-16', denial_reason='reason',
+               denial_date=date(2024, 4, 1)),
+    ])
+    db.session.commit()
+    login(user)
+
+    response = client.get('/claims/export')
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == 'text/csv'
+
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == 2500
+    first = rows[0]
+    assert first['claim_number'] == claims[0].claim_number
+    assert first['issue_count'] == '2'
+    assert set(first['issue_types'].split('; ')) == {'old_claim', 'high_amount'}
+    assert first['denial_codes'] == 'CO-16'
+    assert first['last_denial_date'] == '2024-04-01'
+    assert rows[1]['issue_count'] == '0'
+    assert not any(row['claim_number'].startswith('OTH') for row in rows)
+
+
+def test_export_admin_sees_all_and_filters(client, make_user, login, make_claims):
+    admin = make_user('admin', role='admin')
+    other = make_user('other')
+    make_claims(other, 3, prefix='OTH')
+    make_claims(other, 2, prefix='APP', status='approved')
+    login(admin)
+
+    rows = list(csv.DictReader(io.StringIO(client.get('/claims/export').get_data(as_text=True))))
+    assert len(rows) == 5
+    rows = list(csv.DictReader(io.StringIO(client.get('/claims/export?status=approved').get_data(as_text=True))))
+    assert [row['claim_number'][:3] for row in rows] == ['APP', 'APP']
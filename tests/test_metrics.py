@@ -0,0 +1,138 @@
+"""Tests for the Prometheus metrics endpoint."""
+import io
+import json
+import os
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+from app import create_app, db
+from app.metrics import MetricsRegistry, mark_process_dead
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def test_metrics_requires_admin(client, make_user, login):
+    assert client.get('/metrics').status_code == 403
+    login(make_user())
+    assert client.get('/metrics').status_code == 403
+
+
+def test_metrics_records_requests_sql_pool_and_uploads(client, make_user, login):
+    login(make_user('admin', role='admin'))
+    assert client.get('/').status_code == 200
+    body = ('claim_number,patient_id,provider_id,service_date,total_amount\n'
+            'MET001,PAT001,PROV001,2024-03-15,100\n')
+    client.post('/claims/upload', data={'file': (io.BytesIO(body.encode()), 'c.csv')},
+                content_type='multipart/form-data')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'dms_http_requests_total{endpoint="main.index",method="GET",status="200"} 1' in text
+    assert '# TYPE dms_http_request_duration_seconds histogram' in text
+    assert 'dms_http_request_duration_seconds_bucket{endpoint="main.index",le="+Inf"} 1' in text
+    assert 'dms_request_sql_statements_count{endpoint="main.index"} 1' in text
+    assert 'dms_upload_rows_total{outcome="created"} 1' in text
+    assert 'dms_db_pool_checkout_wait_seconds_count' in text
+
+
+def test_metrics_bearer_token():
+    app = create_app('testing', {'METRICS_TOKEN': 's3cret'})
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    assert client.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 403
+    assert client.get('/metrics', headers={'Authorization': 'Bearer s3cret'}).status_code == 200
+
+
+def test_multiprocess_snapshots_are_merged(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc('dms_sql_statements_total', amount=3)
+    registry.observe('dms_http_request_duration_seconds', 0.02, {'endpoint': 'main.index'})
+
+    # Another worker's snapshot
+    other = {
+        'counters': [['dms_sql_statements_total', [], 4]],
+        'gauges': [['dms_db_pool_size', [['pid', '99999']], 5]],
+        'histograms': [['dms_http_request_duration_seconds', [['endpoint', 'main.index']],
+                        [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0], 0.02, 1]],
+    }
+    (tmp_path / 'metrics_99999.json').write_text(json.dumps(other))
+
+    text = registry.render()
+    assert 'dms_sql_statements_total 7' in text
+    assert 'dms_http_request_duration_seconds_bucket{endpoint="main.index",le="0.025"} 2' in text
+    assert 'dms_http_request_duration_seconds_bucket{endpoint="main.index",le="0.01"} 0' in text
+    assert 'dms_http_request_duration_seconds_count{endpoint="main.index"} 2' in text
+    assert 'dms_db_pool_size{pid="99999"} 5' in text
+
+
+def test_dead_worker_snapshots_are_folded_into_the_archive(tmp_path):
+    registry = MetricsRegistry(str(tmp_path))
+    registry.inc('dms_sql_statements_total', amount=3)
+    for pid, statements in ((99998, 4), (99999, 5)):
+        dead = {
+            'counters': [['dms_sql_statements_total', [], statements]],
+            'gauges': [['dms_db_pool_size', [['pid', str(pid)]], 5]],
+            'histograms': [['dms_http_request_duration_seconds', [['endpoint', 'main.index']],
+                            [0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0], 0.02, 1]],
+        }
+        (tmp_path / f'metrics_{pid}.json').write_text(json.dumps(dead))
+    before = registry.render()
+
+    assert mark_process_dead(str(tmp_path), 99998) and mark_process_dead(str(tmp_path), 99999)
+    assert not mark_process_dead(str(tmp_path), 99999)
+    assert {path.name for path in tmp_path.glob('metrics_*.json')} == {
+        'metrics_archive.json', f'metrics_{os.getpid()}.json'}
+    text = registry.render()
+    # Totals carry on; only the dead workers' gauges are gone
+    assert 'dms_sql_statements_total 12' in text
+    assert 'dms_http_request_duration_seconds_count{endpoint="main.index"} 2' in text
+    assert 'pid="9999' not in text and 'dms_db_pool_size{pid="99999"} 5' in before
+    assert text == before.replace('dms_db_pool_size{pid="99998"} 5\n', '').replace(
+        'dms_db_pool_size{pid="99999"} 5\n', '')
+
+    # A file that outlives its fold is not counted twice
+    (tmp_path / 'metrics_99999.json').write_text(json.dumps(dead))
+    assert 'dms_sql_statements_total 12' in registry.render()
+
+
+def test_gunicorn_folds_exited_workers(tmp_path, monkeypatch):
+    settings = runpy.run_path(str(PROJECT_ROOT / 'gunicorn.conf.py'))
+    (tmp_path / 'metrics_4242.json').write_text(json.dumps(
+        {'counters': [['dms_sql_statements_total', [], 1]], 'gauges': [], 'histograms': []}))
+    worker = SimpleNamespace(pid=4242)
+
+    settings['child_exit'](None, worker)  # Without METRICS_MULTIPROC_DIR nothing is touched
+    assert (tmp_path / 'metrics_4242.json').exists()
+    monkeypatch.setenv('METRICS_MULTIPROC_DIR', str(tmp_path))
+    settings['child_exit'](None, worker)
+    assert [path.name for path in tmp_path.iterdir()] == ['metrics_archive.json']
+
+
+def test_pool_profiles_follow_the_database(tmp_path):
+    from sqlalchemy.pool import QueuePool, StaticPool
+    from app import pool_settings
+
+    assert create_app('testing').config['POOL_PROFILE'] == 'sqlite-memory'
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/pool.db'})
+    assert app.config['POOL_PROFILE'] == 'sqlite-file'
+    with app.app_context():
+        assert isinstance(db.engine.pool, QueuePool) and not db.engine.pool._pre_ping
+        db.create_all()
+        with db.engine.connect(), db.engine.connect():
+            pass
+        text = app.extensions['metrics'].render()
+    assert 'dms_db_pool_checked_out_max{pid=' not in text  # Labelled by profile
+    assert 'dms_db_pool_checked_out_max{profile="sqlite-file",' in text and '} 2' in text
+    assert 'dms_db_pool_connections_total{profile="sqlite-file"} 2' in text
+    assert 'dms_db_pool_checkout_wait_seconds_count{profile="sqlite-file"}' in text
+
+    name, options = pool_settings({'SQLALCHEMY_DATABASE_URI': 'postgresql://db/claims',
+                                   'POOL_PROFILES': app.config['POOL_PROFILES'],
+                                   'SQLALCHEMY_ENGINE_OPTIONS': {'pool_size': 3}})
+    assert name == 'server-db' and options['pool_pre_ping'] and options['pool_size'] == 3
+    forced = pool_settings({'SQLALCHEMY_DATABASE_URI': 'sqlite:///file.db', 'POOL_PROFILE': 'sqlite-memory',
+                            'POOL_PROFILES': app.config['POOL_PROFILES']})
+    assert forced == ('sqlite-memory', {'poolclass': StaticPool, 'pool_pre_ping': False})
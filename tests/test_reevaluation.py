@@ -0,0 +1,99 @@
+"""Tests for scheduled re-evaluation of time-based issues."""
+from datetime import date, timedelta
+from app import db
+from app import reevaluation
+from app.models import Denial, Issue, RuleWatermark
+from app.reevaluation import reevaluate_issues
+
+AS_OF = date(2025, 6, 1)
+
+
+def _issues(issue_type, status='open'):
+    return sorted(issue.claim.claim_number for issue in Issue.query.filter_by(issue_type=issue_type, status=status))
+
+
+def test_old_claims_flagged_once_as_they_cross(app, make_user, make_claims):
+    user = make_user()
+    for days_old, number in ((400, 'OLD'), (366, 'EDGE'), (360, 'SOON'), (30, 'NEW')):
+        make_claims(user, 1, prefix=number, service_date=AS_OF - timedelta(days=days_old))
+
+    results = reevaluate_issues(AS_OF)
+    assert results['old_claim']['since'] is None and results['old_claim']['created'] == 2
+    assert _issues('old_claim') == ['EDGE000000', 'OLD000000']
+
+    # Ten days later only the claim that crossed in between is picked up
+    results = reevaluate_issues(AS_OF + timedelta(days=10))
+    assert results['old_claim'] == {'since': AS_OF, 'created': 1, 'resolved': 0, 'skipped': False}
+    assert _issues('old_claim') == ['EDGE000000', 'OLD000000', 'SOON000000']
+    assert reevaluate_issues(AS_OF + timedelta(days=10))['old_claim']['skipped']
+    assert db.session.get(RuleWatermark, 'old_claim').evaluated_through == AS_OF + timedelta(days=10)
+
+
+def test_future_dates_resolve_when_reached(app, make_user, make_claims):
+    claim = make_claims(make_user(), 1, service_date=AS_OF + timedelta(days=3))[0]
+    db.session.add(Issue(claim_id=claim.id, issue_type='future_date', description='future', severity='high'))
+    db.session.commit()
+    reevaluate_issues(AS_OF)
+    assert _issues('future_date') == ['CLM000000']
+    reevaluate_issues(AS_OF + timedelta(days=3))
+    assert _issues('future_date', 'resolved') == ['CLM000000']
+
+
+def test_appeal_deadlines_flag_and_resolve(app, make_user, make_claims):
+    claims = make_claims(make_user(), 2, status='denied')
+    denials = [
+        Denial(claim_id=claim.id, denial_code='CO-16', denial_reason='Missing info', denial_date=AS_OF,
+               appeal_deadline=AS_OF + timedelta(days=days))
+        for claim, days in zip(claims, (10, 30))
+    ]
+    db.session.add_all(denials)
+    db.session.commit()
+
+    reevaluate_issues(AS_OF)
+    assert _issues('appeal_deadline') == ['CLM000000']
+    reevaluate_issues(AS_OF + timedelta(days=20))  # Second deadline now 10 days out; first one passed
+    assert _issues('appeal_deadline') == ['CLM000001']
+    assert _issues('appeal_deadline', 'resolved') == ['CLM000000']
+
+    denials[1].appeal_status = 'submitted'
+    db.session.commit()
+    reevaluate_issues(AS_OF + timedelta(days=21))
+    assert _issues('appeal_deadline') == []
+
+
+def test_appeal_deadlines_flag_denials_created_inside_the_window(app, make_user, make_claims):
+    claims = make_claims(make_user(), 2, status='denied')
+    reevaluate_issues(AS_OF)
+
+    # Denied after the last run with a deadline already close
+    denial = Denial(claim_id=claims[0].id, denial_code='CO-16', denial_reason='Missing info', denial_date=AS_OF,
+                    appeal_deadline=AS_OF + timedelta(days=5))
+    db.session.add(denial)
+    db.session.commit()
+    results = reevaluate_issues(AS_OF + timedelta(days=1))
+    assert results['appeal_deadline']['since'] == AS_OF and results['appeal_deadline']['created'] == 1
+    assert _issues('appeal_deadline') == ['CLM000000']
+    assert reevaluate_issues(AS_OF + timedelta(days=2))['appeal_deadline']['created'] == 0
+
+    # Reopened after an appeal was filed
+    denial.appeal_status = 'submitted'
+    db.session.commit()
+    reevaluate_issues(AS_OF + timedelta(days=3))
+    assert _issues('appeal_deadline') == []
+    denial.appeal_status = 'pending'
+    db.session.commit()
+    reevaluate_issues(AS_OF + timedelta(days=4))
+    assert _issues('appeal_deadline') == ['CLM000000']
+
+
+def test_rule_version_change_reevaluates_only_that_rule(app, make_user, make_claims, monkeypatch):
+    make_claims(make_user(), 1, service_date=AS_OF - timedelta(days=200))
+    reevaluate_issues(AS_OF)
+    assert _issues('old_claim') == []
+
+    monkeypatch.setattr(reevaluation, 'OLD_CLAIM_DAYS', 180)
+    monkeypatch.setitem(reevaluation.RULES, 'old_claim', (2, reevaluation.evaluate_old_claims))
+    results = reevaluate_issues(AS_OF + timedelta(days=1))
+    assert results['old_claim']['since'] is None and results['old_claim']['created'] == 1
+    assert results['future_date']['since'] == AS_OF
+    assert db.session.get(RuleWatermark, 'old_claim').version == 2
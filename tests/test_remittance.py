@@ -0,0 +1,129 @@
+"""Tests for X12 835 remittance ingest."""
+import io
+import re
+from datetime import date
+from app import db
+from app.models import AppealDeadlineTally, Claim, Denial
+from app.remittance import ingest_835, iter_claims, iter_segments
+
+ISA = 'ISA*00*          *00*          *ZZ*PAYER          *ZZ*PROVIDER       *240501*1200*^*00501*000000001*0*P*:~'
+
+
+def _era(*claims, production_date='20240502'):
+    """Build an 835 with one CLP loop per (claim_number, status, paid, [CAS segments])."""
+    segments = [ISA, 'GS*HP*PAYER*PROVIDER*20240501*1200*1*X*005010X221A1', 'ST*835*0001',
+                'BPR*I*0*C*NON************20240501', 'TRN*1*12345*1512345678', f'DTM*405*{production_date}',
+                'N1*PR*PAYER', 'LX*1']
+    for claim_number, status, paid, adjustments in claims:
+        segments.append(f'CLP*{claim_number}*{status}*150*{paid}*0*12*PAYER{claim_number}')
+        segments += adjustments
+        segments.append('SVC*HC:99213*150*0')
+    segments += ['SE*20*0001', 'GE*1*1', 'IEA*1*000000001']
+    return '~\n'.join(segments) + '~\n'
+
+
+def test_segments_split_across_reads(app):
+    era = _era(('CLM000001', '4', 0, ['CAS*CO*29*150']), ('CLM000002', '1', 150, []))
+    expected = list(iter_segments(io.BytesIO(era.encode())))
+    assert expected[0][:2] == ['ISA', '00'] and expected[-1] == ['IEA', '1', '000000001']
+    # Block boundaries fall inside segments and terminators
+    assert list(iter_segments(io.BytesIO(era.encode()), read_size=7)) == expected
+
+    claims = list(iter_claims(iter_segments(io.BytesIO(era.encode()))))
+    assert [(c.claim_number, c.payment_date, c.denial_code()) for c in claims] == [
+        ('CLM000001', date(2024, 5, 2), 'CO-29'),
+        ('CLM000002', date(2024, 5, 2), None),
+    ]
+
+
+def test_ingest_creates_denials_in_bulk(app, make_user, make_claims):
+    user = make_user()
+    claims = make_claims(user, 12)
+    claims[5].status = 'approved'
+    db.session.commit()
+
+    era = _era(
+        *[(c.claim_number, '4', 0, ['CAS*CO*16*150']) for c in claims[:6]],
+        ('CLM000006', '1', 0, ['CAS*OA*23*50', 'CAS*PR*2*100']),  # Nothing paid, known code
+        ('CLM000007', '4', 0, ['CAS*CO*50*150']),  # Not one of DENIAL_CODES; kept as the payer sent it
+        ('CLM000008', '1', 120, ['CAS*CO*45*30']),  # Paid
+        ('CLM000009', '22', 0, ['CAS*CO*16*150']),  # Reversal
+        ('CLM000000', '4', 0, ['CAS*CO*16*150']),  # Repeated
+        ('NOPE00001', '4', 0, ['CAS*PR*1*150']),
+    )
+    summary = ingest_835(io.BytesIO(era.encode()), batch_size=4)
+    assert summary['claims'] == 12
+    assert summary['denials'] == 10
+    assert summary['denied'] == 7
+    assert summary['not_pending'] == 2
+    assert summary['unmatched'] == 1
+    assert summary['unmatched_claims'] == [{'claim_number': 'NOPE00001', 'denial_code': 'PR-1', 'reason': 'not_found'}]
+    assert summary['codes'] == {'CO-16': 5, 'PR-2': 1, 'CO-50': 1}
+
+    assert Claim.query.filter_by(status='denied').count() == 7
+    assert Claim.query.filter_by(claim_number='CLM000008').one().status == 'pending'
+    denial = Denial.query.join(Claim).filter(Claim.claim_number == 'CLM000006').one()
+    assert (denial.denial_code, denial.denial_date) == ('PR-2', date(2024, 5, 2))
+    # Deadlines follow the payer's appeal window, and the worklist tallies count them
+    assert {d.appeal_deadline for d in Denial.query} == {date(2024, 7, 31)}
+    assert db.session.get(AppealDeadlineTally, (user.id, date(2024, 7, 31))).pending_count == 7
+    assert Denial.query.filter_by(denial_code='CO-50').one().denial_reason == 'Unknown reason'
+
+    # Ingesting the same file again changes nothing
+    again = ingest_835(io.BytesIO(era.encode()))
+    assert again['denied'] == 0 and again['not_pending'] == 9
+    assert Denial.query.count() == 7
+
+
+def test_remittance_endpoint(client, make_user, login, make_claims):
+    user = make_user()
+    manager = make_user('manager', role='manager')
+    make_claims(user, 3)
+    era = _era(('CLM000001', '4', 0, ['CAS*CO*18*150']))
+
+    login(user)
+    response = client.post('/api/claims/remittance', data={'file': (io.BytesIO(era.encode()), 'era.835')})
+    assert response.status_code == 403
+
+    client.get('/auth/logout')
+    login(manager)
+    response = client.post('/api/claims/remittance', data={'file': (io.BytesIO(b'claim_number\n'), 'era.835')})
+    assert response.status_code == 400
+    assert 'ISA' in response.get_json()['error']
+
+    response = client.post('/api/claims/remittance', data={'file': (io.BytesIO(era.encode()), 'era.835')})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert (body['filename'], body['denied'], body['codes']) == ('era.835', 1, {'CO-18': 1})
+    assert Claim.query.filter_by(claim_number='CLM000001').one().status == 'denied'
+
+
+def test_remittance_endpoint_accepts_files_over_max_content_length(app, client, make_user, login, make_claims):
+    make_claims(make_user(), 2)
+    login(make_user('manager', role='manager'))
+    app.config.update(WTF_CSRF_ENABLED=True, MAX_CONTENT_LENGTH=4096, UPLOAD_MAX_SIZE=64 * 1024)
+    token = re.search(r'name="csrf_token" value="([^"]+)"', client.get('/claims/upload').get_data(as_text=True)).group(1)
+    # Line breaks between segments are ignored, so padding keeps the file valid
+    era = _era(('CLM000001', '4', 0, ['CAS*CO*18*150'])).replace('~\n', '~' + '\n' * 1000)
+    assert 4096 < len(era) < 64 * 1024
+
+    # CSRF protection parses the form first, so the raised limit must already apply
+    response = client.post('/api/claims/remittance', data={'file': (io.BytesIO(era.encode()), 'era.835')},
+                           headers={'X-CSRFToken': token})
+    assert response.status_code == 200 and response.get_json()['denied'] == 1
+
+    # Other endpoints keep MAX_CONTENT_LENGTH
+    response = client.post('/claims/upload', data={'file': (io.BytesIO(era.encode()), 'c.csv'), 'csrf_token': token})
+    assert response.status_code == 413
+
+
+def test_import_command_writes_unmatched(app, make_user, make_claims, tmp_path):
+    make_claims(make_user(), 2)
+    path = tmp_path / 'era.835'
+    path.write_text(_era(('CLM000000', '4', 0, ['CAS*CO*29*150']), ('GONE00001', '4', 0, ['CAS*CO*29*150'])))
+    unmatched = tmp_path / 'unmatched.csv'
+
+    result = app.test_cli_runner().invoke(args=['remittance', 'import', str(path), '--unmatched', str(unmatched)])
+    assert result.exit_code == 0, result.output
+    assert '1 denials created' in result.output
+    assert unmatched.read_text().splitlines() == ['claim_number,denial_code,reason', 'GONE00001,CO-29,not_found']
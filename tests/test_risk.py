@@ -0,0 +1,54 @@
+"""Tests for denial-risk scoring."""
+import io
+from app import db
+from app.models import Claim, DenialRiskRate, Issue
+from app.risk import rebuild_risk_tables
+
+
+def _history(make_user, make_claims):
+    user = make_user('history', role='manager')
+    risky = make_claims(user, 40, provider_id='PROV666', prefix='RISKY')
+    make_claims(user, 160, provider_id='PROV001', prefix='SAFE', total_amount=99.0)
+    for claim in risky[:30]:
+        claim.status = 'denied'
+    db.session.commit()
+    return user
+
+
+def test_rebuild_aggregates_history(app, make_user, make_claims):
+    _history(make_user, make_claims)
+    assert rebuild_risk_tables() > 0
+    rates = {(row.factor, row.value): (row.denials, row.claims) for row in DenialRiskRate.query}
+    assert rates[('all', '')] == (30, 200)
+    assert rates[('provider', 'PROV666')] == (30, 40)
+    assert rates[('amount_band', '0')] == (0, 160)  # All safe claims are under $100
+    assert rebuild_risk_tables() == len(rates)  # Rebuilds replace rather than add
+
+
+def test_upload_scores_and_flags_risky_claims(app, client, make_user, make_claims, login):
+    user = _history(make_user, make_claims)
+    rebuild_risk_tables()
+    login(user)
+    body = (
+        'claim_number,patient_id,provider_id,service_date,total_amount\n'
+        'NEW001,PAT001,PROV666,2024-03-15,150\n'
+        'NEW002,PAT002,PROV001,2024-03-15,50\n'
+    )
+    response = client.post('/claims/upload', data={'file': (io.BytesIO(body.encode()), 'claims.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 302
+    risky = Claim.query.filter_by(claim_number='NEW001').one()
+    safe = Claim.query.filter_by(claim_number='NEW002').one()
+    assert risky.risk_score > 0.3 > safe.risk_score
+    flagged = Issue.query.filter_by(issue_type='denial_risk').all()
+    assert [issue.claim_id for issue in flagged] == [risky.id]
+
+
+def test_scoring_waits_for_tables(app, client, make_user, login):
+    login(make_user())
+    client.post('/claims/new', data={
+        'claim_number': 'NEW100', 'patient_id': 'PAT001', 'provider_id': 'PROV001',
+        'service_date': '2024-03-15', 'total_amount': '100.00',
+    })
+    claim = Claim.query.filter_by(claim_number='NEW100').one()
+    assert claim.risk_score is None
@@ -0,0 +1,46 @@
+"""Tests for the synthetic data generator."""
+import csv
+from datetime import date
+import pytest
+from sqlalchemy import func
+from app import db
+from app.models import Claim, Denial, Issue, AppealDeadlineTally
+from app.seed import ClaimGenerator, seed_users, seed_database
+
+
+def test_generator_is_deterministic():
+    first = ClaimGenerator(7, 1000, today=date(2025, 1, 1))
+    second = ClaimGenerator(7, 1000, today=date(2025, 1, 1))
+    assert [first.claim_rows(i + 1, i, 1) for i in range(200)] == [second.claim_rows(i + 1, i, 1) for i in range(200)]
+    assert ClaimGenerator(8, 1000).claim_rows(1, 0, 1) != ClaimGenerator(7, 1000).claim_rows(1, 0, 1)
+
+
+def test_seed_database_writes_consistent_rows(app):
+    owner_ids = seed_users(3, 'Seed#Passw0rd1')
+    assert len(owner_ids) == 3 and seed_users(3, 'Seed#Passw0rd1') == owner_ids
+    totals = seed_database(2000, owner_ids, seed=1, batch_size=300, commit_every=700)
+
+    assert Claim.query.count() == totals['claims'] == 2000
+    assert Issue.query.count() == totals['issues'] > 0
+    assert Denial.query.count() == totals['denials'] == Claim.query.filter_by(status='denied').count()
+    pending = Denial.query.filter_by(appeal_status='pending').count()
+    assert db.session.query(func.sum(AppealDeadlineTally.pending_count)).scalar() == pending
+    assert db.session.get(Claim, Denial.query.first().claim_id).status == 'denied'
+    with pytest.raises(ValueError):
+        seed_database(10, owner_ids, seed=1)
+
+
+def test_seed_command_and_upload_csvs(app, tmp_path):
+    result = app.test_cli_runner().invoke(args=[
+        'seed', '--claims', '300', '--users', '2', '--csv-dir', str(tmp_path), '--csv-files', '2',
+        '--csv-rows', '50', '--csv-duplicate-rate', '0.5',
+    ])
+    assert result.exit_code == 0, result.output
+    assert 'Inserted 300 claims' in result.output
+    files = sorted(tmp_path.glob('*.csv'))
+    assert len(files) == 2
+    with open(files[0]) as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 50
+    existing = {number for (number,) in db.session.query(Claim.claim_number)}
+    assert 0 < sum(row['claim_number'] in existing for row in rows) < 50
@@ -0,0 +1,32 @@
+"""Tests for the production serving setup: SQLite pragmas, worker warm-up and gunicorn settings."""
+import runpy
+from pathlib import Path
+from sqlalchemy import text
+from app import create_app, db
+from app.serving import warm_up
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def test_warm_up_opens_connections_with_pragmas(tmp_path):
+    app = create_app('testing', {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{tmp_path}/serve.db'})
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+
+    timings = warm_up(app, connections=3)
+    assert set(timings) == {'db_connections', 'templates', 'risk_tables'}
+    with app.app_context():
+        assert db.engine.pool.checkedin() == 3
+        with db.engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1  # NORMAL
+
+
+def test_gunicorn_settings_come_from_the_environment(monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '3')
+    monkeypatch.setenv('MAX_REQUESTS', '1000')
+    settings = runpy.run_path(str(PROJECT_ROOT / 'gunicorn.conf.py'))
+    assert settings['workers'] == 3 and settings['preload_app'] is True
+    assert settings['max_requests'] == 1000 and settings['max_requests_jitter'] == 100
+    assert callable(settings['post_worker_init']) and callable(settings['when_ready'])
@@ -0,0 +1,50 @@
+"""Tests for the slow-query log."""
+from app.slowlog import redact_sql, fingerprint
+
+
+def test_redact_sql_removes_literals_and_collapses_lists():
+    assert redact_sql("SELECT * FROM claim WHERE patient_id = 'PAT001' AND total_amount > 50000") == \
+        'SELECT * FROM claim WHERE patient_id = ? AND total_amount > ?'
+    in_list = redact_sql('UPDATE claim SET status=? WHERE claim.id IN (?, ?, ?)')
+    assert in_list == redact_sql('UPDATE claim SET status=? WHERE claim.id IN (?, ?)') == \
+        'UPDATE claim SET status=? WHERE claim.id IN (?, ...)'
+    assert redact_sql('INSERT INTO issue (a, b) VALUES (?, ?), (?, ?), (?, ?)') == \
+        'INSERT INTO issue (a, b) VALUES (?, ...), ...'
+    assert fingerprint(in_list) == fingerprint(redact_sql('UPDATE claim SET status=? WHERE claim.id IN (?, ?, ?, ?)'))
+
+
+def test_slow_queries_recorded_with_plan(app, client, make_user, login, make_claims):
+    app.extensions['slow_queries'].threshold = 0  # Treat every statement as slow
+    admin = make_user('admin', role='admin')
+    make_claims(admin, 3, prefix='SLOW')
+    login(admin)
+    assert client.get('/claims').status_code == 200
+
+    response = client.get('/admin/slow-queries?format=json')
+    assert response.status_code == 200
+    body = response.get_json()
+    claim_selects = [q for q in body['queries'] if q['sql'].startswith('SELECT claim.id') and 'main.claims_list' in q['endpoints']]
+    assert claim_selects
+    assert claim_selects[0]['plan'] and claim_selects[0]['full_scan'] is True
+    assert 'SLOW000001' not in response.get_data(as_text=True)
+    assert client.get('/admin/slow-queries').status_code == 200
+
+    client.post('/admin/slow-queries/reset')
+    remaining = app.extensions['slow_queries'].records()
+    assert all(set(q['endpoints']) <= {'slowlog.reset_slow_queries'} for q in remaining)
+
+
+def test_slow_queries_admin_only(client, make_user, login):
+    login(make_user())
+    assert client.get('/admin/slow-queries').status_code == 403
+
+
+def test_reset_form_carries_csrf_token(app, client, make_user, login):
+    import re
+
+    login(make_user('admin', role='admin'))
+    app.config['WTF_CSRF_ENABLED'] = True
+    page = client.get('/admin/slow-queries').get_data(as_text=True)
+    token = re.search(r'name="csrf_token" value="([^"]+)"', page).group(1)
+    assert client.post('/admin/slow-queries/reset').status_code == 400
+    assert client.post('/admin/slow-queries/reset', data={'csrf_token': token}).status_code == 302
@@ -0,0 +1,36 @@
+"""Tests that app startup stays free of heavy optional imports."""
+import subprocess
+import sys
+from pathlib import Path
+from app.cli import HEAVY_MODULES, startup_profile
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+
+def test_create_app_does_not_import_pandas():
+    probe = (
+        "import sys\n"
+        "from app import create_app\n"
+        "create_app('testing')\n"
+        f"print(','.join(name for name in {HEAVY_MODULES!r} if name in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, '-c', probe], cwd=PROJECT_ROOT,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ''
+
+
+def test_startup_profile_reports_imports():
+    profile = startup_profile('testing', PROJECT_ROOT)
+    assert profile['startup_ms'] > 0 and profile['max_rss_kb'] > 0
+    assert profile['heavy_loaded'] == []
+    modules = [module for _, _, module in profile['imports']]
+    assert 'app' in modules
+
+
+def test_sample_download_without_pandas(client, make_user, login):
+    login(make_user())
+    response = client.get('/claims/download-sample')
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == 'claim_number,patient_id,provider_id,service_date,total_amount'
+    assert len(lines) == 4
@@ -0,0 +1,18 @@
+"""Tests for the template bytecode cache and warm-up."""
+import os
+from app import create_app, warm_templates
+
+
+def test_compile_command_fills_bytecode_cache(tmp_path):
+    cache_dir = tmp_path / 'jinja'
+    app = create_app('testing', {'JINJA_BYTECODE_CACHE': True, 'JINJA_BYTECODE_CACHE_DIR': str(cache_dir)})
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code == 0, result.output
+    assert 'Compiled' in result.output
+    assert len(os.listdir(cache_dir)) >= warm_templates(app) > 0
+
+
+def test_compile_command_requires_cache(app):
+    result = app.test_cli_runner().invoke(args=['templates', 'compile'])
+    assert result.exit_code != 0
+    assert 'disabled' in result.output
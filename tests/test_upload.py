@@ -0,0 +1,182 @@
+"""Tests for CSV claim upload."""
+import io
+from app.models import Claim, Issue, DataVersion
+from app import db
+
+
+def _upload(client, body, filename='claims.csv'):
+    return client.post('/claims/upload', data={'file': (io.BytesIO(body.encode()), filename)},
+                       content_type='multipart/form-data')
+
+
+def test_upload_creates_claims_and_issues(client, make_user, login):
+    user = make_user()
+    login(user)
+    body = (
+        'claim_number,patient_id,provider_id,service_date,total_amount\n'
+        'UPL001,PAT001,PROV001,2020-01-15,60000\n'  # old and unusually high
+        'UPL002,PAT002,PROV001,2020-02-01,150\n'
+    )
+    response = _upload(client, body)
+    assert response.status_code == 302
+    assert Claim.query.count() == 2
+    claim = Claim.query.filter_by(claim_number='UPL001').one()
+    assert {issue.issue_type for issue in claim.issues} == {'old_claim', 'high_amount'}
+    assert Issue.query.filter(Issue.claim_id.is_(None)).count() == 0
+    assert DataVersion.current(db.session.connection(), DataVersion.claims_scope(user.id))[0] == 1
+
+    # Re-uploading the same claim numbers skips them
+    _upload(client, body)
+    assert Claim.query.count() == 2
+
+
+def test_identical_file_returns_prior_result(client, make_user, login):
+    from app.models import UploadRecord
+
+    login(make_user())
+    body = ('claim_number,patient_id,provider_id,service_date,total_amount\n'
+            'UPL001,PAT001,PROV001,2024-01-15,150\n')
+    _upload(client, body)
+    client.get('/claims')  # Consume the first upload's flash
+    assert UploadRecord.query.one().claims_created == 1
+
+    response = _upload(client, body, 'renamed.csv')
+    assert response.status_code == 302
+    assert b'already uploaded' in client.get('/claims/upload').data
+    assert UploadRecord.query.count() == 1 and Claim.query.count() == 1
+
+
+def test_chunked_upload_resumes_and_dedupes(app, client, make_user, login, tmp_path):
+    import hashlib
+
+    app.config.update(UPLOAD_PATH=str(tmp_path), UPLOAD_CHUNK_SIZE=64)
+    user = make_user()
+    login(user)
+    lines = ['claim_number,patient_id,provider_id,service_date,total_amount']
+    lines += [f'CHK{i:03d},PAT{i:03d},PROV001,2024-01-15,{100 + i}' for i in range(20)]
+    data = ('\n'.join(lines) + '\n').encode()
+    chunks = [data[start:start + 64] for start in range(0, len(data), 64)]
+
+    started = client.post('/api/uploads', json={'filename': 'big.csv', 'size': len(data)})
+    assert started.status_code == 201
+    upload_id = started.get_json()['upload_id']
+    assert started.get_json()['missing'] == list(range(len(chunks)))
+
+    # Send every other chunk, "time out", then resume from the status
+    for index in range(0, len(chunks), 2):
+        assert client.put(f'/api/uploads/{upload_id}/chunks/{index}', data=chunks[index]).status_code == 200
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 409
+    missing = client.get(f'/api/uploads/{upload_id}').get_json()['missing']
+    assert missing == list(range(1, len(chunks), 2))
+    assert client.put(f'/api/uploads/{upload_id}/chunks/1', data=b'short').status_code == 400
+    for index in missing:
+        client.put(f'/api/uploads/{upload_id}/chunks/{index}', data=chunks[index])
+
+    result = client.post(f'/api/uploads/{upload_id}/complete').get_json()
+    assert result['duplicate'] is False and result['claims_created'] == 20
+    assert result['sha256'] == hashlib.sha256(data).hexdigest()
+    assert Claim.query.filter(Claim.claim_number.like('CHK%')).count() == 20
+    assert not (tmp_path / 'chunks' / upload_id).exists()
+
+    # Declaring the hash up front answers a re-send without any chunks
+    again = client.post('/api/uploads', json={'filename': 'big.csv', 'size': len(data), 'sha256': result['sha256']})
+    assert again.status_code == 200 and again.get_json()['duplicate'] is True
+
+
+def test_chunked_upload_is_private_and_validated(app, client, make_user, login, tmp_path):
+    app.config.update(UPLOAD_PATH=str(tmp_path), UPLOAD_CHUNK_SIZE=64)
+    owner, other = make_user(), make_user('other')
+    login(owner)
+    assert client.post('/api/uploads', json={'filename': 'x.exe', 'size': 10}).status_code == 400
+    assert client.post('/api/uploads', json={'filename': 'x.csv', 'size': 0}).status_code == 400
+    upload_id = client.post('/api/uploads', json={'filename': 'x.csv', 'size': 10}).get_json()['upload_id']
+    assert client.put(f'/api/uploads/{upload_id}/chunks/1', data=b'0123456789').status_code == 400
+
+    client.get('/auth/logout')
+    login(other)
+    assert client.get(f'/api/uploads/{upload_id}').status_code == 404
+    assert client.delete(f'/api/uploads/{upload_id}').status_code == 404
+    assert client.get('/api/uploads/..%2F..%2Fetc').status_code == 404
+
+
+def test_imports_over_the_size_limit_are_refused_up_front(app, client, make_user, login, tmp_path):
+    app.config.update(UPLOAD_PATH=str(tmp_path), UPLOAD_CHUNK_SIZE=64, UPLOAD_IMPORT_MAX_SIZE=100)
+    login(make_user())
+    data = ('claim_number,patient_id,provider_id,service_date,total_amount\n'
+            + ''.join(f'BIG{i:03d},PAT{i:03d},PROV001,2024-01-15,{100 + i}\n' for i in range(5))).encode()
+    assert len(data) > 100
+
+    response = client.post('/api/uploads', json={'filename': 'big.csv', 'size': len(data)})
+    assert response.status_code == 413 and 'too large' in response.get_json()['error']
+    assert not (tmp_path / 'chunks').exists() or not any((tmp_path / 'chunks').iterdir())
+
+    # It can still be checked, but completing that session as an import is refused
+    upload_id = client.post('/api/uploads', json={'filename': 'big.csv', 'size': len(data),
+                                                  'dry_run': True}).get_json()['upload_id']
+    for index, start in enumerate(range(0, len(data), 64)):
+        client.put(f'/api/uploads/{upload_id}/chunks/{index}', data=data[start:start + 64])
+    assert client.post(f'/api/uploads/{upload_id}/complete', json={'dry_run': True}).get_json()['new'] == 5
+    assert client.post(f'/api/uploads/{upload_id}/complete').status_code == 413
+
+    # The form upload is held to the same limit
+    assert _upload(client, data.decode(), 'big.csv').status_code == 302
+    assert b'too large to import' in client.get('/claims/upload').data
+    assert Claim.query.count() == 0
+
+
+def test_dry_run_reports_every_rejected_row(app, client, make_user, login, make_claims, tmp_path):
+    import csv
+
+    app.config.update(UPLOAD_PATH=str(tmp_path), UPLOAD_CHECK_BATCH_SIZE=2)
+    user = make_user()
+    make_claims(user, 1, prefix='OLD')
+    login(user)
+    body = (
+        'claim_number,patient_id,provider_id,service_date,total_amount\n'
+        'DRY001,PAT001,PROV001,2020-01-15,60000\n'  # old and unusually high
+        'DRY002,P!,PROV001,not-a-date,-5\n'  # three bad fields
+        'DRY001,PAT002,PROV001,2024-01-15,150\n'  # repeats row 2
+        'OLD000000,PAT003,PROV001,2024-01-15,150\n'  # already in use
+        'DRY003,PAT001,PROV001,2020-01-15,60000.00\n'  # same service as row 2
+    )
+    response = client.post('/claims/upload/check', data={'file': (io.BytesIO(body.encode()), 'claims.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200 and b'rejected rows with reasons' in response.data
+    assert Claim.query.count() == 1 and Issue.query.count() == 0
+
+    from app.upload_check import check_claims_csv
+    check = check_claims_csv(io.BytesIO(body.encode()), user.id)
+    assert {key: check[key] for key in ('rows', 'new', 'rejected', 'invalid', 'duplicates')} == \
+        {'rows': 5, 'new': 2, 'rejected': 3, 'invalid': 1, 'duplicates': 2}
+    assert check['issues'] == {'old_claim': 2, 'high_amount': 2, 'possible_duplicate': 1}
+
+    report = client.get(f"/claims/upload/reports/{check['report']}")
+    assert report.status_code == 200 and report.mimetype == 'text/csv'
+    rows = list(csv.DictReader(io.StringIO(report.get_data(as_text=True))))
+    assert [row['row'] for row in rows] == ['3', '4', '5']
+    assert rows[0]['reasons'] == ('Patient ID must be 3-50 alphanumeric characters; Amount cannot be negative; '
+                                  'Invalid service date format')
+    assert rows[1]['reasons'] == 'Claim number repeats row 2'
+    assert rows[2]['reasons'] == 'Claim number already exists'
+
+    client.get('/auth/logout')
+    login(make_user('other'))
+    assert client.get(f"/claims/upload/reports/{check['report']}").status_code == 404
+    assert client.get('/claims/upload/reports/..%2Fsecret').status_code == 404
+
+
+def test_chunked_dry_run_keeps_chunks_for_import(app, client, make_user, login, tmp_path):
+    app.config.update(UPLOAD_PATH=str(tmp_path), UPLOAD_CHUNK_SIZE=64)
+    login(make_user())
+    data = ('claim_number,patient_id,provider_id,service_date,total_amount\n'
+            + ''.join(f'DRC{i:03d},PAT{i:03d},PROV001,2024-01-15,{100 + i}\n' for i in range(5))).encode()
+    upload_id = client.post('/api/uploads', json={'filename': 'big.csv', 'size': len(data)}).get_json()['upload_id']
+    for index, start in enumerate(range(0, len(data), 64)):
+        client.put(f'/api/uploads/{upload_id}/chunks/{index}', data=data[start:start + 64])
+
+    check = client.post(f'/api/uploads/{upload_id}/complete', json={'dry_run': True}).get_json()
+    assert check['new'] == 5 and check['rejected'] == 0 and check['report_url'] is None
+    assert Claim.query.count() == 0
+
+    result = client.post(f'/api/uploads/{upload_id}/complete').get_json()
+    assert result['claims_created'] == 5 and Claim.query.count() == 5